@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from copy import deepcopy
+from typing import Any, Callable
+
+from schemaform.fields import count_group_array_rows, iter_group_array_rows
+
+FIELDS: list[dict[str, Any]] = [
+    {"key": "name", "type": "string"},
+    {
+        "key": "orders",
+        "type": "group",
+        "is_array": True,
+        "expand_rows": True,
+        "children": [
+            {"key": "sku", "type": "string"},
+            {
+                "key": "lines",
+                "type": "group",
+                "is_array": True,
+                "expand_rows": True,
+                "children": [{"key": "qty", "type": "integer"}, {"key": "memo", "type": "string"}],
+            },
+        ],
+    },
+    {
+        "key": "contacts",
+        "type": "group",
+        "is_array": True,
+        "expand_rows": True,
+        "children": [{"key": "tel", "type": "string"}],
+    },
+    {"key": "note", "type": "string"},
+]
+
+
+def make_data(orders: int, lines: int, contacts: int) -> dict[str, Any]:
+    return {
+        "name": "太郎",
+        "orders": [
+            {
+                "sku": f"S{order}",
+                "lines": [{"qty": line, "memo": "メモ" * 50} for line in range(lines)],
+            }
+            for order in range(orders)
+        ],
+        "contacts": [{"tel": f"090-{contact:04d}"} for contact in range(contacts)],
+        "note": "備考" * 200,
+    }
+
+
+def _legacy_expand_value(field: dict[str, Any], value: Any) -> list[Any]:
+    if field.get("type") != "group":
+        return [deepcopy(value)]
+    children = field.get("children") or []
+    if field.get("is_array"):
+        if not field.get("expand_rows"):
+            return [[]] if value is None else [deepcopy(value)]
+        if not isinstance(value, list) or not value:
+            return [{}]
+        expanded: list[Any] = []
+        for item in value:
+            if isinstance(item, dict):
+                expanded += _legacy_expand_object(children, item)
+            else:
+                expanded.append(deepcopy(item))
+        return expanded
+    return _legacy_expand_object(children, value if isinstance(value, dict) else {})
+
+
+def _legacy_expand_object(fields: list[dict[str, Any]], source: dict[str, Any]) -> list[dict[str, Any]]:
+    keys = {field["key"] for field in fields}
+    base = {k: deepcopy(v) for k, v in source.items() if k not in keys}
+    variants = [base]
+    for field in fields:
+        values = _legacy_expand_value(field, source.get(field["key"]))
+        variants = [{**row, field["key"]: value} for row in variants for value in values]
+    return variants or [base]
+
+
+def legacy_expand_group_array_rows(
+    fields: list[dict[str, Any]], data: dict[str, Any]
+) -> list[dict[str, Any]]:
+    # 比較用: 直積をすべて作り、値を deepcopy していた従来の実装。
+    return _legacy_expand_object(fields, data)
+
+
+def measure(func: Callable[[], Any]) -> tuple[float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="グループ配列の行展開（従来 / 遅延展開）の比較")
+    parser.add_argument("--orders", type=int, default=40)
+    parser.add_argument("--lines", type=int, default=25)
+    parser.add_argument("--contacts", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    data = make_data(args.orders, args.lines, args.contacts)
+    expected = legacy_expand_group_array_rows(FIELDS, data)
+    assert list(iter_group_array_rows(FIELDS, data)) == expected
+    total = count_group_array_rows(FIELDS, data)
+    assert total == len(expected)
+    start = total // 2
+
+    print(f"rows={total} page={start}..{start + args.page_size}")
+    cases = {
+        "legacy all": lambda: legacy_expand_group_array_rows(FIELDS, data),
+        "lazy all": lambda: list(iter_group_array_rows(FIELDS, data)),
+        "legacy page": lambda: legacy_expand_group_array_rows(FIELDS, data)[
+            start : start + args.page_size
+        ],
+        "lazy page": lambda: list(
+            iter_group_array_rows(FIELDS, data, start, start + args.page_size)
+        ),
+        "lazy count": lambda: count_group_array_rows(FIELDS, data),
+    }
+    for label, func in cases.items():
+        elapsed, peak = measure(func)
+        print(f"  {label:<12} {elapsed * 1000:>9.1f} ms  peak {peak:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime
+from typing import Any, Callable
+
+from schemaform.fields import flatten_filter_fields
+from schemaform.filters import (
+    apply_filters,
+    build_search_text,
+    compile_filters,
+    ensure_aware,
+    parse_query_datetime,
+    run_filters,
+)
+from schemaform.utils import now_utc
+
+FIELD_COUNT = 50
+
+
+def make_fields() -> list[dict[str, Any]]:
+    fields: list[dict[str, Any]] = []
+    for index in range(FIELD_COUNT):
+        kind = ("string", "integer", "enum", "boolean", "date")[index % 5]
+        field: dict[str, Any] = {"key": f"f{index}", "label": f"項目{index}", "type": kind}
+        if kind == "enum":
+            field["enum"] = ["赤", "青", "緑"]
+        fields.append(field)
+    return fields
+
+
+def make_submission(index: int, rnd: random.Random) -> dict[str, Any]:
+    data: dict[str, Any] = {}
+    for number in range(FIELD_COUNT):
+        kind = number % 5
+        if kind == 0:
+            data[f"f{number}"] = f"テキスト{rnd.randint(0, 999)}"
+        elif kind == 1:
+            data[f"f{number}"] = rnd.randint(0, 100)
+        elif kind == 2:
+            data[f"f{number}"] = rnd.choice(["赤", "青", "緑"])
+        elif kind == 3:
+            data[f"f{number}"] = rnd.random() < 0.5
+        else:
+            data[f"f{number}"] = f"2024-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}"
+    return {"id": str(index), "form_id": "bench", "data_json": data, "created_at": now_utc()}
+
+
+def legacy_apply_filters(
+    submissions: list[dict[str, Any]],
+    fields: list[dict[str, Any]],
+    query_params: dict[str, Any],
+    file_names: dict[str, str] | None = None,
+) -> list[dict[str, Any]]:
+    # 比較用: 行ごとに query_params を引き直し、全フィールドを判定していた従来の実装。
+    q = str(query_params.get("q", "")).strip().lower()
+    from_dt = parse_query_datetime(query_params.get("submitted_from"))
+    to_dt = parse_query_datetime(query_params.get("submitted_to"))
+    flat_fields = flatten_filter_fields(fields)
+    resolved_file_names = file_names or {}
+
+    def get_filter_values(current: Any, dotted_key: str) -> list[Any]:
+        parts = dotted_key.split(".")
+
+        def walk(node: Any, idx: int) -> list[Any]:
+            if idx >= len(parts):
+                if isinstance(node, list):
+                    return list(node)
+                return [node]
+
+            key = parts[idx]
+            values: list[Any] = []
+            if isinstance(node, dict):
+                if key in node:
+                    values.extend(walk(node.get(key), idx + 1))
+            elif isinstance(node, list):
+                for item in node:
+                    values.extend(walk(item, idx))
+            return values
+
+        return walk(current, 0)
+
+    def matches_free_text(data: dict[str, Any]) -> bool:
+        if not q:
+            return True
+        return q in build_search_text(fields, data, resolved_file_names)
+
+    filtered: list[dict[str, Any]] = []
+    for submission in submissions:
+        created_at = submission.get("created_at")
+        if created_at and (from_dt or to_dt):
+            created_value = ensure_aware(created_at) if isinstance(created_at, datetime) else None
+            if created_value is not None:
+                if from_dt and created_value < ensure_aware(from_dt):
+                    continue
+                if to_dt and created_value > ensure_aware(to_dt):
+                    continue
+        data = submission.get("data_json", {})
+        if not matches_free_text(data):
+            continue
+        ok = True
+        for field in flat_fields:
+            flat_key = field["flat_key"]
+            param_key = f"f_{flat_key.replace('.', '__')}"
+            values = get_filter_values(data, flat_key)
+            value = values[0] if values else None
+            field_type = field["type"]
+            is_array = field.get("is_array", False)
+
+            if field_type == "group":
+                filter_value = str(query_params.get(param_key, "")).strip()
+                if not filter_value:
+                    continue
+                if not any(filter_value.lower() in str(item).lower() for item in values):
+                    ok = False
+                    break
+                continue
+
+            if is_array:
+                filter_value = str(query_params.get(param_key, "")).strip()
+                if not filter_value:
+                    continue
+                filter_value_lower = filter_value.lower()
+                items = [item for item in values if item not in (None, "")]
+                if field_type == "enum":
+                    if filter_value not in [str(item) for item in items]:
+                        ok = False
+                        break
+                elif field_type == "file":
+                    if not any(
+                        filter_value_lower in resolved_file_names.get(item, "").lower()
+                        for item in items
+                        if isinstance(item, str)
+                    ):
+                        ok = False
+                        break
+                else:
+                    if not any(filter_value_lower in str(item).lower() for item in items):
+                        ok = False
+                        break
+                continue
+
+            if field_type in {"string", "enum", "file", "datetime", "date", "time"}:
+                filter_value = str(query_params.get(param_key, "")).strip()
+                if not filter_value:
+                    continue
+                if field_type == "enum":
+                    if str(value) != filter_value:
+                        ok = False
+                        break
+                elif field_type == "file":
+                    file_name = resolved_file_names.get(str(value), "")
+                    if filter_value.lower() not in file_name.lower():
+                        ok = False
+                        break
+                else:
+                    if filter_value.lower() not in str(value or "").lower():
+                        ok = False
+                        break
+            elif field_type in {"number", "integer"}:
+                min_val = query_params.get(f"{param_key}_min")
+                max_val = query_params.get(f"{param_key}_max")
+                if min_val not in (None, "") or max_val not in (None, ""):
+                    if value is None:
+                        ok = False
+                        break
+                    if min_val not in (None, "") and value < float(min_val):
+                        ok = False
+                        break
+                    if max_val not in (None, "") and value > float(max_val):
+                        ok = False
+                        break
+            elif field_type == "boolean":
+                filter_value = str(query_params.get(param_key, "")).strip().lower()
+                if not filter_value:
+                    continue
+                expected = filter_value in {"1", "true", "on", "yes"}
+                if bool(value) != expected:
+                    ok = False
+                    break
+        if ok:
+            filtered.append(submission)
+    return filtered
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="apply_filters（従来 / コンパイル済み判定）の比較")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    fields = make_fields()
+    submissions = [make_submission(index, rnd) for index in range(args.rows)]
+    queries = {
+        "enum": {"f_f2": "赤"},
+        "enum+number+text": {"f_f2": "赤", "f_f1_min": "20", "f_f1_max": "80", "f_f0": "1"},
+        "q": {"q": "テキスト12"},
+    }
+
+    print(f"rows={args.rows} fields={FIELD_COUNT}")
+    for label, query_params in queries.items():
+        expected = legacy_apply_filters(submissions, fields, query_params)
+        assert [item["id"] for item in expected] == [
+            item["id"] for item in apply_filters(submissions, fields, query_params)
+        ]
+        plan = compile_filters(fields, query_params)
+        legacy = best_of(lambda: legacy_apply_filters(submissions, fields, query_params), args.repeat)
+        compiled = best_of(lambda: apply_filters(submissions, fields, query_params), args.repeat)
+        reused = best_of(lambda: run_filters(submissions, plan), args.repeat)
+        per_row = 1_000_000 / args.rows
+        print(
+            f"  {label:<18} matched={len(expected):>6}"
+            f"  legacy {legacy * per_row:>6.2f} us/row"
+            f"  compiled {compiled * per_row:>6.2f} us/row x{legacy / compiled:.1f}"
+            f"  reused plan {reused * per_row:>6.2f} us/row"
+        )
+
+
+if __name__ == "__main__":
+    main()
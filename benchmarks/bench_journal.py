@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from filelock import FileLock
+
+from schemaform.repo_json import JSONJournal
+from schemaform.utils import new_ulid, now_utc, to_iso
+
+FORM_ID = "bench-form"
+
+
+def make_record(index: int) -> dict[str, Any]:
+    return {
+        "id": new_ulid(),
+        "form_id": FORM_ID,
+        "data_json": {"name": f"user{index}", "age": index % 90, "note": "メモ" * 20},
+        "created_at": to_iso(now_utc()),
+    }
+
+
+def open_journal(path: Path) -> JSONJournal:
+    # ワーカーごとに別のロックオブジェクトを持つのと同じ状況にする
+    return JSONJournal(path, FileLock(f"{path}.lock"))
+
+
+def is_caught_up(journal: JSONJournal) -> bool:
+    return journal._journal_marker() == (journal._inode, journal._offset)
+
+
+def check_crash_fragment(directory: Path) -> None:
+    # 2 つのインスタンスで書き込み、途中で落ちたプロセスの書きかけの行を挟んでも
+    # 双方が同じ内容になり、追記したインスタンスが読み直し不要の状態になること
+    path = directory / "fragment.json"
+    first = open_journal(path)
+    second = open_journal(path)
+    records = [make_record(index) for index in range(4)]
+    first.put("submissions", [records[0]])
+    with Path(f"{path}.journal").open("ab") as handle:
+        handle.write(b'{"table": "submissions", "op": "put", "reco')
+    second.put("submissions", [records[1]])
+    assert is_caught_up(second)
+    first.put("submissions", [records[2]])
+    assert is_caught_up(first)
+    second.put("submissions", [records[3]])
+    assert is_caught_up(second)
+    expected = {record["id"] for record in records}
+    for journal in (first, second, open_journal(path)):
+        assert {record["id"] for record in journal.records("submissions")} == expected
+        assert is_caught_up(journal)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="memory モードのジャーナルの追記・再生の一致確認と比較")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory = Path(temp_dir)
+        check_crash_fragment(directory)
+        print("crash fragment ok")
+
+        path = directory / "bench.json"
+        writer = open_journal(path)
+        reader = open_journal(path)
+        records = [make_record(index) for index in range(args.rows)]
+        started = time.perf_counter()
+        for start in range(0, len(records), args.batch):
+            writer.put("submissions", records[start : start + args.batch])
+        elapsed = time.perf_counter() - started
+        print(f"  append   {elapsed * 1000:>8.1f} ms  {args.rows / elapsed:>10.0f} rows/s")
+
+        started = time.perf_counter()
+        reader.refresh()
+        elapsed = time.perf_counter() - started
+        print(f"  catch up {elapsed * 1000:>8.1f} ms  {args.rows / elapsed:>10.0f} rows/s")
+        assert len(reader.records("submissions")) == args.rows
+
+
+if __name__ == "__main__":
+    main()
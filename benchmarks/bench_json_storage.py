@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from tinydb import Query, TinyDB
+from tinydb.storages import JSONStorage
+
+from schemaform.repo_json import OrjsonStorage
+from schemaform.utils import new_ulid, now_utc, to_iso
+
+FORM_ID = "bench-form"
+
+
+def make_record(index: int) -> dict[str, Any]:
+    return {
+        "id": new_ulid(),
+        "form_id": FORM_ID,
+        "data_json": {
+            "name": f"user{index}",
+            "age": index % 90,
+            "address": {"city": "東京", "zip": f"{index:07d}"},
+            "note": "メモ" * 100,
+        },
+        "created_at": to_iso(now_utc()),
+    }
+
+
+def build_store(path: Path, megabytes: int) -> int:
+    # 既定のストレージ（標準 json, ensure_ascii）で書いたときの大きさに合わせる
+    record_size = len(json.dumps(make_record(0)))
+    count = megabytes * 1024 * 1024 // record_size
+    db = TinyDB(path)
+    db.table("submissions").insert_multiple(make_record(i) for i in range(count))
+    db.close()
+    return count
+
+
+def open_factory(storage: str) -> Callable[[Path], TinyDB]:
+    if storage == "tinydb":
+        return lambda path: TinyDB(path, storage=JSONStorage)
+    mode = storage.split(":", 1)[1]
+    return lambda path: TinyDB(path, storage=OrjsonStorage, fsync=mode)
+
+
+def read_call(open_db: Callable[[Path], TinyDB], path: Path) -> None:
+    db = open_db(path)
+    db.table("submissions").search(Query().form_id == FORM_ID)
+    db.close()
+
+
+def write_call(open_db: Callable[[Path], TinyDB], path: Path) -> None:
+    db = open_db(path)
+    db.table("submissions").insert(make_record(0))
+    db.close()
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TinyDB ストレージ（標準 JSON / orjson + rename）の比較")
+    parser.add_argument("--megabytes", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp) / "base.json"
+        count = build_store(base, args.megabytes)
+        size = base.stat().st_size / 1024 / 1024
+        print(f"store records={count} size={size:.1f} MB")
+
+        # 互いに読み書きできることを確認してから計測する
+        path = Path(tmp) / "check.json"
+        shutil.copy(base, path)
+        write_call(open_factory("orjson:never"), path)
+        assert len(TinyDB(path).table("submissions")) == count + 1
+
+        for storage in ("tinydb", "orjson:always", "orjson:batch", "orjson:never"):
+            path = Path(tmp) / "bench.json"
+            shutil.copy(base, path)
+            open_db = open_factory(storage)
+            read = best_of(lambda: read_call(open_db, path), args.repeat)
+            write = best_of(lambda: write_call(open_db, path), args.repeat)
+            print(f"  {storage:<14} read {read * 1000:>8.1f} ms  insert {write * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
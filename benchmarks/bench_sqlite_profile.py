@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from schemaform.config import SQLITE_PROFILES
+from schemaform.repo_sqlite import SQLiteStorage
+from schemaform.utils import new_ulid, now_utc
+
+FORM_ID = "bench-form"
+
+
+def make_submission(index: int) -> dict[str, Any]:
+    return {
+        "id": new_ulid(),
+        "form_id": FORM_ID,
+        "data_json": {"name": f"user{index}", "age": index % 90, "note": "x" * 200},
+        "created_at": now_utc(),
+    }
+
+
+def run_profile(profile: str, seed_rows: int, writers: int, readers: int, seconds: float) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteStorage(Path(tmp) / "bench.db", pragmas=SQLITE_PROFILES[profile])
+        for index in range(seed_rows):
+            storage.submissions.create_submission(make_submission(index))
+
+        stop = threading.Event()
+        counts = {"writes": 0, "reads": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def writer() -> None:
+            index = 0
+            while not stop.is_set():
+                try:
+                    storage.submissions.create_submission(make_submission(index))
+                    key = "writes"
+                except Exception:
+                    key = "errors"
+                with lock:
+                    counts[key] += 1
+                index += 1
+
+        def reader() -> None:
+            while not stop.is_set():
+                try:
+                    storage.submissions.query_submissions(FORM_ID, limit=50)
+                    key = "reads"
+                except Exception:
+                    key = "errors"
+                with lock:
+                    counts[key] += 1
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        storage._engine.dispose()
+
+    return {
+        "profile": profile,
+        "writes_per_sec": counts["writes"] / seconds,
+        "reads_per_sec": counts["reads"] / seconds,
+        "errors": counts["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite プロファイル別の読み書きスループット")
+    parser.add_argument("--seed-rows", type=int, default=5000)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for profile in ("default", "production"):
+        result = run_profile(profile, args.seed_rows, args.writers, args.readers, args.seconds)
+        print(
+            f"{result['profile']:<10} writes/s={result['writes_per_sec']:>9.1f} "
+            f"reads/s={result['reads_per_sec']:>9.1f} errors={result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from sqlalchemy import select
+
+from schemaform.models import FileModel, SubmissionModel
+from schemaform.repo_sqlite import SQLiteStorage
+from schemaform.utils import loads_json, new_ulid, now_utc
+
+FORM_ID = "bench-form"
+
+
+def make_submission(index: int) -> dict[str, Any]:
+    return {
+        "id": new_ulid(),
+        "form_id": FORM_ID,
+        "data_json": {
+            "name": f"user{index}",
+            "age": index % 90,
+            "tags": ["a", "b"],
+            "address": {"city": "東京", "zip": f"{index:07d}"},
+            "items": [{"sku": f"S{n}", "qty": n} for n in range(10)],
+            "note": "メモ" * 200,
+            **{f"extra{n}": f"value{n}" for n in range(20)},
+        },
+        "created_at": now_utc(),
+    }
+
+
+def orm_list_submissions(storage: SQLiteStorage) -> list[dict[str, Any]]:
+    # 比較用: ORM エンティティを作ってから dict に詰め替える従来の読み出し。
+    stmt = (
+        select(SubmissionModel)
+        .where(SubmissionModel.form_id == FORM_ID)
+        .order_by(SubmissionModel.created_at.desc(), SubmissionModel.id.desc())
+    )
+    with storage._Session() as session:
+        return [
+            {
+                "id": row.id,
+                "form_id": row.form_id,
+                "data_json": loads_json(row.data_json) or {},
+                "created_at": row.created_at,
+            }
+            for row in session.scalars(stmt).all()
+        ]
+
+
+def core_list_submissions(storage: SQLiteStorage) -> list[dict[str, Any]]:
+    # 遅延展開に頼らず比較するため、全行の data_json を実際に読む。
+    rows = storage.submissions.list_submissions(FORM_ID)
+    for row in rows:
+        row["data_json"]
+    return rows
+
+
+def make_file(index: int) -> dict[str, Any]:
+    return {
+        "id": new_ulid(),
+        "form_id": FORM_ID,
+        "original_name": f"file{index}.pdf",
+        "stored_path": f"/tmp/file{index}.pdf",
+        "content_type": "application/pdf",
+        "size": index,
+        "created_at": now_utc(),
+    }
+
+
+def orm_get_files(storage: SQLiteStorage, file_ids: list[str]) -> None:
+    for file_id in file_ids:
+        with storage._Session() as session:
+            row = session.get(FileModel, file_id)
+            assert row is not None
+
+
+def core_get_files(storage: SQLiteStorage, file_ids: list[str]) -> None:
+    for file_id in file_ids:
+        assert storage.files.get_file(file_id) is not None
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite 読み出し経路（ORM / Core）の比較")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteStorage(Path(tmp) / "bench.db")
+        storage.submissions.create_submissions([make_submission(i) for i in range(args.rows)])
+
+        assert orm_list_submissions(storage) == storage.submissions.list_submissions(FORM_ID)
+        orm = best_of(lambda: orm_list_submissions(storage), args.repeat)
+        core = best_of(lambda: core_list_submissions(storage), args.repeat)
+        projected = best_of(
+            lambda: storage.submissions.query_submissions(FORM_ID, project=["age"]), args.repeat
+        )
+
+        files = [make_file(i) for i in range(args.files)]
+        for file_meta in files:
+            storage.files.create_file(file_meta)
+        file_ids = [file_meta["id"] for file_meta in files]
+        orm_files = best_of(lambda: orm_get_files(storage, file_ids), args.repeat)
+        core_files = best_of(lambda: core_get_files(storage, file_ids), args.repeat)
+        storage._engine.dispose()
+
+    print(f"list_submissions rows={args.rows}")
+    print(f"  orm   {orm * 1000:>9.1f} ms  {args.rows / orm:>10.0f} rows/s")
+    print(f"  core  {core * 1000:>9.1f} ms  {args.rows / core:>10.0f} rows/s  x{orm / core:.2f}")
+    print(
+        f"  core project=['age'] {projected * 1000:>9.1f} ms"
+        f"  {args.rows / projected:>10.0f} rows/s  x{orm / projected:.2f}"
+    )
+    print(f"get_file calls={args.files}")
+    print(f"  orm   {orm_files * 1000:>9.1f} ms  {args.files / orm_files:>10.0f} calls/s")
+    print(
+        f"  core  {core_files * 1000:>9.1f} ms  {args.files / core_files:>10.0f} calls/s"
+        f"  x{orm_files / core_files:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
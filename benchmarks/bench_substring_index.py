@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from schemaform.filters import apply_filters, substring_filters
+from schemaform.repo_json import JSONMemoryStorage
+from schemaform.schema import fields_from_schema
+from schemaform.utils import new_ulid, now_utc
+
+FORM_ID = "bench-form"
+SCHEMA = {
+    "type": "object",
+    "properties": {"name": {"type": "string"}, "note": {"type": "string"}},
+}
+WORDS = ["東京", "大阪", "京都", "札幌", "名古屋", "tokyo", "osaka", "報告", "申請", "確認"]
+
+
+def make_submission(rnd: random.Random, index: int) -> dict[str, Any]:
+    return {
+        "id": new_ulid(),
+        "form_id": FORM_ID,
+        "data_json": {
+            "name": f"{rnd.choice(WORDS)}{index}",
+            "note": "".join(rnd.choice(WORDS) for _ in range(8)),
+        },
+        "created_at": now_utc(),
+    }
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="部分一致の絞り込み（全件走査 / bigram 索引）の比較")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = JSONMemoryStorage(Path(tmp) / "bench.json", substring_index_postings=10**8)
+        storage.forms.create_form(
+            {
+                "id": FORM_ID,
+                "public_id": FORM_ID,
+                "name": "bench",
+                "description": "",
+                "status": "active",
+                "schema_json": SCHEMA,
+                "field_order": ["name", "note"],
+                "created_at": now_utc(),
+                "updated_at": now_utc(),
+            }
+        )
+        storage.submissions.create_submissions(
+            [make_submission(rnd, index) for index in range(args.rows)]
+        )
+        fields = fields_from_schema(SCHEMA, ["name", "note"])
+        submissions = storage.submissions.query_submissions(FORM_ID)
+
+        print(f"rows={args.rows}")
+        for query in ({"f_name": "京都12"}, {"f_name": "名古屋"}, {"f_note": "報告申請確認"}):
+            filters = substring_filters(fields, query)
+            started = time.perf_counter()
+            storage.submissions.substring_candidates(FORM_ID, filters)
+            build = time.perf_counter() - started
+
+            def indexed() -> list[dict[str, Any]]:
+                candidates = storage.submissions.substring_candidates(FORM_ID, filters)
+                return apply_filters(submissions, fields, query, candidates=candidates)
+
+            expected = apply_filters(submissions, fields, query)
+            assert indexed() == expected
+            scan = best_of(lambda: apply_filters(submissions, fields, query), args.repeat)
+            index = best_of(indexed, args.repeat)
+            print(
+                f"  {query} matches={len(expected)}  scan {scan * 1000:>8.1f} ms"
+                f"  index {index * 1000:>8.1f} ms  x{scan / index:.2f}  (build {build * 1000:.0f} ms)"
+            )
+
+
+if __name__ == "__main__":
+    main()
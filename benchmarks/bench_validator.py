@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Any, Callable
+
+from jsonschema import Draft7Validator
+
+from schemaform.fast_validator import compile_validator
+from schemaform.schema import schema_from_fields
+
+LEAF_TYPES = ["string", "number", "integer", "boolean", "enum", "datetime", "date", "time", "file", "master"]
+ODD_VALUES: list[Any] = [None, True, False, 0, 1, 1.0, 1.5, -3, 10**20, "", "x", "1", [], {}, [1], {"a": 1}]
+UNSUPPORTED_SCHEMAS: list[dict[str, Any]] = [
+    {"type": "object", "properties": {"a": {"type": "string", "minLength": 1}}},
+    {"type": "object", "additionalProperties": False},
+    {"type": "object", "properties": {"a": {"$ref": "#/definitions/a"}}, "definitions": {"a": {}}},
+    {"type": "array", "items": [{"type": "string"}]},
+    {"type": "object", "properties": {"a": {"enum": [1, 2]}}},
+    {"anyOf": [{"type": "string"}, {"type": "integer"}]},
+    {"type": "object", "properties": {"a": True}},
+]
+
+
+def make_field(rng: random.Random, key: str, depth: int) -> dict[str, Any]:
+    field_type = "group" if depth < 2 and rng.random() < 0.2 else rng.choice(LEAF_TYPES)
+    is_array = rng.random() < 0.3
+    field: dict[str, Any] = {
+        "key": key,
+        "label": key,
+        "type": field_type,
+        "required": rng.random() < 0.4,
+        "is_array": is_array,
+        "items_type": field_type if is_array and field_type != "group" else "",
+        "enum": ["赤", "青", "緑"] if field_type == "enum" else [],
+        "min": rng.choice([None, 0.0, -5.0]) if field_type in {"number", "integer"} else None,
+        "max": rng.choice([None, 100.0, 3.5]) if field_type in {"number", "integer"} else None,
+        "format": rng.choice(["", "email", "url"]) if field_type == "string" else "",
+        "children": [],
+    }
+    if field_type == "group":
+        field["children"] = [
+            make_field(rng, f"{key}_{index}", depth + 1) for index in range(rng.randint(1, 4))
+        ]
+    return field
+
+
+def make_fields(rng: random.Random, count: int) -> list[dict[str, Any]]:
+    return [make_field(rng, f"f{index}", 0) for index in range(count)]
+
+
+def valid_value(rng: random.Random, field: dict[str, Any], item: bool = False) -> Any:
+    if field.get("is_array") and not item:
+        return [valid_value(rng, field, True) for _ in range(rng.randint(0, 3))]
+    if field["type"] == "group":
+        return valid_data(rng, field["children"])
+    if field["type"] in {"number", "integer"}:
+        low = field["min"] if field["min"] is not None else -10
+        high = field["max"] if field["max"] is not None else 50
+        value = rng.uniform(low, high)
+        return int(max(low, min(high, round(value)))) if field["type"] == "integer" else value
+    if field["type"] == "boolean":
+        return rng.random() < 0.5
+    if field["type"] == "enum":
+        return rng.choice(field["enum"])
+    return f"値{rng.randint(0, 999)}"
+
+
+def valid_data(rng: random.Random, fields: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        field["key"]: valid_value(rng, field)
+        for field in fields
+        if field["required"] or rng.random() < 0.7
+    }
+
+
+def mutate(rng: random.Random, value: Any) -> Any:
+    # 値のどこか 1 か所以上を型違い・範囲外・欠落などに置き換える
+    if isinstance(value, dict) and value and rng.random() < 0.8:
+        copied = dict(value)
+        key = rng.choice(list(copied))
+        if rng.random() < 0.2:
+            del copied[key]
+        else:
+            copied[key] = mutate(rng, copied[key])
+        return copied
+    if isinstance(value, list) and value and rng.random() < 0.8:
+        copied = list(value)
+        index = rng.randrange(len(copied))
+        copied[index] = mutate(rng, copied[index])
+        return copied
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and rng.random() < 0.5:
+        return value + rng.choice([-1000, 1000, 0.5])
+    if isinstance(value, str) and rng.random() < 0.3:
+        return value + "?"
+    return rng.choice(ODD_VALUES)
+
+
+def error_list(validator: Any, data: Any) -> list[tuple[str, list[Any], str]]:
+    return [(error.message, list(error.path), error.validator) for error in validator.iter_errors(data)]
+
+
+def check_conformance(rng: random.Random, schemas: int, samples: int) -> tuple[int, int]:
+    checked = 0
+    with_errors = 0
+    for _ in range(schemas):
+        fields = make_fields(rng, rng.randint(1, 12))
+        schema, _ = schema_from_fields(fields)
+        reference = Draft7Validator(schema)
+        compiled = compile_validator(schema)
+        assert compiled is not None, schema
+        for _ in range(samples):
+            data: Any = valid_data(rng, fields)
+            for _ in range(rng.randint(0, 3)):
+                data = mutate(rng, data)
+            expected = error_list(reference, data)
+            assert error_list(compiled, data) == expected, (schema, data)
+            # 画面・API と同じ並べ替えをしても一致すること
+            assert [
+                error.message for error in sorted(compiled.iter_errors(data), key=lambda err: list(err.path))
+            ] == [
+                error.message for error in sorted(reference.iter_errors(data), key=lambda err: list(err.path))
+            ]
+            checked += 1
+            with_errors += bool(expected)
+    for schema in UNSUPPORTED_SCHEMAS:
+        assert compile_validator(schema) is None, schema
+    return checked, with_errors
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="送信データの検証（jsonschema / コンパイル済み）の一致確認と比較")
+    parser.add_argument("--fields", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--schemas", type=int, default=300)
+    parser.add_argument("--samples", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    checked, with_errors = check_conformance(rng, args.schemas, args.samples)
+    print(f"conformance ok schemas={args.schemas} documents={checked} with_errors={with_errors}")
+
+    fields = make_fields(rng, args.fields)
+    schema, _ = schema_from_fields(fields)
+    valid_rows = [valid_data(rng, fields) for _ in range(args.rows)]
+    invalid_rows = [mutate(rng, mutate(rng, row)) for row in valid_rows]
+    reference = Draft7Validator(schema)
+    compiled = compile_validator(schema)
+    assert compiled is not None
+    for label, rows in (("valid", valid_rows), ("invalid", invalid_rows)):
+        for name, validator in (("jsonschema", reference), ("compiled", compiled)):
+            elapsed = best_of(lambda: [list(validator.iter_errors(row)) for row in rows], args.repeat)
+            print(
+                f"  {label:<8} {name:<10} {elapsed * 1000:>8.1f} ms"
+                f"  {len(rows) / elapsed:>10.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
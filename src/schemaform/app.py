@@ -10,11 +10,13 @@ from fastapi.templating import Jinja2Templates
 from schemaform.auth import get_auth_provider
 from schemaform.config import BASE_DIR, Settings, ensure_dirs
 from schemaform.file_formats import file_accept_for_constraints
+from schemaform.form_cache import FORM_CACHE
+from schemaform.result_cache import FilterResultCache
 from schemaform.routes.admin import router as admin_router
 from schemaform.routes.api import router as api_router
 from schemaform.routes.public import router as public_router
 from schemaform.routes.submissions import router as submissions_router
-from schemaform.storage import init_storage
+from schemaform.storage import init_async_storage, init_storage
 
 
 def field_input_type(field: dict[str, Any]) -> str:
@@ -91,6 +93,7 @@ def create_app(settings: Settings | None = None) -> FastAPI:
     settings = settings or Settings()
     ensure_dirs(settings)
     storage = init_storage(settings)
+    async_storage = init_async_storage(settings, storage)
     auth = get_auth_provider(settings)
 
     app = FastAPI(
@@ -104,8 +107,17 @@ def create_app(settings: Settings | None = None) -> FastAPI:
     )
 
     app.state.storage = storage
+    app.state.async_storage = async_storage
     app.state.settings = settings
     app.state.auth_provider = auth
+    app.state.filter_cache = (
+        FilterResultCache(settings.filter_cache_size, settings.filter_cache_max_rows)
+        if settings.filter_cache_size > 0
+        else None
+    )
+    # 項目定義とバリデータのキャッシュはリポジトリ層からも使うのでプロセスで 1 つ
+    FORM_CACHE.resize(settings.form_cache_size)
+    app.state.form_cache = FORM_CACHE
 
     templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
     app.state.templates = templates
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import time
+from pathlib import Path
+
 import typer
 
 from schemaform.app import create_app
-from schemaform.config import Settings
+from schemaform.config import SUBMISSION_BATCH_CHUNK_SIZE, Settings
+from schemaform.migrate import MIGRATION_BACKENDS, migrate_storage
+from schemaform.repo_json import shard_json_store
+from schemaform.storage import init_storage
 
 cli = typer.Typer(add_completion=False)
 
@@ -31,6 +37,57 @@ def run(
     run_server(resolved_host, resolved_port)
 
 
+@cli.command("shard-json")
+def shard_json(
+    source: Path | None = typer.Option(None, help="変換元の jsonstore.json（既定: JSON_PATH）"),
+    target: Path | None = typer.Option(None, help="分割構成の出力先（既定: JSON_SHARD_DIR）"),
+) -> None:
+    settings = Settings()
+    source_path = source or settings.json_path
+    if not source_path.exists():
+        typer.echo(f"変換元が見つかりません: {source_path}", err=True)
+        raise typer.Exit(code=1)
+    counts = shard_json_store(source_path, target or settings.json_shard_dir)
+    typer.echo(
+        f"forms={counts['forms']} submissions={counts['submissions']} files={counts['files']}"
+    )
+
+
+@cli.command()
+def migrate(
+    source: str = typer.Option(..., "--from", help="移行元のバックエンド（json|sqlite）"),
+    target: str = typer.Option(..., "--to", help="移行先のバックエンド（json|sqlite）"),
+    batch_size: int = typer.Option(SUBMISSION_BATCH_CHUNK_SIZE, help="1 回に読み書きする件数"),
+) -> None:
+    if source not in MIGRATION_BACKENDS or target not in MIGRATION_BACKENDS or source == target:
+        typer.echo("--from と --to には json / sqlite の異なる組み合わせを指定してください", err=True)
+        raise typer.Exit(code=1)
+    settings = Settings()
+    started = time.perf_counter()
+    last_report = 0.0
+
+    def progress(kind: str, count: int) -> None:
+        nonlocal last_report
+        elapsed = time.perf_counter() - started
+        if elapsed - last_report < 1.0:
+            return
+        last_report = elapsed
+        typer.echo(f"{kind}: {count} 件 ({count / elapsed:.0f} 件/秒)")
+
+    counts = migrate_storage(
+        init_storage(settings, source),
+        init_storage(settings, target),
+        batch_size=batch_size,
+        progress=progress,
+    )
+    elapsed = time.perf_counter() - started
+    typer.echo(
+        f"forms={counts['forms']} files={counts['files']} submissions={counts['submissions']} "
+        f"skipped={counts['skipped']} ({counts['submissions'] / max(elapsed, 1e-9):.0f} 件/秒, "
+        f"{elapsed:.1f} 秒)"
+    )
+
+
 def run_server(host: str | None, port: int | None) -> None:
     import uvicorn
 
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import math
+import threading
+from array import array
+from datetime import datetime
+from itertools import compress
+from typing import Any
+
+from schemaform.fields import get_nested_value
+from schemaform.filters import ensure_aware
+from schemaform.utils import parse_dt
+
+# 列で評価できる保存側の条件。残り（全文検索など）は従来どおり行ごとに評価する。
+COLUMN_KINDS = {
+    "submitted_from": "created",
+    "submitted_to": "created",
+    "min": "number",
+    "max": "number",
+    "eq": "code",
+    "bool": "bool",
+}
+MAX_DICTIONARY_SIZE = 65535
+BOOL_INVERT = bytes([1, 0]) + bytes(254)
+COMPACT_MIN_DEAD = 1024
+NAN = math.nan
+
+
+def _and(left: bytes, right: bytes) -> bytes:
+    # 0/1 のバイト列同士の AND を整数演算でまとめて行う
+    size = len(left)
+    return (int.from_bytes(left, "big") & int.from_bytes(right, "big")).to_bytes(size, "big")
+
+
+def _or(left: bytes, right: bytes) -> bytes:
+    size = len(left)
+    return (int.from_bytes(left, "big") | int.from_bytes(right, "big")).to_bytes(size, "big")
+
+
+def _field_value(record: dict[str, Any], key: str) -> Any:
+    data = record.get("data_json", {})
+    return get_nested_value(data, key) if isinstance(data, dict) else None
+
+
+def _created_timestamp(record: dict[str, Any]) -> float:
+    created_at = parse_dt(record.get("created_at"))
+    if not isinstance(created_at, datetime):
+        return NAN
+    return ensure_aware(created_at).timestamp()
+
+
+class FormColumns:
+    # 1 フォーム分の送信を列ごとのバッファで保持する。列は最初に条件で使われたときに作り、
+    # 以後は追加・削除のたびに差分で更新する。削除は墓標で表し、増えたら詰め直す。
+    def __init__(self) -> None:
+        self.records: list[dict[str, Any]] = []
+        self.positions: dict[str, int] = {}
+        self.alive = bytearray()
+        self.dead = 0
+        self.columns: dict[tuple[str, str], dict[str, Any] | None] = {}
+
+    def add(self, record: dict[str, Any]) -> None:
+        if record["id"] in self.positions:
+            self.remove(record["id"])
+        self.positions[record["id"]] = len(self.records)
+        self.records.append(record)
+        self.alive.append(1)
+        for column_key, column in self.columns.items():
+            if column is not None:
+                self._append(column_key, column, record)
+
+    def remove(self, record_id: str) -> None:
+        position = self.positions.pop(record_id, None)
+        if position is None:
+            return
+        self.alive[position] = 0
+        self.dead += 1
+        if self.dead >= COMPACT_MIN_DEAD and self.dead * 2 > len(self.records):
+            self._compact()
+
+    def _compact(self) -> None:
+        records = list(compress(self.records, self.alive))
+        self.records = records
+        self.positions = {record["id"]: index for index, record in enumerate(records)}
+        self.alive = bytearray(b"\x01" * len(records))
+        self.dead = 0
+        self.columns = {}
+
+    def _new_column(self, kind: str) -> dict[str, Any]:
+        if kind in {"created", "number"}:
+            return {"values": array("d"), "nulls": bytearray()}
+        if kind == "code":
+            return {"codes": array("H"), "dictionary": {}}
+        return {"values": bytearray()}
+
+    def _append(
+        self, column_key: tuple[str, str], column: dict[str, Any], record: dict[str, Any]
+    ) -> None:
+        kind, key = column_key
+        if kind == "created":
+            value = _created_timestamp(record)
+            column["values"].append(value)
+            column["nulls"].append(1 if math.isnan(value) else 0)
+            return
+        value = _field_value(record, key)
+        if kind == "number":
+            if value is None:
+                column["values"].append(NAN)
+                column["nulls"].append(1)
+            elif isinstance(value, (int, float)):
+                column["values"].append(float(value))
+                column["nulls"].append(0)
+            else:
+                # 数値以外が混ざる列は行ごとの評価に任せる
+                self.columns[column_key] = None
+        elif kind == "code":
+            dictionary = column["dictionary"]
+            code = dictionary.get(str(value))
+            if code is None:
+                if len(dictionary) >= MAX_DICTIONARY_SIZE:
+                    self.columns[column_key] = None
+                    return
+                code = dictionary[str(value)] = len(dictionary)
+            column["codes"].append(code)
+        elif kind == "bool":
+            column["values"].append(1 if value else 0)
+
+    def _column(self, kind: str, key: str) -> dict[str, Any] | None:
+        column_key = (kind, key)
+        if column_key not in self.columns:
+            self.columns[column_key] = self._new_column(kind)
+            for record in self.records:
+                column = self.columns[column_key]
+                if column is None:
+                    break
+                self._append(column_key, column, record)
+        return self.columns[column_key]
+
+    def _mask(self, predicate: dict[str, Any]) -> bytes | None:
+        op = predicate["op"]
+        kind = COLUMN_KINDS[op]
+        column = self._column(kind, predicate.get("key", ""))
+        if column is None:
+            return None
+        bound = predicate["value"]
+        if kind == "created":
+            # created_at を持たない行は従来どおり条件を満たす扱い
+            timestamp = bound.timestamp()
+            if op == "submitted_from":
+                return _or(bytes(map(timestamp.__le__, column["values"])), bytes(column["nulls"]))
+            return _or(bytes(map(timestamp.__ge__, column["values"])), bytes(column["nulls"]))
+        if kind == "number":
+            # 欠損は NaN なので比較は常に偽になる
+            if op == "min":
+                return bytes(map(bound.__le__, column["values"]))
+            return bytes(map(bound.__ge__, column["values"]))
+        if kind == "code":
+            code = column["dictionary"].get(bound)
+            if code is None:
+                return bytes(len(self.records))
+            return bytes(map(code.__eq__, column["codes"]))
+        values = bytes(column["values"])
+        return values if bound else values.translate(BOOL_INVERT)
+
+    def select(
+        self, predicates: list[dict[str, Any]]
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        mask = bytes(self.alive)
+        remaining: list[dict[str, Any]] = []
+        for predicate in predicates:
+            column_mask = None
+            if predicate["op"] in COLUMN_KINDS:
+                column_mask = self._mask(predicate)
+            if column_mask is None:
+                remaining.append(predicate)
+                continue
+            mask = _and(mask, column_mask)
+        return list(compress(self.records, mask)), remaining
+
+
+class ColumnarCache:
+    def __init__(self) -> None:
+        self._forms: dict[str, FormColumns] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._forms = {}
+
+    def put(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            form_columns = self._forms.get(record["form_id"])
+            if form_columns is None:
+                form_columns = self._forms[record["form_id"]] = FormColumns()
+            form_columns.add(record)
+
+    def remove(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            form_columns = self._forms.get(record["form_id"])
+            if form_columns is not None:
+                form_columns.remove(record["id"])
+
+    def select(
+        self, form_id: str, predicates: list[dict[str, Any]]
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        with self._lock:
+            form_columns = self._forms.get(form_id)
+            if form_columns is None:
+                return [], list(predicates)
+            return form_columns.select(predicates)
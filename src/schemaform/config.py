@@ -18,15 +18,83 @@ ALLOWED_TYPES = {
     "master",
 }
 KEY_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+PRAGMA_VALUE_PATTERN = re.compile(r"^-?[a-z0-9]+$")
+SUBMISSION_BATCH_CHUNK_SIZE = 500
+API_FILTER_BATCH_SIZE = 500
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
+JSON_MODES = ("file", "memory")
+JSON_LAYOUTS = ("single", "sharded")
+FSYNC_MODES = ("always", "batch", "never")
+
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "busy_timeout": "5000",
+        "mmap_size": "268435456",
+        "cache_size": "-65536",
+        "temp_store": "memory",
+    },
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_choice(name: str, default: str, choices: tuple[str, ...]) -> str:
+    value = os.getenv(name, "").strip().lower() or default
+    if value not in choices:
+        # 打ち間違いで既定値のまま動かないよう、起動時に止める
+        raise ValueError(f"{name}の値が不正です: {value}")
+    return value
+
 
 class Settings:
     def __init__(self) -> None:
         self.storage_backend = os.getenv("STORAGE_BACKEND", "sqlite").lower()
         self.sqlite_path = Path(os.getenv("SQLITE_PATH", "./data/app.db"))
+        self.sqlite_profile = os.getenv("SQLITE_PROFILE", "default").strip().lower()
+        if self.sqlite_profile not in SQLITE_PROFILES:
+            # 打ち間違いで PRAGMA なしのまま動かないよう、起動時に止める
+            raise ValueError(f"SQLITE_PROFILEが不正です: {self.sqlite_profile}")
+        self.sqlite_pragmas = dict(SQLITE_PROFILES[self.sqlite_profile])
+        for name in SQLITE_PROFILES["production"]:
+            env_name = f"SQLITE_{name.upper()}"
+            value = os.getenv(env_name, "").strip().lower()
+            if not value:
+                continue
+            if not PRAGMA_VALUE_PATTERN.match(value):
+                raise ValueError(f"{env_name}の値が不正です: {value}")
+            self.sqlite_pragmas[name] = value
+        self.sqlite_pool_size = _env_int("SQLITE_POOL_SIZE", 5)
+        self.sqlite_max_overflow = _env_int("SQLITE_MAX_OVERFLOW", 10)
+        self.sqlite_pool_timeout = _env_int("SQLITE_POOL_TIMEOUT", 30)
         self.json_path = Path(os.getenv("JSON_PATH", "./data/jsonstore.json"))
+        self.json_mode = _env_choice("JSON_MODE", "file", JSON_MODES)
+        self.json_columnar = os.getenv("JSON_COLUMNAR", "").lower() in {"1", "true", "on", "yes"}
+        self.json_ngram_index = os.getenv("JSON_NGRAM_INDEX", "").lower() in {"1", "true", "on", "yes"}
+        self.json_ngram_max_postings = _env_int("JSON_NGRAM_MAX_POSTINGS", 2_000_000)
+        self.json_fsync = _env_choice("JSON_FSYNC", "batch", FSYNC_MODES)
+        self.json_layout = _env_choice("JSON_LAYOUT", "single", JSON_LAYOUTS)
+        if self.json_mode == "memory" and self.json_layout == "sharded":
+            # memory モードは JSON_PATH の単一ファイルとジャーナルだけを扱う
+            raise ValueError("JSON_MODE=memory と JSON_LAYOUT=sharded は同時に指定できません")
+        self.json_shard_dir = Path(
+            os.getenv("JSON_SHARD_DIR", str(self.json_path.with_suffix("")))
+        )
+        self.filter_cache_size = _env_int("FILTER_CACHE_SIZE", 128)
+        self.filter_cache_max_rows = _env_int("FILTER_CACHE_MAX_ROWS", 1_000_000)
+        self.form_cache_size = _env_int("FORM_CACHE_SIZE", 256)
         self.upload_dir = Path(os.getenv("UPLOAD_DIR", "./data/uploads"))
         max_bytes = os.getenv("UPLOAD_MAX_BYTES")
         self.upload_max_bytes = int(max_bytes) if max_bytes else None
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+from numbers import Number
+from typing import Any, Callable, Iterator
+
+from jsonschema import Draft7Validator, ValidationError
+
+Check = Callable[[Any, tuple, list], None]
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _is_number(value: Any) -> bool:
+    value_type = type(value)
+    if value_type is int or value_type is float:
+        return True
+    return not isinstance(value, bool) and isinstance(value, Number)
+
+
+def _is_integer(value: Any) -> bool:
+    # Draft 7 では小数部のない float も integer として扱う
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+TYPE_CHECKS: dict[str, Callable[[Any], bool]] = {
+    "string": lambda value: isinstance(value, str),
+    "number": _is_number,
+    "integer": _is_integer,
+    "boolean": lambda value: isinstance(value, bool),
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "null": lambda value: value is None,
+}
+
+
+def _error(
+    message: str, keyword: str, value: Any, instance: Any, schema: dict[str, Any], path: tuple
+) -> ValidationError:
+    return ValidationError(
+        message,
+        validator=keyword,
+        validator_value=value,
+        instance=instance,
+        schema=schema,
+        path=path,
+    )
+
+
+def _compile_type(value: Any, schema: dict[str, Any]) -> Check:
+    types = [value] if isinstance(value, str) else value
+    if not isinstance(types, list) or not types or not all(name in TYPE_CHECKS for name in types):
+        raise _Unsupported("type")
+    reprs = ", ".join(repr(name) for name in types)
+    if len(types) == 1:
+        is_type = TYPE_CHECKS[types[0]]
+    else:
+        checks = [TYPE_CHECKS[name] for name in types]
+
+        def is_type(instance: Any) -> bool:
+            return any(check(instance) for check in checks)
+
+    def check(instance: Any, path: tuple, errors: list) -> None:
+        if not is_type(instance):
+            errors.append(
+                _error(f"{instance!r} is not of type {reprs}", "type", value, instance, schema, path)
+            )
+
+    return check
+
+
+def _compile_properties(value: Any, schema: dict[str, Any]) -> Check:
+    if not isinstance(value, dict):
+        raise _Unsupported("properties")
+    children = [(key, _compile(subschema)) for key, subschema in value.items()]
+
+    def check(instance: Any, path: tuple, errors: list) -> None:
+        if not isinstance(instance, dict):
+            return
+        for key, child in children:
+            if key in instance:
+                child(instance[key], path + (key,), errors)
+
+    return check
+
+
+def _compile_required(value: Any, schema: dict[str, Any]) -> Check:
+    if not isinstance(value, list) or not all(isinstance(key, str) for key in value):
+        raise _Unsupported("required")
+
+    def check(instance: Any, path: tuple, errors: list) -> None:
+        if not isinstance(instance, dict):
+            return
+        for key in value:
+            if key not in instance:
+                errors.append(
+                    _error(f"{key!r} is a required property", "required", value, instance, schema, path)
+                )
+
+    return check
+
+
+def _compile_items(value: Any, schema: dict[str, Any]) -> Check:
+    # タプル形式の items はビルダーが作らないので対象外
+    if not isinstance(value, dict):
+        raise _Unsupported("items")
+    child = _compile(value)
+
+    def check(instance: Any, path: tuple, errors: list) -> None:
+        if not isinstance(instance, list):
+            return
+        for index, item in enumerate(instance):
+            child(item, path + (index,), errors)
+
+    return check
+
+
+def _compile_enum(value: Any, schema: dict[str, Any]) -> Check:
+    # 文字列だけの選択肢なら jsonschema の equal は文字列同士の == と同じになる
+    if not isinstance(value, list) or not all(isinstance(option, str) for option in value):
+        raise _Unsupported("enum")
+    options = set(value)
+
+    def check(instance: Any, path: tuple, errors: list) -> None:
+        if not (isinstance(instance, str) and instance in options):
+            errors.append(
+                _error(f"{instance!r} is not one of {value!r}", "enum", value, instance, schema, path)
+            )
+
+    return check
+
+
+def _compile_minimum(value: Any, schema: dict[str, Any]) -> Check:
+    if not _is_number(value):
+        raise _Unsupported("minimum")
+
+    def check(instance: Any, path: tuple, errors: list) -> None:
+        if _is_number(instance) and instance < value:
+            errors.append(
+                _error(
+                    f"{instance!r} is less than the minimum of {value!r}",
+                    "minimum",
+                    value,
+                    instance,
+                    schema,
+                    path,
+                )
+            )
+
+    return check
+
+
+def _compile_maximum(value: Any, schema: dict[str, Any]) -> Check:
+    if not _is_number(value):
+        raise _Unsupported("maximum")
+
+    def check(instance: Any, path: tuple, errors: list) -> None:
+        if _is_number(instance) and instance > value:
+            errors.append(
+                _error(
+                    f"{instance!r} is greater than the maximum of {value!r}",
+                    "maximum",
+                    value,
+                    instance,
+                    schema,
+                    path,
+                )
+            )
+
+    return check
+
+
+KEYWORD_COMPILERS: dict[str, Callable[[Any, dict[str, Any]], Check]] = {
+    "type": _compile_type,
+    "properties": _compile_properties,
+    "required": _compile_required,
+    "items": _compile_items,
+    "enum": _compile_enum,
+    "minimum": _compile_minimum,
+    "maximum": _compile_maximum,
+}
+
+
+def _noop(instance: Any, path: tuple, errors: list) -> None:
+    return None
+
+
+def _compile(schema: Any) -> Check:
+    if not isinstance(schema, dict):
+        raise _Unsupported("schema")
+    # jsonschema と同じくキーワードをスキーマに書かれた順に評価し、エラーの順序もそろえる。
+    # format は検査器を渡していないので注釈扱い、未知のキーワード（x-* など）も無視される。
+    steps: list[Check] = []
+    for keyword, value in schema.items():
+        compiler = KEYWORD_COMPILERS.get(keyword)
+        if compiler is not None:
+            steps.append(compiler(value, schema))
+        elif keyword != "format" and keyword in Draft7Validator.VALIDATORS:
+            raise _Unsupported(keyword)
+    if not steps:
+        return _noop
+    if len(steps) == 1:
+        return steps[0]
+
+    def check(instance: Any, path: tuple, errors: list) -> None:
+        for step in steps:
+            step(instance, path, errors)
+
+    return check
+
+
+class CompiledValidator:
+    # ビルダーが作るスキーマ（型・選択肢・最小/最大・配列・入れ子のグループ）を
+    # クロージャに変換したもの。Draft7Validator と同じ順序・文言のエラーを返す。
+    def __init__(self, schema: dict[str, Any], check: Check) -> None:
+        self.schema = schema
+        self._check = check
+
+    def iter_errors(self, instance: Any) -> Iterator[ValidationError]:
+        errors: list[ValidationError] = []
+        self._check(instance, (), errors)
+        return iter(errors)
+
+    def is_valid(self, instance: Any) -> bool:
+        errors: list[ValidationError] = []
+        self._check(instance, (), errors)
+        return not errors
+
+
+def compile_validator(schema: Any) -> CompiledValidator | None:
+    try:
+        return CompiledValidator(schema, _compile(schema))
+    except _Unsupported:
+        return None
+
+
+def form_validator(schema: dict[str, Any]) -> CompiledValidator | Draft7Validator:
+    # 対応外のキーワードを含むスキーマ（API で直接登録されたものなど）は jsonschema で検証する
+    return compile_validator(schema) or Draft7Validator(schema)
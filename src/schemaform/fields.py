@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from copy import deepcopy
-from typing import Any
+from itertools import product
+from typing import Any, Iterator
 
 from schemaform.utils import dumps_json
 
@@ -166,6 +166,19 @@ def set_nested_value(data: dict[str, Any], dotted_key: str, value: Any) -> None:
     current[parts[-1]] = value
 
 
+def build_projection(keys: list[str], values: list[Any]) -> dict[str, Any]:
+    # 欠損と null は区別せず、値のあるキーだけを入れ子の dict に戻す。
+    data: dict[str, Any] = {}
+    for key, value in zip(keys, values):
+        if value is not None:
+            set_nested_value(data, key, value)
+    return data
+
+
+def project_data(data: dict[str, Any], keys: list[str]) -> dict[str, Any]:
+    return build_projection(keys, [get_nested_value(data, key) for key in keys])
+
+
 def clean_empty_recursive(data: Any) -> Any:
     if isinstance(data, dict):
         cleaned = {}
@@ -184,69 +197,141 @@ def clean_empty_recursive(data: Any) -> Any:
     return data
 
 
-def _expand_value_by_field(field: dict[str, Any], value: Any) -> list[Any]:
+# 行展開では値を複製せず元のデータを共有するので、展開後の行を書き換えないこと。
+
+
+def _value_count(field: dict[str, Any], value: Any) -> int:
     if field.get("type") != "group":
-        return [deepcopy(value)]
+        return 1
+    children = field.get("children") or []
+    if field.get("is_array"):
+        if not field.get("expand_rows") or not isinstance(value, list) or not value:
+            return 1
+        return sum(
+            _object_count(children, item) if isinstance(item, dict) else 1 for item in value
+        )
+    return _object_count(children, value if isinstance(value, dict) else {})
 
+
+def _object_count(fields: list[dict[str, Any]], source: dict[str, Any]) -> int:
+    total = 1
+    for field in fields:
+        total *= _value_count(field, source.get(field["key"]))
+    return total
+
+
+def _value_rows(
+    field: dict[str, Any], value: Any, start: int = 0, stop: int | None = None
+) -> list[Any]:
+    # 候補のうち start から stop まで（stop を含まない）だけを作る
+    if field.get("type") != "group":
+        return [value]
     children = field.get("children") or []
     if field.get("is_array"):
         if not field.get("expand_rows"):
-            if value is None:
-                return [[]]
-            return [deepcopy(value)]
+            return [[] if value is None else value]
         if not isinstance(value, list) or not value:
             return [{}]
-        expanded_items: list[Any] = []
+        rows: list[Any] = []
+        offset = 0
         for item in value:
-            if isinstance(item, dict):
-                item_variants = _expand_object_by_children(children, item)
-            else:
-                item_variants = [deepcopy(item)]
-            for item_variant in item_variants:
-                expanded_items.append(item_variant)
-        return expanded_items
-
-    if isinstance(value, dict):
-        return _expand_object_by_children(children, value)
-    return _expand_object_by_children(children, {})
-
+            if stop is not None and offset >= stop:
+                break
+            if not isinstance(item, dict):
+                if offset >= start:
+                    rows.append(item)
+                offset += 1
+                continue
+            if stop is None and offset >= start:
+                rows.extend(_iter_object_rows(children, item))
+                continue
+            count = _object_count(children, item)
+            if offset + count > start:
+                rows.extend(
+                    _iter_object_rows(
+                        children,
+                        item,
+                        max(start - offset, 0),
+                        None if stop is None else stop - offset,
+                    )
+                )
+            offset += count
+        return rows
+    return list(_iter_object_rows(children, value if isinstance(value, dict) else {}, start, stop))
 
-def _expand_object_by_children(children: list[dict[str, Any]], source: dict[str, Any]) -> list[dict[str, Any]]:
-    child_keys = {child["key"] for child in children}
-    base_extras = {k: deepcopy(v) for k, v in source.items() if k not in child_keys}
-    variants: list[dict[str, Any]] = [base_extras]
 
-    for child in children:
-        key = child["key"]
-        expanded_values = _expand_value_by_field(child, source.get(key))
-        next_variants: list[dict[str, Any]] = []
-        for base in variants:
-            for expanded_value in expanded_values:
-                row = dict(base)
-                row[key] = expanded_value
-                next_variants.append(row)
-        variants = next_variants
-
-    return variants or [base_extras]
+def _iter_object_rows(
+    fields: list[dict[str, Any]],
+    source: dict[str, Any],
+    start: int = 0,
+    stop: int | None = None,
+) -> Iterator[dict[str, Any]]:
+    # 項目ごとの候補だけを作り、直積は必要な範囲の行だけを組み立てる
+    keys = [field["key"] for field in fields]
+    key_set = set(keys)
+    extras = {k: v for k, v in source.items() if k not in key_set}
+    values = [source.get(key) for key in keys]
+    if not start and stop is None:
+        candidates = [_value_rows(field, value) for field, value in zip(fields, values)]
+        for combination in product(*candidates):
+            row = dict(extras)
+            row.update(zip(keys, combination))
+            yield row
+        return
+    # 飛ばす行は作らず、行数から開始位置を各項目の候補の位置（混合基数）に直し、
+    # 範囲内で使う候補だけを作る
+    sizes = [_value_count(field, value) for field, value in zip(fields, values)]
+    total = 1
+    for size in sizes:
+        total *= size
+    stop = total if stop is None else min(stop, total)
+    if start >= stop:
+        return
+    digits = [0] * len(sizes)
+    windows: list[dict[int, Any]] = [{} for _ in sizes]
+    block = 1
+    for index in reversed(range(len(sizes))):
+        size = sizes[index]
+        first = start // block
+        digits[index] = first % size
+        # この項目の位置が範囲内で何通り変わるか（一巡するなら全候補を使う）
+        steps = min((stop - 1) // block - first + 1, size)
+        low = digits[index]
+        high = min(low + steps, size)
+        windows[index].update(enumerate(_value_rows(fields[index], values[index], low, high), low))
+        if low + steps > size:
+            windows[index].update(enumerate(_value_rows(fields[index], values[index], 0, low + steps - size)))
+        block *= size
+    for _ in range(stop - start):
+        row = dict(extras)
+        row.update(zip(keys, [window[digit] for window, digit in zip(windows, digits)]))
+        yield row
+        for index in reversed(range(len(sizes))):
+            digits[index] += 1
+            if digits[index] < sizes[index]:
+                break
+            digits[index] = 0
+
+
+def count_group_array_rows(fields: list[dict[str, Any]], data: dict[str, Any]) -> int:
+    # 行を作らずに展開後の行数だけを数える
+    if not isinstance(data, dict):
+        return 1
+    return _object_count(fields, data)
 
 
-def expand_group_array_rows(fields: list[dict[str, Any]], data: dict[str, Any]) -> list[dict[str, Any]]:
+def iter_group_array_rows(
+    fields: list[dict[str, Any]],
+    data: dict[str, Any],
+    start: int = 0,
+    stop: int | None = None,
+) -> Iterator[dict[str, Any]]:
     if not isinstance(data, dict):
-        return [{}]
+        data = {}
+        fields = []
+    start = max(start, 0)
+    return _iter_object_rows(fields, data, start, None if stop is None else max(stop, start))
 
-    top_keys = {field["key"] for field in fields}
-    base_extras = {k: deepcopy(v) for k, v in data.items() if k not in top_keys}
-    variants: list[dict[str, Any]] = [base_extras]
 
-    for field in fields:
-        key = field["key"]
-        expanded_values = _expand_value_by_field(field, data.get(key))
-        next_variants: list[dict[str, Any]] = []
-        for base in variants:
-            for expanded_value in expanded_values:
-                row = dict(base)
-                row[key] = expanded_value
-                next_variants.append(row)
-        variants = next_variants
-
-    return variants or [base_extras]
+def expand_group_array_rows(fields: list[dict[str, Any]], data: dict[str, Any]) -> list[dict[str, Any]]:
+    return list(iter_group_array_rows(fields, data))
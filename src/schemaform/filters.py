@@ -3,16 +3,18 @@ from __future__ import annotations
 import base64
 import csv
 import io
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timezone
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable, Iterator
 
+from schemaform.config import KEY_PATTERN
 from schemaform.fields import (
-    flatten_fields,
-    flatten_filter_fields,
     format_array_group_value,
     get_nested_value,
+    project_data,
 )
-from schemaform.protocols import FileRepository
+from schemaform.form_cache import file_keys_of, filter_fields_of, row_fields_of
+from schemaform.protocols import AsyncFileRepository, FileRepository
 
 
 def parse_bool(value: Any) -> bool:
@@ -51,8 +53,7 @@ def collect_file_ids(
     submissions: list[dict[str, Any]], fields: list[dict[str, Any]]
 ) -> set[str]:
     ids: set[str] = set()
-    flat = flatten_fields(fields)
-    file_keys = {f["flat_key"] for f in flat if f["type"] == "file"}
+    file_keys = file_keys_of(fields)
     for submission in submissions:
         data = submission.get("data_json", {})
         for key in file_keys:
@@ -67,12 +68,19 @@ def collect_file_ids(
 
 
 def resolve_file_names(file_repo: FileRepository, file_ids: Iterable[str]) -> dict[str, str]:
-    mapping: dict[str, str] = {}
-    for file_id in file_ids:
-        file_meta = file_repo.get_file(file_id)
-        if file_meta:
-            mapping[file_id] = file_meta.get("original_name", "")
-    return mapping
+    ids = list(file_ids)
+    if not ids:
+        return {}
+    return {item["id"]: item.get("original_name", "") for item in file_repo.get_files(ids)}
+
+
+async def resolve_file_names_async(
+    file_repo: AsyncFileRepository, file_ids: Iterable[str]
+) -> dict[str, str]:
+    ids = list(file_ids)
+    if not ids:
+        return {}
+    return {item["id"]: item.get("original_name", "") for item in await file_repo.get_files(ids)}
 
 
 def value_to_text(value: Any, file_names: dict[str, str], use_file_names: bool) -> str:
@@ -89,184 +97,474 @@ def value_to_text(value: Any, file_names: dict[str, str], use_file_names: bool)
     return str(value)
 
 
-def apply_filters(
-    submissions: list[dict[str, Any]],
-    fields: list[dict[str, Any]],
+def iter_searchable_values(
+    field_list: list[dict[str, Any]],
+    current_data: Any,
+    file_names: dict[str, str],
+) -> Iterable[str]:
+    if not isinstance(current_data, dict):
+        return
+    for field in field_list:
+        key = field.get("key")
+        if not key or key not in current_data:
+            continue
+        value = current_data.get(key)
+        field_type = field.get("type")
+        is_array = bool(field.get("is_array"))
+
+        if field_type == "group":
+            children = field.get("children") or []
+            if is_array:
+                if isinstance(value, list):
+                    for item in value:
+                        yield from iter_searchable_values(children, item, file_names)
+            else:
+                yield from iter_searchable_values(children, value, file_names)
+            continue
+
+        if field_type == "file":
+            if is_array:
+                if isinstance(value, list):
+                    for item in value:
+                        if isinstance(item, str):
+                            file_name = file_names.get(item, "")
+                            if file_name:
+                                yield file_name
+            elif isinstance(value, str):
+                file_name = file_names.get(value, "")
+                if file_name:
+                    yield file_name
+            continue
+
+        if is_array:
+            if isinstance(value, list):
+                for item in value:
+                    if item not in (None, ""):
+                        yield str(item)
+        elif value not in (None, ""):
+            yield str(value)
+
+
+def build_search_text(
+    fields: list[dict[str, Any]], data: Any, file_names: dict[str, str]
+) -> str:
+    return " ".join(iter_searchable_values(fields, data, file_names)).lower()
+
+
+def search_fields_signature(fields: list[dict[str, Any]]) -> tuple:
+    # 検索用の文字列を左右する部分（キー・並び順・配列か・グループかファイルか）だけを取り出す
+    return tuple(
+        (
+            field.get("key"),
+            field.get("type") if field.get("type") in {"group", "file"} else "",
+            bool(field.get("is_array")),
+            search_fields_signature(field.get("children") or [])
+            if field.get("type") == "group"
+            else (),
+        )
+        for field in fields
+    )
+
+
+FilterPredicate = Callable[[dict[str, Any], dict[str, str]], bool]
+
+
+def _filter_values(current: Any, parts: list[str], idx: int = 0) -> list[Any]:
+    if idx >= len(parts):
+        if isinstance(current, list):
+            return list(current)
+        return [current]
+
+    key = parts[idx]
+    values: list[Any] = []
+    if isinstance(current, dict):
+        if key in current:
+            values.extend(_filter_values(current.get(key), parts, idx + 1))
+    elif isinstance(current, list):
+        for item in current:
+            values.extend(_filter_values(item, parts, idx))
+    return values
+
+
+def first_filter_value(data: Any, parts: list[str]) -> Any:
+    values = _filter_values(data, parts)
+    return values[0] if values else None
+
+
+def _created_at_predicate(from_dt: datetime | None, to_dt: datetime | None) -> FilterPredicate:
+    from_value = ensure_aware(from_dt) if from_dt else None
+    to_value = ensure_aware(to_dt) if to_dt else None
+
+    def predicate(submission: dict[str, Any], file_names: dict[str, str]) -> bool:
+        created_at = submission.get("created_at")
+        if not isinstance(created_at, datetime):
+            return True
+        created_value = ensure_aware(created_at)
+        if from_value and created_value < from_value:
+            return False
+        if to_value and created_value > to_value:
+            return False
+        return True
+
+    return predicate
+
+
+def _number_predicate(parts: list[str], min_raw: Any, max_raw: Any) -> FilterPredicate:
+    low = high = None
+    error: ValueError | None = None
+    try:
+        low = float(min_raw) if min_raw not in (None, "") else None
+        high = float(max_raw) if max_raw not in (None, "") else None
+    except ValueError as exc:
+        # 不正な値は従来どおり、値を持つ行を評価したときに失敗させる
+        error = exc
+
+    def predicate(submission: dict[str, Any], file_names: dict[str, str]) -> bool:
+        value = first_filter_value(submission.get("data_json", {}), parts)
+        if value is None:
+            return False
+        if error is not None:
+            raise error
+        if low is not None and value < low:
+            return False
+        if high is not None and value > high:
+            return False
+        return True
+
+    return predicate
+
+
+def _field_filter(
+    field: dict[str, Any],
     query_params: dict[str, Any],
-    file_names: dict[str, str] | None = None,
+    candidates: dict[str, set[str]] | None = None,
+) -> tuple[int, FilterPredicate] | None:
+    # 有効な絞り込み条件だけを (評価コスト, 判定関数) にする。コストが小さいものから評価する。
+    flat_key = field["flat_key"]
+    parts = flat_key.split(".")
+    param_key = f"f_{flat_key.replace('.', '__')}"
+    field_type = field["type"]
+    is_array = field.get("is_array", False)
+
+    if field_type in {"number", "integer"} and not is_array:
+        min_raw = query_params.get(f"{param_key}_min")
+        max_raw = query_params.get(f"{param_key}_max")
+        if min_raw in (None, "") and max_raw in (None, ""):
+            return None
+        return 1, _number_predicate(parts, min_raw, max_raw)
+
+    filter_value = str(query_params.get(param_key, "")).strip()
+    if not filter_value:
+        return None
+    needle = filter_value.lower()
+
+    if field_type == "group":
+        def group_predicate(submission: dict[str, Any], file_names: dict[str, str]) -> bool:
+            values = _filter_values(submission.get("data_json", {}), parts)
+            return any(needle in str(item).lower() for item in values)
+
+        return 4, group_predicate
+
+    if is_array:
+        def array_predicate(submission: dict[str, Any], file_names: dict[str, str]) -> bool:
+            values = _filter_values(submission.get("data_json", {}), parts)
+            items = [item for item in values if item not in (None, "")]
+            if field_type == "enum":
+                return filter_value in [str(item) for item in items]
+            if field_type == "file":
+                return any(
+                    needle in file_names.get(item, "").lower()
+                    for item in items
+                    if isinstance(item, str)
+                )
+            return any(needle in str(item).lower() for item in items)
+
+        return 3, array_predicate
+
+    if field_type == "enum":
+        def enum_predicate(submission: dict[str, Any], file_names: dict[str, str]) -> bool:
+            return str(first_filter_value(submission.get("data_json", {}), parts)) == filter_value
+
+        return 1, enum_predicate
+
+    if field_type == "boolean":
+        expected = needle in {"1", "true", "on", "yes"}
+
+        def boolean_predicate(submission: dict[str, Any], file_names: dict[str, str]) -> bool:
+            return bool(first_filter_value(submission.get("data_json", {}), parts)) == expected
+
+        return 1, boolean_predicate
+
+    # 部分一致の索引から候補が分かっていれば、候補外の行は値を見ずに落とす
+    allowed = (candidates or {}).get(flat_key)
+    cost = 0 if allowed is not None else 2
+
+    if field_type == "file":
+        def file_predicate(submission: dict[str, Any], file_names: dict[str, str]) -> bool:
+            if allowed is not None and submission["id"] not in allowed:
+                return False
+            value = first_filter_value(submission.get("data_json", {}), parts)
+            return needle in file_names.get(str(value), "").lower()
+
+        return cost, file_predicate
+
+    if field_type in {"string", "datetime", "date", "time"}:
+        def text_predicate(submission: dict[str, Any], file_names: dict[str, str]) -> bool:
+            if allowed is not None and submission["id"] not in allowed:
+                return False
+            value = first_filter_value(submission.get("data_json", {}), parts)
+            return needle in str(value or "").lower()
+
+        return cost, text_predicate
+    return None
+
+
+SUBSTRING_FIELD_TYPES = {"string", "datetime", "date", "time", "file"}
+
+
+def substring_filters(
+    fields: list[dict[str, Any]], query_params: dict[str, Any]
 ) -> list[dict[str, Any]]:
-    q = str(query_params.get("q", "")).strip().lower()
+    # 単一値の文字列・日付・ファイル名の部分一致条件。保存側の部分一致索引に渡す。
+    result: list[dict[str, Any]] = []
+    for field in filter_fields_of(fields):
+        if field.get("is_array") or field["type"] not in SUBSTRING_FIELD_TYPES:
+            continue
+        param_key = f"f_{field['flat_key'].replace('.', '__')}"
+        needle = str(query_params.get(param_key, "")).strip().lower()
+        if needle:
+            result.append({"key": field["flat_key"], "type": field["type"], "value": needle})
+    return result
+
+
+def compile_filters(
+    fields: list[dict[str, Any]],
+    query_params: dict[str, Any],
+    candidates: dict[str, set[str]] | None = None,
+) -> list[FilterPredicate]:
+    # クエリを一度だけ解釈して判定関数の列にする。ファイル名は実行時に渡すので、
+    # 同じ条件でページやバッチをまたいで使い回せる。
+    compiled: list[tuple[int, FilterPredicate]] = []
     from_dt = parse_query_datetime(query_params.get("submitted_from"))
     to_dt = parse_query_datetime(query_params.get("submitted_to"))
-    flat_fields = flatten_filter_fields(fields)
+    if from_dt or to_dt:
+        compiled.append((0, _created_at_predicate(from_dt, to_dt)))
+    for field in filter_fields_of(fields):
+        field_filter = _field_filter(field, query_params, candidates)
+        if field_filter is not None:
+            compiled.append(field_filter)
+    q = str(query_params.get("q", "")).strip().lower()
+    if q:
+        def free_text_predicate(submission: dict[str, Any], file_names: dict[str, str]) -> bool:
+            return q in build_search_text(fields, submission.get("data_json", {}), file_names)
+
+        compiled.append((9, free_text_predicate))
+    compiled.sort(key=lambda item: item[0])
+    return [predicate for _, predicate in compiled]
+
+
+def iter_filters(
+    submissions: Iterable[dict[str, Any]],
+    plan: list[FilterPredicate],
+    file_names: dict[str, str] | None = None,
+) -> Iterator[dict[str, Any]]:
+    # 並んだ行を順に判定して一致した行だけを返す。必要な件数がそろった時点で打ち切れる。
     resolved_file_names = file_names or {}
+    for submission in submissions:
+        for predicate in plan:
+            if not predicate(submission, resolved_file_names):
+                break
+        else:
+            yield submission
 
-    def get_filter_values(current: Any, dotted_key: str) -> list[Any]:
-        parts = dotted_key.split(".")
-
-        def walk(node: Any, idx: int) -> list[Any]:
-            if idx >= len(parts):
-                if isinstance(node, list):
-                    return list(node)
-                return [node]
-
-            key = parts[idx]
-            values: list[Any] = []
-            if isinstance(node, dict):
-                if key in node:
-                    values.extend(walk(node.get(key), idx + 1))
-            elif isinstance(node, list):
-                for item in node:
-                    values.extend(walk(item, idx))
-            return values
-
-        return walk(current, 0)
-
-    def iter_searchable_values(field_list: list[dict[str, Any]], current_data: Any) -> Iterable[str]:
-        if not isinstance(current_data, dict):
-            return
-        for field in field_list:
-            key = field.get("key")
-            if not key or key not in current_data:
-                continue
-            value = current_data.get(key)
-            field_type = field.get("type")
-            is_array = bool(field.get("is_array"))
-
-            if field_type == "group":
-                children = field.get("children") or []
-                if is_array:
-                    if isinstance(value, list):
-                        for item in value:
-                            yield from iter_searchable_values(children, item)
-                else:
-                    yield from iter_searchable_values(children, value)
-                continue
 
-            if field_type == "file":
-                if is_array:
-                    if isinstance(value, list):
-                        for item in value:
-                            if isinstance(item, str):
-                                file_name = resolved_file_names.get(item, "")
-                                if file_name:
-                                    yield file_name
-                elif isinstance(value, str):
-                    file_name = resolved_file_names.get(value, "")
-                    if file_name:
-                        yield file_name
-                continue
+def run_filters(
+    submissions: Iterable[dict[str, Any]],
+    plan: list[FilterPredicate],
+    file_names: dict[str, str] | None = None,
+) -> list[dict[str, Any]]:
+    if not plan:
+        return list(submissions)
+    return list(iter_filters(submissions, plan, file_names))
 
-            if is_array:
-                if isinstance(value, list):
-                    for item in value:
-                        if item not in (None, ""):
-                            yield str(item)
-            elif value not in (None, ""):
-                yield str(value)
 
-    def matches_free_text(data: dict[str, Any]) -> bool:
-        if not q:
-            return True
-        combined = " ".join(iter_searchable_values(fields, data)).lower()
-        return q in combined
+def apply_filters(
+    submissions: list[dict[str, Any]],
+    fields: list[dict[str, Any]],
+    query_params: dict[str, Any],
+    file_names: dict[str, str] | None = None,
+    candidates: dict[str, set[str]] | None = None,
+) -> list[dict[str, Any]]:
+    return run_filters(submissions, compile_filters(fields, query_params, candidates), file_names)
 
-    filtered: list[dict[str, Any]] = []
-    for submission in submissions:
-        created_at = submission.get("created_at")
-        if created_at and (from_dt or to_dt):
-            created_value = ensure_aware(created_at) if isinstance(created_at, datetime) else None
-            if created_value is not None:
-                if from_dt and created_value < ensure_aware(from_dt):
-                    continue
-                if to_dt and created_value > ensure_aware(to_dt):
-                    continue
-        data = submission.get("data_json", {})
-        if not matches_free_text(data):
+
+STORAGE_PREDICATE_PARAMS = {"submitted_from", "submitted_to"}
+# 日付は文字列の部分一致で、書式も強制していないため保存側へは渡さず行ごとに評価する。
+INDEXED_FIELD_TYPES = {"enum", "number", "integer", "boolean"}
+
+
+def indexable_filter_fields(fields: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    # 配列内の値は json_extract 1 つで取り出せないため、単一値のフィールドだけを対象にする。
+    result: list[dict[str, Any]] = []
+    for field in filter_fields_of(fields):
+        if field.get("is_array") or field.get("type") not in INDEXED_FIELD_TYPES:
+            continue
+        if not all(KEY_PATTERN.match(part) for part in field["flat_key"].split(".")):
+            continue
+        if field["type"] == "enum" and not all(
+            isinstance(value, str) for value in field.get("enum") or []
+        ):
             continue
-        ok = True
-        for field in flat_fields:
-            flat_key = field["flat_key"]
-            param_key = f"f_{flat_key.replace('.', '__')}"
-            values = get_filter_values(data, flat_key)
-            value = values[0] if values else None
-            field_type = field["type"]
-            is_array = field.get("is_array", False)
-
-            if field_type == "group":
-                filter_value = str(query_params.get(param_key, "")).strip()
-                if not filter_value:
-                    continue
-                if not any(filter_value.lower() in str(item).lower() for item in values):
-                    ok = False
-                    break
+        result.append(field)
+    return result
+
+
+def _field_predicates(
+    field: dict[str, Any], query_params: dict[str, Any]
+) -> tuple[list[dict[str, Any]], set[str]] | None:
+    flat_key = field["flat_key"]
+    param_key = f"f_{flat_key.replace('.', '__')}"
+    field_type = field["type"]
+    if field_type in {"number", "integer"}:
+        predicates: list[dict[str, Any]] = []
+        for suffix in ("min", "max"):
+            raw = query_params.get(f"{param_key}_{suffix}")
+            if raw in (None, ""):
                 continue
+            try:
+                bound = float(raw)
+            except (TypeError, ValueError):
+                return None
+            predicates.append({"op": suffix, "key": flat_key, "value": bound})
+        return predicates, {f"{param_key}_min", f"{param_key}_max"}
+
+    filter_value = str(query_params.get(param_key, "")).strip()
+    if not filter_value:
+        return [], {param_key}
+    if field_type == "enum":
+        return [{"op": "eq", "key": flat_key, "value": filter_value}], {param_key}
+    if field_type == "boolean":
+        expected = parse_bool(filter_value)
+        return [{"op": "bool", "key": flat_key, "value": expected}], {param_key}
+    return None
 
-            if is_array:
-                filter_value = str(query_params.get(param_key, "")).strip()
-                if not filter_value:
-                    continue
-                filter_value_lower = filter_value.lower()
-                items = [item for item in values if item not in (None, "")]
-                if field_type == "enum":
-                    if filter_value not in [str(item) for item in items]:
-                        ok = False
-                        break
-                elif field_type == "file":
-                    if not any(
-                        filter_value_lower in resolved_file_names.get(item, "").lower()
-                        for item in items
-                        if isinstance(item, str)
-                    ):
-                        ok = False
-                        break
-                else:
-                    if not any(filter_value_lower in str(item).lower() for item in items):
-                        ok = False
-                        break
-                continue
 
-            if field_type in {"string", "enum", "file", "datetime", "date", "time"}:
-                filter_value = str(query_params.get(param_key, "")).strip()
-                if not filter_value:
-                    continue
-                if field_type == "enum":
-                    if str(value) != filter_value:
-                        ok = False
-                        break
-                elif field_type == "file":
-                    file_name = resolved_file_names.get(str(value), "")
-                    if filter_value.lower() not in file_name.lower():
-                        ok = False
-                        break
-                else:
-                    if filter_value.lower() not in str(value or "").lower():
-                        ok = False
-                        break
-            elif field_type in {"number", "integer"}:
-                min_val = query_params.get(f"{param_key}_min")
-                max_val = query_params.get(f"{param_key}_max")
-                if min_val not in (None, "") or max_val not in (None, ""):
-                    if value is None:
-                        ok = False
-                        break
-                    if min_val not in (None, "") and value < float(min_val):
-                        ok = False
-                        break
-                    if max_val not in (None, "") and value > float(max_val):
-                        ok = False
-                        break
-            elif field_type == "boolean":
-                filter_value = str(query_params.get(param_key, "")).strip().lower()
-                if not filter_value:
-                    continue
-                expected = filter_value in {"1", "true", "on", "yes"}
-                if bool(value) != expected:
-                    ok = False
-                    break
-        if ok:
-            filtered.append(submission)
-    return filtered
+def split_storage_predicates(
+    query_params: dict[str, Any],
+    fields: list[dict[str, Any]] | None = None,
+    free_text: bool = True,
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    predicates: list[dict[str, Any]] = []
+    consumed = set(STORAGE_PREDICATE_PARAMS)
+    from_dt = parse_query_datetime(query_params.get("submitted_from"))
+    if from_dt:
+        predicates.append({"op": "submitted_from", "value": ensure_aware(from_dt)})
+    to_dt = parse_query_datetime(query_params.get("submitted_to"))
+    if to_dt:
+        predicates.append({"op": "submitted_to", "value": ensure_aware(to_dt)})
+    for field in indexable_filter_fields(fields or []):
+        pushed = _field_predicates(field, query_params)
+        if pushed is None:
+            continue
+        field_predicates, param_keys = pushed
+        predicates.extend(field_predicates)
+        consumed.update(param_keys)
+    q = str(query_params.get("q", "")).strip().lower()
+    if free_text and q:
+        # 全文検索は最も重いので最後に評価させる。
+        predicates.append({"op": "text", "value": q})
+        consumed.add("q")
+    residual = {key: value for key, value in query_params.items() if key not in consumed}
+    return predicates, residual
+
+
+def has_text_predicate(predicates: list[dict[str, Any]] | None) -> bool:
+    return any(predicate["op"] == "text" for predicate in predicates or [])
+
+
+def has_row_filters(query_params: dict[str, Any]) -> bool:
+    for key, value in query_params.items():
+        if key != "q" and not key.startswith("f_"):
+            continue
+        if str(value).strip():
+            return True
+    return False
+
+
+def _match_field_predicate(data: Any, predicate: dict[str, Any]) -> bool:
+    value = get_nested_value(data, predicate["key"]) if isinstance(data, dict) else None
+    op = predicate["op"]
+    if op == "eq":
+        return str(value) == predicate["value"]
+    if op == "min":
+        return value is not None and value >= predicate["value"]
+    if op == "max":
+        return value is not None and value <= predicate["value"]
+    if op == "bool":
+        return bool(value) == predicate["value"]
+    raise ValueError(f"unsupported predicate: {op}")
+
+
+def match_storage_predicates(
+    submission: dict[str, Any],
+    predicates: list[dict[str, Any]],
+    search_text: Callable[[dict[str, Any]], str] | None = None,
+) -> bool:
+    created_at = submission.get("created_at")
+    created_value = ensure_aware(created_at) if isinstance(created_at, datetime) else None
+    for predicate in predicates:
+        op = predicate["op"]
+        if op == "submitted_from":
+            if created_value is not None and created_value < predicate["value"]:
+                return False
+        elif op == "submitted_to":
+            if created_value is not None and created_value > predicate["value"]:
+                return False
+        elif op == "text":
+            if search_text is None:
+                raise ValueError("text predicate requires search_text")
+            if predicate["value"] not in search_text(submission):
+                return False
+        elif not _match_field_predicate(submission.get("data_json", {}), predicate):
+            return False
+    return True
+
+
+def submission_sort_key(submission: dict[str, Any]) -> tuple[datetime, str]:
+    return ensure_aware(submission["created_at"]), submission["id"]
+
+
+def query_submissions_in_memory(
+    submissions: list[dict[str, Any]],
+    predicates: list[dict[str, Any]] | None = None,
+    order: str = "desc",
+    limit: int | None = None,
+    after_cursor: tuple[datetime, str] | None = None,
+    search_text: Callable[[dict[str, Any]], str] | None = None,
+    project: list[str] | None = None,
+    offset: int = 0,
+) -> list[dict[str, Any]]:
+    rows = [
+        item
+        for item in submissions
+        if match_storage_predicates(item, predicates or [], search_text)
+    ]
+    rows.sort(key=submission_sort_key)
+    if after_cursor:
+        cursor_key = (ensure_aware(after_cursor[0]), after_cursor[1])
+        if order == "asc":
+            rows = rows[bisect_right(rows, cursor_key, key=submission_sort_key):]
+        else:
+            rows = rows[: bisect_left(rows, cursor_key, key=submission_sort_key)]
+    if order != "asc":
+        rows.reverse()
+    if offset or limit is not None:
+        rows = rows[offset : offset + limit if limit is not None else None]
+    if project is not None:
+        rows = [
+            {**row, "data_json": project_data(row.get("data_json", {}), project)} for row in rows
+        ]
+    return rows
 
 
 def encode_cursor(created_at: datetime, submission_id: str) -> str:
@@ -289,7 +587,7 @@ def csv_headers_and_rows(
     submissions: list[dict[str, Any]],
     file_names: dict[str, str],
 ) -> tuple[list[str], list[list[str]]]:
-    flat = flatten_fields(fields, expand_rows_for_group_arrays=True)
+    flat = row_fields_of(fields)
     max_lengths: dict[str, int] = {}
 
     for field in flat:
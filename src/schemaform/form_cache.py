@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable
+
+from schemaform.fast_validator import form_validator
+from schemaform.fields import flatten_fields, flatten_filter_fields
+from schemaform.schema import fields_from_schema
+from schemaform.utils import to_iso
+
+DEFAULT_FORM_CACHE_SIZE = 256
+
+
+def compile_form(form: dict[str, Any]) -> dict[str, Any]:
+    schema = form.get("schema_json") or {}
+    fields = fields_from_schema(schema, form.get("field_order") or [])
+    flat_fields = flatten_fields(fields)
+    filter_fields = flatten_filter_fields(fields)
+    return {
+        "fields": fields,
+        "flat_fields": flat_fields,
+        "row_fields": flatten_fields(fields, expand_rows_for_group_arrays=True),
+        "filter_fields": filter_fields,
+        "validator": form_validator(schema),
+        "file_keys": {field["flat_key"] for field in flat_fields if field["type"] == "file"},
+        "master_keys": {
+            field["flat_key"] for field in filter_fields if field["type"] == "master"
+        },
+        "field_map": {field["key"]: field for field in fields},
+    }
+
+
+class CompiledFormCache:
+    # フォームごとの項目定義・平坦化した一覧・バリデータを保持する LRU。
+    # キーに更新日時を含めるので、スキーマを編集すると次の参照で作り直される。
+    # 中身は共有されるため、呼び出し側で書き換えてはいけない。
+    def __init__(self, max_entries: int = DEFAULT_FORM_CACHE_SIZE) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Hashable, dict[str, Any]] = OrderedDict()
+        # 項目定義のリストから元のエントリを引くための表（id は保持中のエントリに限り一意）
+        self._trees: dict[int, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def resize(self, max_entries: int) -> None:
+        with self._lock:
+            self._max_entries = max_entries
+            self._trim()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = OrderedDict()
+            self._trees = {}
+
+    def _trim(self) -> None:
+        while self._entries and len(self._entries) > self._max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._trees.pop(id(evicted["fields"]), None)
+            self.evictions += 1
+
+    def get(self, form: dict[str, Any]) -> dict[str, Any]:
+        form_id = form.get("id")
+        if not form_id:
+            return compile_form(form)
+        # 保存方式によって日時のままか ISO 文字列かが異なるので、文字列にそろえる
+        updated_at = form.get("updated_at")
+        key = (form_id, to_iso(updated_at) if isinstance(updated_at, datetime) else str(updated_at))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = compile_form(form)
+        with self._lock:
+            if self._max_entries <= 0:
+                return entry
+            previous = self._entries.get(key)
+            if previous is not None:
+                # 同時に作られた場合は先に入った方を使う
+                return previous
+            self._entries[key] = entry
+            self._trees[id(entry["fields"])] = entry
+            self._trim()
+        return entry
+
+    def tree_entry(self, fields: list[dict[str, Any]]) -> dict[str, Any] | None:
+        entry = self._trees.get(id(fields))
+        if entry is None or entry["fields"] is not fields:
+            return None
+        return entry
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+            }
+
+
+FORM_CACHE = CompiledFormCache()
+
+
+def compiled_form(form: dict[str, Any]) -> dict[str, Any]:
+    return FORM_CACHE.get(form)
+
+
+def filter_fields_of(fields: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    entry = FORM_CACHE.tree_entry(fields)
+    return entry["filter_fields"] if entry is not None else flatten_filter_fields(fields)
+
+
+def file_keys_of(fields: list[dict[str, Any]]) -> set[str]:
+    entry = FORM_CACHE.tree_entry(fields)
+    if entry is not None:
+        return entry["file_keys"]
+    return {field["flat_key"] for field in flatten_fields(fields) if field["type"] == "file"}
+
+
+def row_fields_of(fields: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    entry = FORM_CACHE.tree_entry(fields)
+    if entry is not None:
+        return entry["row_fields"]
+    return flatten_fields(fields, expand_rows_for_group_arrays=True)
+
+
+def field_map_of(fields: list[dict[str, Any]]) -> dict[str, dict[str, Any]] | None:
+    entry = FORM_CACHE.tree_entry(fields)
+    return entry["field_map"] if entry is not None else None
+
+
+def detached_fields(fields: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    # マスタの選択肢は画面ごとに書き込むので、共有している項目定義を複製してから使う
+    return [
+        {**field, "children": detached_fields(field["children"])}
+        if field.get("children")
+        else {**field}
+        for field in fields
+    ]
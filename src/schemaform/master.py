@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
-from schemaform.schema import fields_from_schema
+from schemaform.form_cache import compiled_form, field_map_of
 from schemaform.utils import dumps_json, to_iso
 
 _MAX_MASTER_NEST_DEPTH = 6
@@ -32,7 +32,7 @@ def _get_form_fields(storage: Any, form_id: str, cache: dict[str, Any]) -> list[
         fields_cache[form_id] = []
         return []
 
-    fields = fields_from_schema(form.get("schema_json", {}), form.get("field_order", []))
+    fields = compiled_form(form)["fields"]
     fields_cache[form_id] = fields
     return fields
 
@@ -65,6 +65,9 @@ def _get_submission_by_id(
 
 
 def _get_field_map(fields: list[dict[str, Any]], cache: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    shared = field_map_of(fields)
+    if shared is not None:
+        return shared
     map_cache = cache.setdefault("field_map", {})
     cache_key = id(fields)
     if cache_key in map_cache:
@@ -536,7 +539,15 @@ def build_master_reference_context(storage: Any, field: dict[str, Any]) -> dict[
 
     records: list[dict[str, Any]] = []
     if source_form_id:
-        submissions = storage.submissions.list_submissions(source_form_id)
+        # ラベルと表示項目が辿るトップレベルのキーだけを取り出す。
+        project = sorted(
+            {
+                key.split(".", 1)[0]
+                for key in [effective_label_key, *fallback_keys, *effective_display_keys]
+                if key
+            }
+        )
+        submissions = storage.submissions.query_submissions(source_form_id, project=project)
         for index, submission in enumerate(submissions, start=1):
             submission_id = _as_non_empty_str(submission.get("id"))
             if not submission_id:
@@ -597,15 +608,22 @@ def enrich_master_options(storage: Any, fields: list[dict[str, Any]]) -> None:
         field["master_options"] = options
 
 
-def validate_master_references(storage: Any, fields: list[dict[str, Any]], data: dict[str, Any]) -> list[str]:
+def validate_master_references(
+    storage: Any,
+    fields: list[dict[str, Any]],
+    data: dict[str, Any],
+    id_cache: dict[str, set[str]] | None = None,
+) -> list[str]:
     errors: list[str] = []
-    id_cache: dict[str, set[str]] = {}
+    # 一括登録では呼び出し側がキャッシュを共有し、マスタの一覧取得を 1 回にする。
+    if id_cache is None:
+        id_cache = {}
 
     def valid_ids(form_id: str) -> set[str]:
         if form_id not in id_cache:
             id_cache[form_id] = {
                 str(item.get("id", ""))
-                for item in storage.submissions.list_submissions(form_id)
+                for item in storage.submissions.query_submissions(form_id, project=[])
                 if item.get("id")
             }
         return id_cache[form_id]
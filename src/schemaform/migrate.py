@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from schemaform.config import SUBMISSION_BATCH_CHUNK_SIZE
+from schemaform.protocols import Storage
+
+MIGRATION_BACKENDS = ("json", "sqlite")
+# JSON の file モードは書き込みのたびにファイル全体を書き直すので、書き込み単位を
+# 読み出し単位の倍々で、この倍数まで大きくしていく
+MIGRATION_WRITE_BATCHES = 64
+
+
+def migrate_storage(
+    source: Storage,
+    target: Storage,
+    batch_size: int = SUBMISSION_BATCH_CHUNK_SIZE,
+    progress: Callable[[str, int], None] | None = None,
+) -> dict[str, int]:
+    # バッチ単位で読み書きし、移行先にあるものは飛ばすので途中で止まっても再実行で続きから進む。
+    counts = {"forms": 0, "files": 0, "submissions": 0, "skipped": 0}
+
+    def report(kind: str, count: int) -> None:
+        counts[kind] += count
+        if progress:
+            progress(kind, counts[kind])
+
+    forms = source.forms.list_forms()
+    for form in forms:
+        if target.forms.get_form(form["id"]) is None:
+            target.forms.create_form(form)
+            report("forms", 1)
+        else:
+            counts["skipped"] += 1
+
+    for batch in source.files.iter_files(batch_size):
+        present = {
+            file_meta["id"]
+            for file_meta in target.files.get_files([file_meta["id"] for file_meta in batch])
+        }
+        missing = [file_meta for file_meta in batch if file_meta["id"] not in present]
+        counts["skipped"] += len(batch) - len(missing)
+        if missing:
+            target.files.create_files(missing)
+            report("files", len(missing))
+
+    write_size = batch_size
+    for form in forms:
+        pending: list[dict[str, Any]] = []
+        batches = source.submissions.iter_submissions(
+            form["id"], order="asc", batch_size=batch_size
+        )
+        for batch in batches:
+            pending.extend(batch)
+            if len(pending) < write_size:
+                continue
+            _copy_submissions(target, form["id"], pending, counts, report)
+            pending = []
+            write_size = min(write_size * 2, batch_size * MIGRATION_WRITE_BATCHES)
+        if pending:
+            _copy_submissions(target, form["id"], pending, counts, report)
+    return counts
+
+
+def _copy_submissions(
+    target: Storage,
+    form_id: str,
+    submissions: list[dict[str, Any]],
+    counts: dict[str, int],
+    report: Callable[[str, int], None],
+) -> None:
+    # 移行先にある行は ID をまとめて 1 回で引いて除く
+    present = {
+        item["id"]
+        for item in target.submissions.get_submissions(
+            form_id, [submission["id"] for submission in submissions]
+        )
+    }
+    missing = [submission for submission in submissions if submission["id"] not in present]
+    counts["skipped"] += len(submissions) - len(missing)
+    if missing:
+        target.submissions.create_submissions(missing)
+        report("submissions", len(missing))
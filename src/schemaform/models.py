@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -26,10 +26,14 @@ class SubmissionModel(Base):
     __tablename__ = "submissions"
 
     id = Column(String, primary_key=True)
-    form_id = Column(String, index=True)
+    form_id = Column(String)
     data_json = Column(Text)
     created_at = Column(DateTime)
 
+    __table_args__ = (
+        Index("ix_submissions_form_created_id", form_id, created_at.desc(), id.desc()),
+    )
+
 
 class FileModel(Base):
     __tablename__ = "files"
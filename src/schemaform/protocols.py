@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Any, Protocol
+from datetime import datetime
+from typing import Any, Iterator, Protocol
 
 
 class FormRepository(Protocol):
@@ -22,18 +23,157 @@ class FormRepository(Protocol):
 class SubmissionRepository(Protocol):
     def list_submissions(self, form_id: str) -> list[dict[str, Any]]: ...
 
+    def query_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        limit: int | None = None,
+        after_cursor: tuple[datetime, str] | None = None,
+        project: list[str] | None = None,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]: ...
+
+    def count_submissions(
+        self, form_id: str, predicates: list[dict[str, Any]] | None = None
+    ) -> int: ...
+
+    def page_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        limit: int,
+        offset: int,
+    ) -> tuple[int, list[dict[str, Any]]]: ...
+
+    def aggregate_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        specs: list[dict[str, Any]],
+        bins: int,
+    ) -> dict[str, Any]: ...
+
+    def get_submissions(
+        self, form_id: str, submission_ids: list[str]
+    ) -> list[dict[str, Any]]: ...
+
+    def data_version(self, form_id: str) -> str: ...
+
+    def iter_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        batch_size: int = 500,
+        after_cursor: tuple[datetime, str] | None = None,
+    ) -> Iterator[list[dict[str, Any]]]: ...
+
     def create_submission(self, submission: dict[str, Any]) -> None: ...
 
-    def delete_submission(self, submission_id: str) -> None: ...
+    def create_submissions(self, submissions: list[dict[str, Any]]) -> None: ...
+
+    def delete_submission(self, submission_id: str, form_id: str | None = None) -> None: ...
+
+    def substring_candidates(
+        self, form_id: str, filters: list[dict[str, Any]]
+    ) -> dict[str, set[str]]: ...
 
 
 class FileRepository(Protocol):
     def create_file(self, file_meta: dict[str, Any]) -> None: ...
 
+    def create_files(self, files: list[dict[str, Any]]) -> None: ...
+
+    def iter_files(self, batch_size: int = 500) -> Iterator[list[dict[str, Any]]]: ...
+
     def get_file(self, file_id: str) -> dict[str, Any] | None: ...
 
+    def get_files(self, file_ids: list[str]) -> list[dict[str, Any]]: ...
+
 
 class Storage(Protocol):
     forms: FormRepository
     submissions: SubmissionRepository
     files: FileRepository
+
+
+class AsyncFormRepository(Protocol):
+    async def list_forms(self) -> list[dict[str, Any]]: ...
+
+    async def get_form(self, form_id: str) -> dict[str, Any] | None: ...
+
+    async def get_form_by_public_id(self, public_id: str) -> dict[str, Any] | None: ...
+
+    async def create_form(self, form: dict[str, Any]) -> None: ...
+
+    async def update_form(self, form_id: str, updates: dict[str, Any]) -> dict[str, Any]: ...
+
+    async def set_status(self, form_id: str, status: str) -> None: ...
+
+    async def delete_form(self, form_id: str) -> None: ...
+
+
+class AsyncSubmissionRepository(Protocol):
+    async def list_submissions(self, form_id: str) -> list[dict[str, Any]]: ...
+
+    async def query_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        limit: int | None = None,
+        after_cursor: tuple[datetime, str] | None = None,
+        project: list[str] | None = None,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]: ...
+
+    async def count_submissions(
+        self, form_id: str, predicates: list[dict[str, Any]] | None = None
+    ) -> int: ...
+
+    async def page_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        limit: int,
+        offset: int,
+    ) -> tuple[int, list[dict[str, Any]]]: ...
+
+    async def aggregate_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        specs: list[dict[str, Any]],
+        bins: int,
+    ) -> dict[str, Any]: ...
+
+    async def get_submissions(
+        self, form_id: str, submission_ids: list[str]
+    ) -> list[dict[str, Any]]: ...
+
+    async def data_version(self, form_id: str) -> str: ...
+
+    async def create_submission(self, submission: dict[str, Any]) -> None: ...
+
+    async def create_submissions(self, submissions: list[dict[str, Any]]) -> None: ...
+
+    async def delete_submission(self, submission_id: str, form_id: str | None = None) -> None: ...
+
+    async def substring_candidates(
+        self, form_id: str, filters: list[dict[str, Any]]
+    ) -> dict[str, set[str]]: ...
+
+
+class AsyncFileRepository(Protocol):
+    async def create_file(self, file_meta: dict[str, Any]) -> None: ...
+
+    async def get_file(self, file_id: str) -> dict[str, Any] | None: ...
+
+    async def get_files(self, file_ids: list[str]) -> list[dict[str, Any]]: ...
+
+
+class AsyncStorage(Protocol):
+    forms: AsyncFormRepository
+    submissions: AsyncSubmissionRepository
+    files: AsyncFileRepository
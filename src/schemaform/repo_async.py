@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from schemaform.protocols import Storage
+
+
+class ThreadedAsyncRepo:
+    def __init__(self, repo: Any) -> None:
+        self._repo = repo
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        method = getattr(self._repo, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await run_in_threadpool(method, *args, **kwargs)
+
+        return call
+
+
+class ThreadedAsyncStorage:
+    # ネイティブな非同期実装がないバックエンドをスレッドプール経由で await 可能にする。
+    def __init__(self, storage: Storage) -> None:
+        self.forms = ThreadedAsyncRepo(storage.forms)
+        self.submissions = ThreadedAsyncRepo(storage.submissions)
+        self.files = ThreadedAsyncRepo(storage.files)
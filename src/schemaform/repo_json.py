@@ -1,29 +1,178 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import re
+import threading
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
 
+import orjson
 from filelock import FileLock
 from tinydb import Query, TinyDB
+from tinydb.table import Table
+from tinydb.storages import Storage
 
+from schemaform.columnar import ColumnarCache
+from schemaform.config import FSYNC_MODES
+from schemaform.filters import (
+    build_search_text,
+    collect_file_ids,
+    has_text_predicate,
+    query_submissions_in_memory,
+    search_fields_signature,
+    submission_sort_key,
+)
+from schemaform.form_cache import compiled_form
+from schemaform.schema import fields_from_schema
+from schemaform.stats import aggregate_submissions
+from schemaform.substring_index import SubstringIndex
 from schemaform.utils import now_utc, parse_dt, to_iso
 
 
+def _fsync_path(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_file(path: Path, payload: bytes, fsync: str) -> None:
+    # rename で置き換える前に中身を書き切っておかないと、落ちたときに空のファイルが残る
+    with path.open("wb") as handle:
+        handle.write(payload)
+        if fsync != "never":
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+def file_version(path: Path) -> str:
+    # 書き込みは一時ファイルからの rename なので、inode・更新時刻・大きさのどれかが必ず変わる
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "0"
+    return f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class OrjsonStorage(Storage):
+    # orjson で書き出し、一時ファイルからの rename で置き換える TinyDB ストレージ。
+    # 一時ファイルは rename の前に必ず fsync する（never を除く）。ディレクトリの fsync は
+    # always なら書き込みごと、batch なら開いている間の最後の書き込みを閉じるときに 1 回、
+    # never は OS に任せる。
+    def __init__(self, path: str | Path, fsync: str = "batch") -> None:
+        self._path = Path(path)
+        self._fsync = fsync if fsync in FSYNC_MODES else "batch"
+        self._dirty = False
+
+    def read(self) -> dict[str, dict[str, Any]] | None:
+        try:
+            raw = self._path.read_bytes()
+        except FileNotFoundError:
+            return None
+        if not raw.strip():
+            return None
+        return orjson.loads(raw)
+
+    def write(self, data: dict[str, dict[str, Any]]) -> None:
+        temp_path = self._path.with_name(f"{self._path.name}.tmp")
+        _write_file(temp_path, orjson.dumps(data), self._fsync)
+        os.replace(temp_path, self._path)
+        if self._fsync == "always":
+            _fsync_path(self._path.parent)
+        self._dirty = True
+
+    def close(self) -> None:
+        if self._fsync == "batch" and self._dirty:
+            _fsync_path(self._path.parent)
+        self._dirty = False
+
+
+@contextmanager
+def open_db(path: Path, lock: FileLock, fsync: str = "batch") -> Iterable[TinyDB]:
+    with lock:
+        db = TinyDB(path, storage=OrjsonStorage, fsync=fsync)
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+SEARCH_TEXT_KEY = "search_text"
+
+
+def attach_search_text(
+    records: list[dict[str, Any]],
+    form_for: Callable[[str], dict[str, Any] | None],
+    file_names_for: Callable[[set[str]], dict[str, str]],
+) -> list[dict[str, Any]]:
+    # q の判定で毎回組み立てないよう、検索用テキストは書き込み時に作って記録に持たせる。
+    grouped: dict[str, list[dict[str, Any]]] = {}
+    for record in records:
+        grouped.setdefault(record["form_id"], []).append(record)
+    for form_id, form_records in grouped.items():
+        form = form_for(form_id) or {}
+        fields = compiled_form(form)["fields"]
+        file_ids = collect_file_ids(form_records, fields)
+        file_names = file_names_for(file_ids) if file_ids else {}
+        for record in form_records:
+            record[SEARCH_TEXT_KEY] = build_search_text(
+                fields, record.get("data_json", {}), file_names
+            )
+    return records
+
+
+def tinydb_form_lookup(forms: Table) -> Callable[[str], dict[str, Any] | None]:
+    return lambda form_id: forms.get(Query().id == form_id)
+
+
+def tinydb_file_names(files: Table) -> Callable[[set[str]], dict[str, str]]:
+    return lambda file_ids: {
+        item["id"]: item.get("original_name", "")
+        for item in files.search(Query().id.one_of(list(file_ids)))
+    }
+
+
+def search_text_changed(before: dict[str, Any], after: dict[str, Any]) -> bool:
+    # 表示名や選択肢だけの変更では検索用テキストは変わらない
+    return search_fields_signature(
+        fields_from_schema(before.get("schema_json") or {}, before.get("field_order") or [])
+    ) != search_fields_signature(
+        fields_from_schema(after.get("schema_json") or {}, after.get("field_order") or [])
+    )
+
+
+def refresh_search_text(
+    submissions: Table,
+    form: dict[str, Any],
+    file_names_for: Callable[[set[str]], dict[str, str]],
+) -> None:
+    # 検索対象の項目が変わったときだけ、そのフォームの検索用テキストを作り直す
+    records = [dict(item) for item in submissions.search(Query().form_id == form["id"])]
+    if not records:
+        return
+    attach_search_text(records, lambda _: form, file_names_for)
+    blobs = {record["id"]: record[SEARCH_TEXT_KEY] for record in records}
+
+    def apply(document: dict[str, Any]) -> None:
+        document[SEARCH_TEXT_KEY] = blobs[document["id"]]
+
+    submissions.update(apply, Query().form_id == form["id"])
+
+
 class JSONRepoBase:
-    def __init__(self, path: Path, lock: FileLock) -> None:
+    def __init__(self, path: Path, lock: FileLock, fsync: str = "batch") -> None:
         self._path = path
         self._lock = lock
+        self._fsync = fsync
 
     @contextmanager
     def _db(self) -> Iterable[TinyDB]:
-        with self._lock:
-            db = TinyDB(self._path)
-            try:
-                yield db
-            finally:
-                db.close()
+        with open_db(self._path, self._lock, self._fsync) as db:
+            yield db
 
 
 class JSONFormRepo(JSONRepoBase):
@@ -52,14 +201,25 @@ class JSONFormRepo(JSONRepoBase):
 
     def update_form(self, form_id: str, updates: dict[str, Any]) -> dict[str, Any]:
         with self._db() as db:
-            table = db.table("forms")
-            item = table.get(Query().id == form_id)
-            if not item:
-                raise KeyError(form_id)
-            item.update(self._to_record(updates, partial=True))
-            table.update(item, Query().id == form_id)
+            previous, item = self._update_record(db, form_id, updates)
+            if search_text_changed(previous, item):
+                refresh_search_text(
+                    db.table("submissions"), item, tinydb_file_names(db.table("files"))
+                )
         return self._from_record(item)
 
+    def _update_record(
+        self, db: TinyDB, form_id: str, updates: dict[str, Any]
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        table = db.table("forms")
+        item = table.get(Query().id == form_id)
+        if not item:
+            raise KeyError(form_id)
+        previous = dict(item)
+        item.update(self._to_record(updates, partial=True))
+        table.update(item, Query().id == form_id)
+        return previous, item
+
     def set_status(self, form_id: str, status: str) -> None:
         with self._db() as db:
             table = db.table("forms")
@@ -107,16 +267,146 @@ class JSONSubmissionRepo(JSONRepoBase):
         with self._db() as db:
             items = db.table("submissions").search(Query().form_id == form_id)
         submissions = [self._from_record(item) for item in items]
-        return sorted(submissions, key=lambda x: x["created_at"], reverse=True)
+        return sorted(submissions, key=submission_sort_key, reverse=True)
+
+    def query_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        limit: int | None = None,
+        after_cursor: tuple[datetime, str] | None = None,
+        project: list[str] | None = None,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        search_text = None
+        with self._db() as db:
+            items = db.table("submissions").search(Query().form_id == form_id)
+            if has_text_predicate(predicates):
+                search_text = self._stored_search_text(
+                    items,
+                    lambda: self._search_text_builder(
+                        db.table("forms").get(Query().id == form_id), db.table("files").all()
+                    ),
+                )
+        return query_submissions_in_memory(
+            [self._from_record(item) for item in items],
+            predicates=predicates,
+            order=order,
+            limit=limit,
+            after_cursor=after_cursor,
+            search_text=search_text,
+            project=project,
+            offset=offset,
+        )
+
+    def count_submissions(
+        self, form_id: str, predicates: list[dict[str, Any]] | None = None
+    ) -> int:
+        return len(self.query_submissions(form_id, predicates))
+
+    def page_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        limit: int,
+        offset: int,
+    ) -> tuple[int, list[dict[str, Any]]]:
+        # 件数を数えるための読み込みとページの読み込みを 1 回にまとめる
+        rows = self.query_submissions(form_id, predicates)
+        return len(rows), rows[offset : offset + limit]
+
+    def aggregate_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        specs: list[dict[str, Any]],
+        bins: int,
+    ) -> dict[str, Any]:
+        return aggregate_submissions(self.query_submissions(form_id, predicates), specs, bins)
+
+    def get_submissions(self, form_id: str, submission_ids: list[str]) -> list[dict[str, Any]]:
+        with self._db() as db:
+            items = db.table("submissions").search(Query().form_id == form_id)
+        return self._pick(items, submission_ids)
+
+    def data_version(self, form_id: str) -> str:
+        return file_version(self._path)
+
+    @classmethod
+    def _pick(
+        cls, items: Iterable[dict[str, Any]], submission_ids: list[str]
+    ) -> list[dict[str, Any]]:
+        by_id = {item["id"]: item for item in items}
+        return [
+            cls._from_record(by_id[submission_id])
+            for submission_id in submission_ids
+            if submission_id in by_id
+        ]
+
+    def iter_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        batch_size: int = 500,
+        after_cursor: tuple[datetime, str] | None = None,
+    ) -> Iterator[list[dict[str, Any]]]:
+        rows = self.query_submissions(form_id, predicates, order=order, after_cursor=after_cursor)
+        for start in range(0, len(rows), batch_size):
+            yield rows[start : start + batch_size]
 
     def create_submission(self, submission: dict[str, Any]) -> None:
-        record = self._to_record(submission)
+        self.create_submissions([submission])
+
+    def create_submissions(self, submissions: list[dict[str, Any]]) -> None:
+        records = [self._to_record(submission) for submission in submissions]
         with self._db() as db:
-            db.table("submissions").insert(record)
+            attach_search_text(
+                records,
+                tinydb_form_lookup(db.table("forms")),
+                tinydb_file_names(db.table("files")),
+            )
+            db.table("submissions").insert_multiple(records)
 
-    def delete_submission(self, submission_id: str) -> None:
+    def delete_submission(self, submission_id: str, form_id: str | None = None) -> None:
+        condition = Query().id == submission_id
+        if form_id is not None:
+            condition &= Query().form_id == form_id
         with self._db() as db:
-            db.table("submissions").remove(Query().id == submission_id)
+            db.table("submissions").remove(condition)
+
+    def substring_candidates(
+        self, form_id: str, filters: list[dict[str, Any]]
+    ) -> dict[str, set[str]]:
+        return {}
+
+    @staticmethod
+    def _stored_search_text(
+        items: list[dict[str, Any]],
+        fallback: Callable[[], Callable[[dict[str, Any]], str]],
+    ) -> Callable[[dict[str, Any]], str]:
+        blobs = {item["id"]: item.get(SEARCH_TEXT_KEY) for item in items}
+        if all(blob is not None for blob in blobs.values()):
+            return lambda submission: blobs[submission["id"]]
+        # 検索用テキストを持たない以前の記録は、その場で組み立てる
+        build = fallback()
+        return lambda submission: (
+            blobs[submission["id"]]
+            if blobs.get(submission["id"]) is not None
+            else build(submission)
+        )
+
+    @staticmethod
+    def _search_text_builder(
+        form: dict[str, Any] | None, files: Iterable[dict[str, Any]]
+    ) -> Callable[[dict[str, Any]], str]:
+        form = form or {}
+        fields = compiled_form(form)["fields"]
+        file_names = {item["id"]: item.get("original_name", "") for item in files}
+        return lambda submission: build_search_text(
+            fields, submission.get("data_json", {}), file_names
+        )
 
     @staticmethod
     def _to_record(submission: dict[str, Any]) -> dict[str, Any]:
@@ -143,11 +433,27 @@ class JSONFileRepo(JSONRepoBase):
         with self._db() as db:
             db.table("files").insert(record)
 
+    def create_files(self, files: list[dict[str, Any]]) -> None:
+        records = [self._to_record(file_meta) for file_meta in files]
+        with self._db() as db:
+            db.table("files").insert_multiple(records)
+
+    def iter_files(self, batch_size: int = 500) -> Iterator[list[dict[str, Any]]]:
+        with self._db() as db:
+            items = db.table("files").all()
+        for start in range(0, len(items), batch_size):
+            yield [self._from_record(item) for item in items[start : start + batch_size]]
+
     def get_file(self, file_id: str) -> dict[str, Any] | None:
         with self._db() as db:
             item = db.table("files").get(Query().id == file_id)
         return self._from_record(item) if item else None
 
+    def get_files(self, file_ids: list[str]) -> list[dict[str, Any]]:
+        with self._db() as db:
+            items = db.table("files").search(Query().id.one_of(list(file_ids)))
+        return [self._from_record(item) for item in items]
+
     @staticmethod
     def _to_record(file_meta: dict[str, Any]) -> dict[str, Any]:
         return {
@@ -174,8 +480,647 @@ class JSONFileRepo(JSONRepoBase):
 
 
 class JSONStorage:
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path, fsync: str = "batch") -> None:
+        self._lock = FileLock(f"{path}.lock")
+        self.forms = JSONFormRepo(path, self._lock, fsync)
+        self.submissions = JSONSubmissionRepo(path, self._lock, fsync)
+        self.files = JSONFileRepo(path, self._lock, fsync)
+
+
+SHARD_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class JSONShardLayout:
+    # forms.json / files.json と、フォームごとの submissions/<form_id>.json に分ける。
+    # ロックはファイル単位なので、書き込みは対象フォームのファイルだけを直列化する。
+    def __init__(self, root: Path, fsync: str = "batch") -> None:
+        self.root = root
+        self.fsync = fsync
+        self.forms_path = root / "forms.json"
+        self.files_path = root / "files.json"
+        self.submissions_dir = root / "submissions"
+        self.submissions_dir.mkdir(parents=True, exist_ok=True)
+        self._locks: dict[Path, FileLock] = {}
+        self._locks_mutex = threading.Lock()
+
+    def lock(self, path: Path) -> FileLock:
+        with self._locks_mutex:
+            lock = self._locks.get(path)
+            if lock is None:
+                lock = self._locks[path] = FileLock(f"{path}.lock")
+            return lock
+
+    def submissions_path(self, form_id: str) -> Path:
+        name = form_id
+        if not SHARD_NAME_PATTERN.match(form_id):
+            name = hashlib.sha1(form_id.encode("utf-8")).hexdigest()
+        return self.submissions_dir / f"{name}.json"
+
+    def submission_shards(self) -> list[Path]:
+        return sorted(self.submissions_dir.glob("*.json"))
+
+
+class JSONShardedSubmissionRepo(JSONSubmissionRepo):
+    def __init__(self, layout: JSONShardLayout) -> None:
+        self._layout = layout
+
+    def _shard(self, path: Path) -> Iterable[TinyDB]:
+        return open_db(path, self._layout.lock(path), self._layout.fsync)
+
+    def _shard_items(self, form_id: str) -> list[dict[str, Any]]:
+        path = self._layout.submissions_path(form_id)
+        if not path.exists():
+            return []
+        with self._shard(path) as db:
+            return db.table("submissions").search(Query().form_id == form_id)
+
+    def list_submissions(self, form_id: str) -> list[dict[str, Any]]:
+        submissions = [self._from_record(item) for item in self._shard_items(form_id)]
+        return sorted(submissions, key=submission_sort_key, reverse=True)
+
+    def get_submissions(self, form_id: str, submission_ids: list[str]) -> list[dict[str, Any]]:
+        return self._pick(self._shard_items(form_id), submission_ids)
+
+    def data_version(self, form_id: str) -> str:
+        return file_version(self._layout.submissions_path(form_id))
+
+    def query_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        limit: int | None = None,
+        after_cursor: tuple[datetime, str] | None = None,
+        project: list[str] | None = None,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        items = self._shard_items(form_id)
+        search_text = None
+        if has_text_predicate(predicates):
+            search_text = self._stored_search_text(
+                items, lambda: self._load_search_text_builder(form_id)
+            )
+        return query_submissions_in_memory(
+            [self._from_record(item) for item in items],
+            predicates=predicates,
+            order=order,
+            limit=limit,
+            after_cursor=after_cursor,
+            search_text=search_text,
+            project=project,
+            offset=offset,
+        )
+
+    def _load_search_text_builder(self, form_id: str) -> Callable[[dict[str, Any]], str]:
+        with self._shard(self._layout.forms_path) as db:
+            form = db.table("forms").get(Query().id == form_id)
+        with self._shard(self._layout.files_path) as db:
+            files = db.table("files").all()
+        return self._search_text_builder(form, files)
+
+    def _file_names(self, file_ids: set[str]) -> dict[str, str]:
+        with self._shard(self._layout.files_path) as db:
+            return tinydb_file_names(db.table("files"))(file_ids)
+
+    def _form(self, form_id: str) -> dict[str, Any] | None:
+        with self._shard(self._layout.forms_path) as db:
+            return db.table("forms").get(Query().id == form_id)
+
+    def refresh_search_text(self, form: dict[str, Any]) -> None:
+        path = self._layout.submissions_path(form["id"])
+        if not path.exists():
+            return
+        with self._shard(path) as db:
+            refresh_search_text(db.table("submissions"), form, self._file_names)
+
+    def create_submissions(self, submissions: list[dict[str, Any]]) -> None:
+        # 検索用テキストは対象の分割ファイルをロックする前に作っておく
+        records = attach_search_text(
+            [self._to_record(submission) for submission in submissions],
+            self._form,
+            self._file_names,
+        )
+        grouped: dict[str, list[dict[str, Any]]] = {}
+        for record in records:
+            grouped.setdefault(record["form_id"], []).append(record)
+        for form_id, records in grouped.items():
+            with self._shard(self._layout.submissions_path(form_id)) as db:
+                db.table("submissions").insert_multiple(records)
+
+    def delete_submission(self, submission_id: str, form_id: str | None = None) -> None:
+        # フォームが分かればその分割ファイルだけを、分からなければ該当するものを探す
+        if form_id is not None:
+            paths = [self._layout.submissions_path(form_id)]
+        else:
+            paths = self._layout.submission_shards()
+        for path in paths:
+            if not path.exists():
+                continue
+            with self._shard(path) as db:
+                table = db.table("submissions")
+                # remove は一致しなくてもファイルを書き直すので、先に有無を確かめる
+                if table.contains(Query().id == submission_id):
+                    table.remove(Query().id == submission_id)
+                    return
+
+
+class JSONShardedFormRepo(JSONFormRepo):
+    def __init__(self, layout: JSONShardLayout, submissions: JSONShardedSubmissionRepo) -> None:
+        super().__init__(layout.forms_path, layout.lock(layout.forms_path), layout.fsync)
+        self._submissions = submissions
+
+    def update_form(self, form_id: str, updates: dict[str, Any]) -> dict[str, Any]:
+        with self._db() as db:
+            previous, item = self._update_record(db, form_id, updates)
+        # 送信の分割ファイルはフォームのロックを放してから書き換える
+        if search_text_changed(previous, item):
+            self._submissions.refresh_search_text(item)
+        return self._from_record(item)
+
+
+class JSONShardedStorage:
+    def __init__(self, root: Path, fsync: str = "batch") -> None:
+        self.layout = JSONShardLayout(root, fsync)
+        files_path = self.layout.files_path
+        self.submissions = JSONShardedSubmissionRepo(self.layout)
+        self.forms = JSONShardedFormRepo(self.layout, self.submissions)
+        self.files = JSONFileRepo(files_path, self.layout.lock(files_path), fsync)
+
+
+def shard_json_store(source: Path, root: Path) -> dict[str, int]:
+    # 単一ファイル構成 (jsonstore.json) を分割構成へ書き写す。元のファイルは変更しない。
+    layout = JSONShardLayout(root)
+    counts = {"forms": 0, "submissions": 0, "files": 0}
+    with open_db(source, FileLock(f"{source}.lock")) as db:
+        forms = db.table("forms").all()
+        files = db.table("files").all()
+        submissions = db.table("submissions").all()
+    for path, name, records in (
+        (layout.forms_path, "forms", forms),
+        (layout.files_path, "files", files),
+    ):
+        with open_db(path, layout.lock(path)) as db:
+            table = db.table(name)
+            table.truncate()
+            table.insert_multiple([dict(record) for record in records])
+        counts[name] = len(records)
+    grouped: dict[str, list[dict[str, Any]]] = {}
+    for record in submissions:
+        grouped.setdefault(record["form_id"], []).append(dict(record))
+    for form_id, records in grouped.items():
+        path = layout.submissions_path(form_id)
+        with open_db(path, layout.lock(path)) as db:
+            table = db.table("submissions")
+            table.truncate()
+            table.insert_multiple(records)
+        counts["submissions"] += len(records)
+    return counts
+
+
+JOURNAL_TABLES = ("forms", "submissions", "files")
+# ジャーナルがこの大きさとスナップショットの両方を超えたら、書き込みの後にまとめ直す
+JOURNAL_COMPACT_MIN_BYTES = 4 * 1024 * 1024
+# 各テーブルは id をキーに持つ。加えて以下の列で引けるようにしておく。
+JOURNAL_INDEXES = {"forms": ("public_id",), "submissions": ("form_id",), "files": ()}
+
+
+class JSONJournal:
+    # データはメモリ上に保持し、変更は追記専用のジャーナルに 1 行ずつ書き出す。
+    # ファイルロックを取るのは起動時の読み込みと追記の間だけ。
+    # 複数ワーカーで動かす場合は、ジャーナルの inode とサイズを変更マーカーとして
+    # アクセスごとに確認し、他プロセスが追記した分だけを取り込む。
+    # 読んでいるジャーナルは開いたままにして、差し替え後に同じ inode が再利用されないようにする。
+    # fsync は追記ごとと、まとめ直しの各段階で行う（never を除く）。追記 1 回が 1 操作なので
+    # batch も always と同じになる。
+    def __init__(
+        self,
+        path: Path,
+        lock: FileLock,
+        columns: ColumnarCache | None = None,
+        substrings: SubstringIndex | None = None,
+        compact_min_bytes: int = JOURNAL_COMPACT_MIN_BYTES,
+        fsync: str = "batch",
+    ) -> None:
+        self._path = path
+        self._fsync = fsync if fsync in FSYNC_MODES else "batch"
+        self._journal_path = Path(f"{path}.journal")
+        self._lock = lock
+        self._mutex = threading.Lock()
+        self.columns = columns
+        self.substrings = substrings
+        self._compact_min_bytes = compact_min_bytes
+        self._handle: BinaryIO | None = None
+        self._inode = 0
+        self._offset = 0
+        self._snapshot_size = 0
+        self._generation = 0
+        with self._lock:
+            self._reload()
+            marker = self._journal_marker()
+            if marker is None or marker[1]:
+                self._compact()
+
+    def _journal_marker(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self._journal_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _reload(self) -> None:
+        self.tables: dict[str, dict[str, dict[str, Any]]] = {name: {} for name in JOURNAL_TABLES}
+        self.indexes: dict[str, dict[str, dict[Any, dict[str, dict[str, Any]]]]] = {
+            name: {column: {} for column in JOURNAL_INDEXES[name]} for name in JOURNAL_TABLES
+        }
+        if self.columns is not None:
+            self.columns.clear()
+        if self.substrings is not None:
+            self.substrings.clear()
+        # フォームごとの書き込み回数。読み直すたびに世代を進めて以前の値と区別する
+        self.versions: dict[str, int] = {}
+        self._generation += 1
+        self._load_snapshot()
+        self._open_journal()
+        if self._handle is not None:
+            self._replay()
+
+    def _open_journal(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+        self._handle = None
+        self._inode = 0
+        self._offset = 0
+        try:
+            self._handle = self._journal_path.open("rb")
+        except FileNotFoundError:
+            return
+        self._inode = os.fstat(self._handle.fileno()).st_ino
+
+    def _load_snapshot(self) -> None:
+        self._snapshot_size = 0
+        if not self._path.exists():
+            return
+        raw = self._path.read_bytes()
+        self._snapshot_size = len(raw)
+        if not raw.strip():
+            return
+        for name, documents in orjson.loads(raw).items():
+            if name not in self.tables:
+                continue
+            for record in documents.values():
+                self._store(name, record)
+
+    def _replay(self) -> None:
+        # 差し替えられていても、開いているジャーナルの続きを読む（次の確認で読み直す）
+        self._handle.seek(self._offset)
+        data = self._handle.read()
+        # 追記途中の行は読まず、次回に回す
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # 書き込み途中で落ちた行は捨てる
+                continue
+            self._apply(entry)
+        self._offset += end
+
+    def _catch_up(self) -> None:
+        marker = self._journal_marker()
+        if marker is None or marker[0] != self._inode or marker[1] < self._offset:
+            # 別プロセスがまとめ直した（ジャーナルが差し替わった）ので全体を読み直す
+            with self._lock:
+                self._reload()
+        elif marker[1] > self._offset:
+            self._replay()
+
+    def refresh(self) -> None:
+        if self._journal_marker() == (self._inode, self._offset):
+            return
+        with self._mutex:
+            self._catch_up()
+
+    def _compact(self) -> None:
+        # TinyDB と同じ形式で書き出すので、通常の JSON モードにもそのまま戻せる。
+        snapshot = {
+            name: {str(index): record for index, record in enumerate(table.values(), start=1)}
+            for name, table in self.tables.items()
+        }
+        payload = orjson.dumps(snapshot)
+        temp_path = self._path.with_name(f"{self._path.name}.tmp")
+        _write_file(temp_path, payload, self._fsync)
+        os.replace(temp_path, self._path)
+        self._snapshot_size = len(payload)
+        # スナップショットの置き換えが残ってからでないと、ジャーナルを空にできない
+        if self._fsync != "never":
+            _fsync_path(self._path.parent)
+        # 他のワーカーが差し替えに気付けるよう、ジャーナルは新しいファイルにする
+        temp_journal = self._journal_path.with_name(f"{self._journal_path.name}.tmp")
+        _write_file(temp_journal, b"", self._fsync)
+        os.replace(temp_journal, self._journal_path)
+        if self._fsync != "never":
+            _fsync_path(self._journal_path.parent)
+        self._open_journal()
+
+    def _store(self, name: str, record: dict[str, Any]) -> None:
+        previous = self.tables[name].get(record["id"])
+        self._unindex(name, previous)
+        self.tables[name][record["id"]] = record
+        for column, index in self.indexes[name].items():
+            index.setdefault(record.get(column), {})[record["id"]] = record
+        if name == "forms" and previous is not None and search_text_changed(previous, record):
+            self._refresh_search_text(record)
+        if name != "submissions":
+            return
+        self._bump(record)
+        if self.columns is not None:
+            self.columns.put(record)
+        if self.substrings is not None:
+            self.substrings.put(record, self.file_names)
+
+    def _refresh_search_text(self, form: dict[str, Any]) -> None:
+        # ジャーナルにはフォームの記録だけを書き、送信の検索用テキストは
+        # 書き込み・再生のどちらでもメモリ上で作り直す
+        records = list(self.indexes["submissions"]["form_id"].get(form["id"], {}).values())
+        if records:
+            attach_search_text(records, lambda _: form, self.file_names)
+
+    def _bump(self, record: dict[str, Any]) -> None:
+        self.versions[record["form_id"]] = self.versions.get(record["form_id"], 0) + 1
+
+    def data_version(self, form_id: str) -> str:
+        self.refresh()
+        return f"{self._generation}:{self.versions.get(form_id, 0)}"
+
+    def _unindex(self, name: str, record: dict[str, Any] | None) -> None:
+        if record is None:
+            return
+        for column, index in self.indexes[name].items():
+            bucket = index.get(record.get(column))
+            if bucket is None:
+                continue
+            bucket.pop(record["id"], None)
+            if not bucket:
+                del index[record.get(column)]
+
+    def _apply(self, entry: dict[str, Any]) -> None:
+        name = entry["table"]
+        if entry["op"] == "put":
+            for record in entry["records"]:
+                self._store(name, record)
+        elif entry["op"] == "delete":
+            record = self.tables[name].pop(entry["id"], None)
+            self._unindex(name, record)
+            if record is None or name != "submissions":
+                return
+            self._bump(record)
+            if self.columns is not None:
+                self.columns.remove(record)
+            if self.substrings is not None:
+                self.substrings.remove(record)
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        line = orjson.dumps(entry) + b"\n"
+        with self._journal_path.open("ab") as handle:
+            if handle.tell() > self._offset:
+                # 他プロセスが途中で落ちて残した断片と同じ行にならないようにする
+                line = b"\n" + line
+            handle.write(line)
+            if self._fsync != "never":
+                handle.flush()
+                os.fsync(handle.fileno())
+            # 断片と区切りの改行も読み終えた扱いにする
+            self._offset = handle.tell()
+        # 呼び出し側と共有しないよう、書き出した内容を読み戻して保持する
+        self._apply(orjson.loads(line))
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        # 追記の前に他プロセスの変更を取り込み、ジャーナルの順序とメモリの状態を揃える
+        with self._mutex, self._lock:
+            self._catch_up()
+            yield
+            # ジャーナルが大きくなりすぎたら、ロックを持ったまままとめ直す。
+            # 他のワーカーはジャーナルの inode が変わったことに気付いて読み直す
+            if self._offset > max(self._snapshot_size, self._compact_min_bytes):
+                self._compact()
+
+    def records(self, table: str) -> list[dict[str, Any]]:
+        self.refresh()
+        return list(self.tables[table].values())
+
+    def get(self, table: str, record_id: str) -> dict[str, Any] | None:
+        self.refresh()
+        return self.tables[table].get(record_id)
+
+    def get_many(self, table: str, record_ids: Iterable[str]) -> list[dict[str, Any]]:
+        self.refresh()
+        records = self.tables[table]
+        return [records[record_id] for record_id in record_ids if record_id in records]
+
+    def lookup(self, table: str, column: str, value: Any) -> list[dict[str, Any]]:
+        self.refresh()
+        return list(self.indexes[table][column].get(value, {}).values())
+
+    def file_names(self, file_ids: set[str]) -> dict[str, str]:
+        # 書き込み中のフックからも呼ぶので、ここでは他プロセスの変更を取り込まない
+        names: dict[str, str] = {}
+        for file_id in file_ids:
+            item = self.tables["files"].get(file_id)
+            if item:
+                names[file_id] = item.get("original_name", "")
+        return names
+
+    def put(self, table: str, records: list[dict[str, Any]]) -> None:
+        with self._writing():
+            self._append({"table": table, "op": "put", "records": records})
+
+    def update(self, table: str, record_id: str, changes: dict[str, Any]) -> dict[str, Any] | None:
+        with self._writing():
+            item = self.tables[table].get(record_id)
+            if item is None:
+                return None
+            self._append({"table": table, "op": "put", "records": [{**item, **changes}]})
+            return self.tables[table][record_id]
+
+    def delete(self, table: str, record_id: str) -> None:
+        with self._writing():
+            if record_id in self.tables[table]:
+                self._append({"table": table, "op": "delete", "id": record_id})
+
+
+class JSONMemoryFormRepo(JSONFormRepo):
+    def __init__(self, journal: JSONJournal) -> None:
+        self._journal = journal
+
+    def list_forms(self) -> list[dict[str, Any]]:
+        forms = [self._from_record(item) for item in self._journal.records("forms")]
+        return sorted(forms, key=lambda x: x["updated_at"], reverse=True)
+
+    def get_form(self, form_id: str) -> dict[str, Any] | None:
+        item = self._journal.get("forms", form_id)
+        return self._from_record(item) if item else None
+
+    def get_form_by_public_id(self, public_id: str) -> dict[str, Any] | None:
+        items = self._journal.lookup("forms", "public_id", public_id)
+        return self._from_record(items[0]) if items else None
+
+    def create_form(self, form: dict[str, Any]) -> None:
+        self._journal.put("forms", [self._to_record(form)])
+
+    def update_form(self, form_id: str, updates: dict[str, Any]) -> dict[str, Any]:
+        item = self._journal.update("forms", form_id, self._to_record(updates, partial=True))
+        if item is None:
+            raise KeyError(form_id)
+        return self._from_record(item)
+
+    def set_status(self, form_id: str, status: str) -> None:
+        changes = {"status": status, "updated_at": to_iso(now_utc())}
+        if self._journal.update("forms", form_id, changes) is None:
+            raise KeyError(form_id)
+
+    def delete_form(self, form_id: str) -> None:
+        self._journal.delete("forms", form_id)
+
+
+class JSONMemorySubmissionRepo(JSONSubmissionRepo):
+    def __init__(self, journal: JSONJournal) -> None:
+        self._journal = journal
+
+    def _form_submissions(self, form_id: str) -> list[dict[str, Any]]:
+        items = self._journal.lookup("submissions", "form_id", form_id)
+        return [self._from_record(item) for item in items]
+
+    def list_submissions(self, form_id: str) -> list[dict[str, Any]]:
+        submissions = self._form_submissions(form_id)
+        return sorted(submissions, key=submission_sort_key, reverse=True)
+
+    def get_submissions(self, form_id: str, submission_ids: list[str]) -> list[dict[str, Any]]:
+        items = (self._journal.get("submissions", submission_id) for submission_id in submission_ids)
+        return [
+            self._from_record(item)
+            for item in items
+            if item is not None and item["form_id"] == form_id
+        ]
+
+    def data_version(self, form_id: str) -> str:
+        return self._journal.data_version(form_id)
+
+    def query_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        limit: int | None = None,
+        after_cursor: tuple[datetime, str] | None = None,
+        project: list[str] | None = None,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        if predicates and self._journal.columns is not None:
+            # 範囲・一致の条件は列キャッシュで絞り、残った行だけを dict に戻す
+            self._journal.refresh()
+            items, predicates = self._journal.columns.select(form_id, predicates)
+        else:
+            items = self._journal.lookup("submissions", "form_id", form_id)
+        search_text = None
+        if has_text_predicate(predicates):
+            search_text = self._stored_search_text(
+                items,
+                lambda: self._search_text_builder(
+                    self._journal.get("forms", form_id), self._journal.records("files")
+                ),
+            )
+        return query_submissions_in_memory(
+            [self._from_record(item) for item in items],
+            predicates=predicates,
+            order=order,
+            limit=limit,
+            after_cursor=after_cursor,
+            search_text=search_text,
+            project=project,
+            offset=offset,
+        )
+
+    def create_submission(self, submission: dict[str, Any]) -> None:
+        self.create_submissions([submission])
+
+    def create_submissions(self, submissions: list[dict[str, Any]]) -> None:
+        records = attach_search_text(
+            [self._to_record(item) for item in submissions],
+            lambda form_id: self._journal.get("forms", form_id),
+            self._journal.file_names,
+        )
+        self._journal.put("submissions", records)
+
+    def delete_submission(self, submission_id: str, form_id: str | None = None) -> None:
+        if form_id is not None:
+            item = self._journal.get("submissions", submission_id)
+            if item is None or item.get("form_id") != form_id:
+                return
+        self._journal.delete("submissions", submission_id)
+
+    def substring_candidates(
+        self, form_id: str, filters: list[dict[str, Any]]
+    ) -> dict[str, set[str]]:
+        index = self._journal.substrings
+        if index is None:
+            return {}
+        self._journal.refresh()
+        indexes = self._journal.indexes["submissions"]["form_id"]
+        result: dict[str, set[str]] = {}
+        for item in filters:
+            allowed = index.candidates(
+                form_id,
+                item["key"],
+                item["type"],
+                item["value"],
+                lambda: list(indexes.get(form_id, {}).values()),
+                self._journal.file_names,
+            )
+            if allowed is not None:
+                result[item["key"]] = allowed
+        return result
+
+
+class JSONMemoryFileRepo(JSONFileRepo):
+    def __init__(self, journal: JSONJournal) -> None:
+        self._journal = journal
+
+    def create_file(self, file_meta: dict[str, Any]) -> None:
+        self._journal.put("files", [self._to_record(file_meta)])
+
+    def create_files(self, files: list[dict[str, Any]]) -> None:
+        self._journal.put("files", [self._to_record(file_meta) for file_meta in files])
+
+    def iter_files(self, batch_size: int = 500) -> Iterator[list[dict[str, Any]]]:
+        items = self._journal.records("files")
+        for start in range(0, len(items), batch_size):
+            yield [self._from_record(item) for item in items[start : start + batch_size]]
+
+    def get_file(self, file_id: str) -> dict[str, Any] | None:
+        item = self._journal.get("files", file_id)
+        return self._from_record(item) if item else None
+
+    def get_files(self, file_ids: list[str]) -> list[dict[str, Any]]:
+        return [self._from_record(item) for item in self._journal.get_many("files", file_ids)]
+
+
+class JSONMemoryStorage:
+    def __init__(
+        self,
+        path: Path,
+        columnar: bool = False,
+        substring_index_postings: int = 0,
+        fsync: str = "batch",
+    ) -> None:
         self._lock = FileLock(f"{path}.lock")
-        self.forms = JSONFormRepo(path, self._lock)
-        self.submissions = JSONSubmissionRepo(path, self._lock)
-        self.files = JSONFileRepo(path, self._lock)
+        self.journal = JSONJournal(
+            path,
+            self._lock,
+            ColumnarCache() if columnar else None,
+            SubstringIndex(substring_index_postings) if substring_index_postings > 0 else None,
+            fsync=fsync,
+        )
+        self.forms = JSONMemoryFormRepo(self.journal)
+        self.submissions = JSONMemorySubmissionRepo(self.journal)
+        self.files = JSONMemoryFileRepo(self.journal)
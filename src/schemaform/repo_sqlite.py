@@ -1,48 +1,829 @@
 from __future__ import annotations
 
+import hashlib
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import (
+    Connection,
+    Engine,
+    Integer,
+    Row,
+    Select,
+    bindparam,
+    case,
+    cast,
+    column,
+    create_engine,
+    delete,
+    event,
+    func,
+    literal,
+    literal_column,
+    null,
+    or_,
+    select,
+    table,
+    text,
+    true,
+    tuple_,
+)
+from sqlalchemy.orm import Session, sessionmaker
 
+from schemaform.config import SUBMISSION_BATCH_CHUNK_SIZE
+from schemaform.fields import build_projection
+from schemaform.filters import (
+    build_search_text,
+    collect_file_ids,
+    indexable_filter_fields,
+    search_fields_signature,
+)
 from schemaform.models import Base, FileModel, FormModel, SubmissionModel
+from schemaform.schema import fields_from_schema
+from schemaform.stats import empty_field_stats, finish_enum_counts, finish_number_stats
 from schemaform.utils import dumps_json, loads_json, now_utc
 
+FIELD_INDEX_PREFIX = "ix_sfpath_"
+FIELD_INDEX_LIMIT = 64
+# 日本語は分かち書きされないため trigram で部分一致を引く。本文は小文字化して保存する。
+# FTS の行は submission_search_keys の id を rowid にして、送信 ID・フォーム ID と完全一致で結び付ける。
+submission_search = table(
+    "submission_search",
+    column("rowid"),
+    column("content"),
+)
+submission_search_keys = table(
+    "submission_search_keys",
+    column("id"),
+    column("submission_id"),
+    column("form_id"),
+)
+
+
+def _to_db_datetime(value: datetime) -> datetime:
+    # created_at は UTC の naive 値として保存されているため比較値もそろえる。
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _json_path_sql(flat_key: str) -> str:
+    # キーは KEY_PATTERN で検証済みなので、そのままリテラルとして埋め込める。
+    return f"'$.{flat_key}'"
+
+
+def _field_value_expr(flat_key: str) -> Any:
+    # インデックス式と同じ形にしないとプランナーが式インデックスを使わない。
+    return func.json_extract(SubmissionModel.data_json, literal_column(_json_path_sql(flat_key)))
+
+
+def _search_clause(value: str, form_id: str) -> Any:
+    keys = submission_search_keys
+    content = submission_search.c.content
+    if len(value) < 3:
+        # trigram は 3 文字未満を索引で引けないため、短い語は instr で走査する。
+        # 全フォームの本文を読まないよう、このフォームの行から rowid で引く。
+        return (
+            select(keys.c.submission_id)
+            .select_from(keys.join(submission_search, submission_search.c.rowid == keys.c.id))
+            .where(keys.c.form_id == form_id, func.instr(content, value) > 0)
+        )
+    escaped = "".join(f"[{char}]" if char in "*?[" else char for char in value)
+    return select(keys.c.submission_id).where(
+        keys.c.form_id == form_id,
+        keys.c.id.in_(select(submission_search.c.rowid).where(content.op("GLOB")(f"*{escaped}*"))),
+    )
+
+
+def _predicate_clause(predicate: dict[str, Any], form_id: str) -> Any:
+    op = predicate["op"]
+    if op == "submitted_from":
+        return SubmissionModel.created_at >= _to_db_datetime(predicate["value"])
+    if op == "submitted_to":
+        return SubmissionModel.created_at <= _to_db_datetime(predicate["value"])
+    if op == "eq":
+        return _field_value_expr(predicate["key"]) == predicate["value"]
+    if op == "min":
+        return _field_value_expr(predicate["key"]) >= predicate["value"]
+    if op == "max":
+        return _field_value_expr(predicate["key"]) <= predicate["value"]
+    if op == "bool":
+        value = _field_value_expr(predicate["key"])
+        if predicate["value"]:
+            return value == 1
+        return or_(value.is_(None), value == 0)
+    if op == "text":
+        return SubmissionModel.id.in_(_search_clause(predicate["value"], form_id))
+    raise ValueError(f"unsupported predicate: {op}")
+
+
+def _cursor_clause(after_cursor: tuple[datetime, str], order: str) -> Any:
+    # 行値比較にすると (form_id, created_at, id) インデックスの範囲検索になる。
+    key = tuple_(SubmissionModel.created_at, SubmissionModel.id)
+    cursor = (_to_db_datetime(after_cursor[0]), after_cursor[1])
+    if order == "asc":
+        return key > cursor
+    return key < cursor
+
+
+def _migration_submissions_keyset_index(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_submissions_form_created_id "
+            "ON submissions (form_id, created_at DESC, id DESC)"
+        )
+    )
+    conn.execute(text("DROP INDEX IF EXISTS ix_submissions_form_id"))
+
+
+def field_index_name(flat_key: str) -> str:
+    # SQLite の識別子は大文字小文字を区別しないため、キーのハッシュで衝突を避ける。
+    digest = hashlib.sha1(flat_key.encode("utf-8")).hexdigest()[:8]
+    return f"{FIELD_INDEX_PREFIX}{flat_key.replace('.', '__').lower()}_{digest}"
+
+
+def _existing_indexes(conn: Connection, prefix: str) -> set[str]:
+    rows = conn.execute(
+        text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'submissions' "
+            "AND substr(name, 1, :length) = :prefix"
+        ),
+        {"length": len(prefix), "prefix": prefix},
+    )
+    return {row[0] for row in rows}
+
+
+def desired_field_indexes(conn: Connection) -> dict[str, str]:
+    # インデックスはフォームごとではなく JSON パスごとに 1 つ作り、同じキーを持つフォームで共有する。
+    # 書き込みのたびにすべての式を評価するので、使うフォームの多いパスから上限までに絞る。
+    usage: dict[str, int] = {}
+    rows = conn.execute(text("SELECT schema_json, field_order FROM forms"))
+    for schema_json, field_order in rows.all():
+        fields = fields_from_schema(loads_json(schema_json) or {}, loads_json(field_order) or [])
+        for flat_key in {field["flat_key"] for field in indexable_filter_fields(fields)}:
+            usage[flat_key] = usage.get(flat_key, 0) + 1
+    ranked = sorted(usage, key=lambda flat_key: (-usage[flat_key], flat_key))
+    return {field_index_name(flat_key): flat_key for flat_key in ranked[:FIELD_INDEX_LIMIT]}
+
+
+def sync_field_indexes(conn: Connection) -> None:
+    desired = desired_field_indexes(conn)
+    existing = _existing_indexes(conn, FIELD_INDEX_PREFIX)
+    for name in existing - desired.keys():
+        conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    created = [name for name in desired if name not in existing]
+    for name in created:
+        conn.execute(
+            text(
+                f'CREATE INDEX IF NOT EXISTS "{name}" ON submissions '
+                f"(form_id, json_extract(data_json, {_json_path_sql(desired[name])}))"
+            )
+        )
+    if created:
+        # 統計は作ったインデックスの分だけ、件数を絞って取る
+        conn.execute(text("PRAGMA analysis_limit = 1000"))
+        for name in created:
+            conn.execute(text(f'ANALYZE "{name}"'))
+
+
+def _migration_field_indexes(conn: Connection) -> None:
+    sync_field_indexes(conn)
+
+
+def _file_names(conn: Connection, file_ids: set[str]) -> dict[str, str]:
+    ids = list(file_ids)
+    names: dict[str, str] = {}
+    for start in range(0, len(ids), SUBMISSION_BATCH_CHUNK_SIZE):
+        rows = conn.execute(
+            select(FileModel.id, FileModel.original_name).where(
+                FileModel.id.in_(ids[start : start + SUBMISSION_BATCH_CHUNK_SIZE])
+            )
+        )
+        names.update({file_id: name or "" for file_id, name in rows})
+    return names
+
+
+def submission_search_texts(
+    conn: Connection, fields: list[dict[str, Any]], data_list: list[dict[str, Any]]
+) -> list[str]:
+    # ファイル名はまとめて 1 回で引く
+    submissions = [{"data_json": data} for data in data_list]
+    file_names = _file_names(conn, collect_file_ids(submissions, fields))
+    return [build_search_text(fields, data, file_names) for data in data_list]
+
+
+def _insert_search_rows(conn: Connection, rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+    conn.execute(
+        submission_search_keys.insert(),
+        [{"submission_id": row["submission_id"], "form_id": row["form_id"]} for row in rows],
+    )
+    conn.execute(
+        text(
+            "INSERT INTO submission_search (rowid, content) "
+            "SELECT id, :content FROM submission_search_keys WHERE submission_id = :submission_id"
+        ),
+        [{"content": row["content"], "submission_id": row["submission_id"]} for row in rows],
+    )
+
+
+def rebuild_search_index(conn: Connection, form_id: str, fields: list[dict[str, Any]]) -> None:
+    # 検索対象の文字列はスキーマに依存するため、検索対象の項目が変わったらフォーム単位で作り直す。
+    keys = select(submission_search_keys.c.id).where(submission_search_keys.c.form_id == form_id)
+    conn.execute(delete(submission_search).where(submission_search.c.rowid.in_(keys)))
+    conn.execute(delete(submission_search_keys).where(submission_search_keys.c.form_id == form_id))
+    result = conn.execute(
+        select(SubmissionModel.id, SubmissionModel.data_json).where(
+            SubmissionModel.form_id == form_id
+        )
+    )
+    for chunk in result.partitions(SUBMISSION_BATCH_CHUNK_SIZE):
+        data_list = [loads_json(data_json) or {} for _, data_json in chunk]
+        contents = submission_search_texts(conn, fields, data_list)
+        _insert_search_rows(
+            conn,
+            [
+                {"submission_id": submission_id, "form_id": form_id, "content": content}
+                for (submission_id, _), content in zip(chunk, contents)
+            ],
+        )
+
+
+def _form_row_fields(schema_json: Any, field_order: Any) -> list[dict[str, Any]]:
+    return fields_from_schema(loads_json(schema_json) or {}, loads_json(field_order) or [])
+
+
+def _migration_submission_search(conn: Connection) -> None:
+    # trigram では ID 列の MATCH も部分一致になるため、ID は通常のテーブルに置いて完全一致で引く
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS submission_search_keys ("
+            "id INTEGER PRIMARY KEY, submission_id VARCHAR NOT NULL UNIQUE, "
+            "form_id VARCHAR NOT NULL)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_submission_search_keys_form_id "
+            "ON submission_search_keys (form_id)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS submission_search USING fts5("
+            "content, tokenize = 'trigram case_sensitive 1')"
+        )
+    )
+    rows = conn.execute(text("SELECT id, schema_json, field_order FROM forms"))
+    for form_id, schema_json, field_order in rows.all():
+        rebuild_search_index(conn, form_id, _form_row_fields(schema_json, field_order))
+
+
+def _migration_submission_versions(conn: Connection) -> None:
+    # フォームごとの書き込み回数。別プロセスの書き込みも含めて結果キャッシュを無効化するのに使う。
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS submission_versions ("
+            "form_id VARCHAR PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+    )
+    for event_name, row in (("INSERT", "NEW"), ("DELETE", "OLD"), ("UPDATE", "NEW")):
+        conn.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS submission_versions_{event_name.lower()} "
+                f"AFTER {event_name} ON submissions BEGIN "
+                f"INSERT INTO submission_versions (form_id, version) VALUES ({row}.form_id, 1) "
+                "ON CONFLICT (form_id) DO UPDATE SET version = version + 1; END"
+            )
+        )
+
+
+_MIGRATIONS: list[Callable[[Connection], None]] = [
+    _migration_submissions_keyset_index,
+    _migration_field_indexes,
+    _migration_submission_search,
+    _migration_submission_versions,
+]
+
+
+def apply_migrations(engine: Engine) -> None:
+    with engine.begin() as conn:
+        version = conn.execute(text("PRAGMA user_version")).scalar() or 0
+        for index, migration in enumerate(_MIGRATIONS[version:], start=version + 1):
+            migration(conn)
+            conn.execute(text(f"PRAGMA user_version = {index}"))
+
+
+def form_search_signature(row: FormModel) -> tuple:
+    return search_fields_signature(_form_row_fields(row.schema_json, row.field_order))
+
+
+def sync_form_schema(
+    session: Session, row: FormModel, previous_search: tuple | None = None
+) -> None:
+    # 追加・変更したフォームも他のフォームと合わせて数えるので、先に書き出しておく
+    session.flush()
+    conn = session.connection()
+    fields = _form_row_fields(row.schema_json, row.field_order)
+    sync_field_indexes(conn)
+    # 表示名や選択肢だけの変更では検索用の文字列が変わらないので作り直さない
+    if previous_search is None or search_fields_signature(fields) != previous_search:
+        rebuild_search_index(conn, row.id, fields)
+
+
+def index_submission_search(session: Session, submissions: list[dict[str, Any]]) -> None:
+    conn = session.connection()
+    by_form: dict[str, list[dict[str, Any]]] = {}
+    for submission in submissions:
+        by_form.setdefault(submission["form_id"], []).append(submission)
+    rows: list[dict[str, Any]] = []
+    for form_id, items in by_form.items():
+        form = session.get(FormModel, form_id)
+        if not form:
+            continue
+        fields = _form_row_fields(form.schema_json, form.field_order)
+        contents = submission_search_texts(conn, fields, [item["data_json"] for item in items])
+        rows.extend(
+            {"submission_id": item["id"], "form_id": form_id, "content": content}
+            for item, content in zip(items, contents)
+        )
+    _insert_search_rows(conn, rows)
+
+
+def remove_submission_search(session: Session, submission_id: str) -> None:
+    keys = select(submission_search_keys.c.id).where(
+        submission_search_keys.c.submission_id == submission_id
+    )
+    session.execute(delete(submission_search).where(submission_search.c.rowid.in_(keys)))
+    session.execute(
+        delete(submission_search_keys).where(
+            submission_search_keys.c.submission_id == submission_id
+        )
+    )
+
+
+def resync_field_indexes(session: Session) -> None:
+    # 削除したフォームを数えないよう、先に書き出してからパスごとのインデックスをそろえ直す
+    session.flush()
+    sync_field_indexes(session.connection())
+
+
+# 読み出しは ORM エンティティを作らず、Core の行タプルを列順のままアンパックして dict にする。
+FORM_COLUMNS = (
+    FormModel.id,
+    FormModel.public_id,
+    FormModel.name,
+    FormModel.description,
+    FormModel.status,
+    FormModel.schema_json,
+    FormModel.field_order,
+    FormModel.created_at,
+    FormModel.updated_at,
+)
+SUBMISSION_COLUMNS = (
+    SubmissionModel.id,
+    SubmissionModel.form_id,
+    SubmissionModel.data_json,
+    SubmissionModel.created_at,
+)
+FILE_COLUMNS = (
+    FileModel.id,
+    FileModel.form_id,
+    FileModel.original_name,
+    FileModel.stored_path,
+    FileModel.content_type,
+    FileModel.size,
+    FileModel.created_at,
+)
+
+
+# 単純な読み出しは文を使い回し、呼び出しごとの構築とキャッシュキー生成を省く。
+FORM_LIST_STMT = select(*FORM_COLUMNS).order_by(FormModel.updated_at.desc())
+FORM_BY_ID_STMT = select(*FORM_COLUMNS).where(FormModel.id == bindparam("form_id"))
+FORM_BY_PUBLIC_ID_STMT = (
+    select(*FORM_COLUMNS).where(FormModel.public_id == bindparam("public_id")).limit(1)
+)
+SUBMISSION_VERSION_STMT = text(
+    "SELECT version FROM submission_versions WHERE form_id = :form_id"
+)
+SUBMISSIONS_BY_ID_STMT = select(*SUBMISSION_COLUMNS).where(
+    SubmissionModel.form_id == bindparam("form_id"),
+    SubmissionModel.id.in_(bindparam("submission_ids", expanding=True)),
+)
+FILE_BY_ID_STMT = select(*FILE_COLUMNS).where(FileModel.id == bindparam("file_id"))
+FILES_BY_ID_STMT = select(*FILE_COLUMNS).where(
+    FileModel.id.in_(bindparam("file_ids", expanding=True))
+)
+FILE_PAGE_STMT = (
+    select(*FILE_COLUMNS)
+    .where(FileModel.id > bindparam("after_id"))
+    .order_by(FileModel.id)
+    .limit(bindparam("batch_size"))
+)
+
+
+def form_to_row(form: dict[str, Any]) -> FormModel:
+    return FormModel(
+        id=form["id"],
+        public_id=form["public_id"],
+        name=form["name"],
+        description=form["description"],
+        status=form["status"],
+        schema_json=dumps_json(form["schema_json"]),
+        field_order=dumps_json(form["field_order"]),
+        created_at=form["created_at"],
+        updated_at=form["updated_at"],
+    )
+
+
+def apply_form_updates(row: FormModel, updates: dict[str, Any]) -> None:
+    for key, value in updates.items():
+        if key in {"schema_json", "field_order"}:
+            setattr(row, key, dumps_json(value))
+        else:
+            setattr(row, key, value)
+
+
+def form_to_dict(row: Row) -> dict[str, Any]:
+    (
+        form_id,
+        public_id,
+        name,
+        description,
+        status,
+        schema_json,
+        field_order,
+        created_at,
+        updated_at,
+    ) = row
+    return {
+        "id": form_id,
+        "public_id": public_id,
+        "name": name,
+        "description": description or "",
+        "status": status,
+        "schema_json": loads_json(schema_json) or {},
+        "field_order": loads_json(field_order) or [],
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+def _projection_column(project: list[str]) -> Any:
+    if not project:
+        return null()
+    # json_extract はパスが 1 つだとスカラー（真偽値は 0/1）を返すため、
+    # 常に 2 つ以上渡して型を保った JSON 配列で受け取る。
+    paths = project if len(project) > 1 else project * 2
+    return func.json_extract(
+        SubmissionModel.data_json, *(literal_column(_json_path_sql(key)) for key in paths)
+    )
+
+
+def _filter_submissions(
+    stmt: Select, form_id: str, predicates: list[dict[str, Any]] | None
+) -> Select:
+    stmt = stmt.where(SubmissionModel.form_id == form_id)
+    for predicate in predicates or []:
+        stmt = stmt.where(_predicate_clause(predicate, form_id))
+    return stmt
+
+
+def submission_query_stmt(
+    form_id: str,
+    predicates: list[dict[str, Any]] | None = None,
+    order: str = "desc",
+    limit: int | None = None,
+    after_cursor: tuple[datetime, str] | None = None,
+    project: list[str] | None = None,
+    offset: int = 0,
+) -> Select:
+    if project is None:
+        columns: tuple[Any, ...] = SUBMISSION_COLUMNS
+    else:
+        columns = (
+            SubmissionModel.id,
+            SubmissionModel.form_id,
+            _projection_column(project),
+            SubmissionModel.created_at,
+        )
+    stmt = _filter_submissions(select(*columns), form_id, predicates)
+    if after_cursor:
+        stmt = stmt.where(_cursor_clause(after_cursor, order))
+    if order == "asc":
+        stmt = stmt.order_by(SubmissionModel.created_at.asc(), SubmissionModel.id.asc())
+    else:
+        stmt = stmt.order_by(SubmissionModel.created_at.desc(), SubmissionModel.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    if offset:
+        stmt = stmt.offset(offset)
+    return stmt
+
+
+def submission_count_stmt(
+    form_id: str, predicates: list[dict[str, Any]] | None = None
+) -> Select:
+    return _filter_submissions(
+        select(func.count()).select_from(SubmissionModel), form_id, predicates
+    )
+
+
+def _json_type_expr(flat_key: str) -> Any:
+    return func.json_type(SubmissionModel.data_json, literal_column(_json_path_sql(flat_key)))
+
+
+def _numeric_value_expr(flat_key: str) -> Any:
+    # 数値以外（文字列・真偽値など）は集計から外す。stats.is_stats_number と同じ条件。
+    return case((_json_type_expr(flat_key).in_(["integer", "real"]), _field_value_expr(flat_key)))
+
+
+def _combine_summary(kind: str, values: list[Any]) -> Any:
+    present = [value for value in values if value is not None]
+    if not present:
+        return None
+    if kind == "min":
+        return min(present)
+    if kind == "max":
+        return max(present)
+    return sum(present)
+
+
+def aggregate_submission_stats(
+    conn: Connection,
+    form_id: str,
+    predicates: list[dict[str, Any]] | None,
+    specs: list[dict[str, Any]],
+    bins: int,
+) -> dict[str, Any]:
+    # 集計は SQL で行い、結果の形は stats.aggregate_submissions にそろえる。
+    # 項目数によらず、日別件数と要約・選択肢と区間ごとの件数の 2 回の問い合わせで済ませる。
+    summary_columns: list[Any] = []
+    summary_kinds: list[str] = []
+    for spec in specs:
+        if spec["type"] == "boolean":
+            # stats.aggregate_submissions と同じく JSON の true だけを数える
+            summary_columns.append(
+                func.sum(case((_json_type_expr(spec["key"]) == "true", 1), else_=0))
+            )
+            summary_kinds.append("sum")
+        elif spec["type"] in {"number", "integer"}:
+            value = _numeric_value_expr(spec["key"])
+            summary_columns += [func.count(value), func.min(value), func.max(value), func.sum(value)]
+            summary_kinds += ["sum", "min", "max", "sum"]
+    day = func.date(SubmissionModel.created_at)
+    day_rows = conn.execute(
+        _filter_submissions(select(day, func.count(), *summary_columns), form_id, predicates)
+        .group_by(day)
+        .order_by(day)
+    ).all()
+    result: dict[str, Any] = {
+        "total": sum(row[1] for row in day_rows),
+        "days": [{"date": row[0], "count": row[1]} for row in day_rows if row[0]],
+        "fields": {spec["key"]: empty_field_stats(spec) for spec in specs},
+    }
+    # 日ごとの要約を足し合わせる
+    summary = iter(
+        _combine_summary(kind, [row[index] for row in day_rows])
+        for index, kind in enumerate(summary_kinds, start=2)
+    )
+
+    # 選択肢の値と数値の区間を (項目, 値) の組にして、1 回の GROUP BY で数える
+    slots: list[tuple[str, Any]] = []
+    for spec in specs:
+        stats = result["fields"][spec["key"]]
+        if spec["type"] == "boolean":
+            true_count = next(summary) or 0
+            stats["counts"] = {"true": true_count, "false": result["total"] - true_count}
+        elif spec["type"] == "enum":
+            slots.append(
+                (
+                    spec["key"],
+                    case(
+                        (
+                            _json_type_expr(spec["key"]).in_(["text", "integer", "real"]),
+                            _field_value_expr(spec["key"]),
+                        )
+                    ),
+                )
+            )
+        elif spec["type"] in {"number", "integer"}:
+            count, low, high, total = (next(summary) for _ in range(4))
+            if not count:
+                continue
+            stats.update({"count": count, "min": low, "max": high, "sum": total})
+            value = _numeric_value_expr(spec["key"])
+            bucket = (
+                func.min(bins - 1, cast((value - low) * float(bins) / (high - low), Integer))
+                if high > low
+                else literal_column("0")
+            )
+            slots.append((spec["key"], case((value.is_not(None), bucket))))
+
+    counts: dict[str, dict[Any, int]] = {key: {} for key, _ in slots}
+    if slots:
+        # 各行を項目の数だけ複製し、項目ごとの値（区間）を 1 つの列に取り出す
+        keys = (
+            select(literal(slots[0][0]).label("key"))
+            .union_all(*(select(literal(key)) for key, _ in slots[1:]))
+            .subquery("stats_keys")
+        )
+        slot = case(*((keys.c.key == key, expr) for key, expr in slots))
+        pairs = _filter_submissions(
+            select(keys.c.key, slot.label("slot")).select_from(
+                SubmissionModel.__table__.join(keys, true())
+            ),
+            form_id,
+            predicates,
+        ).subquery("stats_slots")
+        rows = conn.execute(
+            select(pairs.c.key, pairs.c.slot, func.count())
+            .where(pairs.c.slot.is_not(None))
+            .group_by(pairs.c.key, pairs.c.slot)
+        )
+        for key, value, count in rows:
+            counts[key][value] = count
+
+    for spec in specs:
+        stats = result["fields"][spec["key"]]
+        if spec["type"] == "enum":
+            enum_counts: dict[str, int] = {}
+            for option, count in counts[spec["key"]].items():
+                enum_counts[str(option)] = enum_counts.get(str(option), 0) + count
+            stats["counts"] = finish_enum_counts(spec, enum_counts)
+        elif spec["type"] in {"number", "integer"} and stats["count"]:
+            finish_number_stats(stats, counts[spec["key"]], bins)
+    return result
+
+
+def submission_to_row(submission: dict[str, Any]) -> SubmissionModel:
+    return SubmissionModel(
+        id=submission["id"],
+        form_id=submission["form_id"],
+        data_json=dumps_json(submission["data_json"]),
+        created_at=submission["created_at"],
+    )
+
+
+class LazySubmission(dict):
+    # data_json は最初に参照されるまで JSON 文字列のまま保持する。
+    # dict の高速経路で未展開の状態が漏れないよう、全体を読み書きする操作では先に展開する。
+    _raw: str | None = None
+
+    def __init__(self, raw_data_json: str | None, **values: Any) -> None:
+        super().__init__(**values)
+        if raw_data_json:
+            self._raw = raw_data_json
+        else:
+            dict.__setitem__(self, "data_json", {})
+
+    def _load(self) -> None:
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            dict.__setitem__(self, "data_json", loads_json(raw) or {})
+
+    def __missing__(self, key: Any) -> Any:
+        if key == "data_json" and self._raw is not None:
+            self._load()
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key == "data_json":
+            self._load()
+        return dict.get(self, key, default)
+
+    def __contains__(self, key: Any) -> bool:
+        return (key == "data_json" and self._raw is not None) or dict.__contains__(self, key)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        if key == "data_json":
+            self._raw = None
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self._load()
+        dict.__delitem__(self, key)
+
+    def __iter__(self) -> Iterator[Any]:
+        self._load()
+        return dict.__iter__(self)
+
+    def __len__(self) -> int:
+        self._load()
+        return dict.__len__(self)
+
+    def __eq__(self, other: object) -> bool:
+        self._load()
+        if isinstance(other, LazySubmission):
+            other._load()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        self._load()
+        return dict.__repr__(self)
+
+    def keys(self) -> Any:
+        self._load()
+        return dict.keys(self)
+
+    def values(self) -> Any:
+        self._load()
+        return dict.values(self)
+
+    def items(self) -> Any:
+        self._load()
+        return dict.items(self)
+
+    def copy(self) -> dict[str, Any]:
+        self._load()
+        return dict(dict.items(self))
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        self._load()
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        self._load()
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self._load()
+        dict.update(self, *args, **kwargs)
+
+
+def submission_to_dict(row: Row) -> dict[str, Any]:
+    submission_id, form_id, data_json, created_at = row
+    return LazySubmission(data_json, id=submission_id, form_id=form_id, created_at=created_at)
+
+
+def projected_submission_to_dict(row: Row, project: list[str]) -> dict[str, Any]:
+    submission_id, form_id, values_json, created_at = row
+    values = loads_json(values_json) if project else []
+    return {
+        "id": submission_id,
+        "form_id": form_id,
+        "data_json": build_projection(project, values or []),
+        "created_at": created_at,
+    }
+
+
+def file_to_row(file_meta: dict[str, Any]) -> FileModel:
+    return FileModel(
+        id=file_meta["id"],
+        form_id=file_meta["form_id"],
+        original_name=file_meta["original_name"],
+        stored_path=file_meta["stored_path"],
+        content_type=file_meta["content_type"],
+        size=file_meta["size"],
+        created_at=file_meta["created_at"],
+    )
+
+
+def file_to_dict(row: Row) -> dict[str, Any]:
+    file_id, form_id, original_name, stored_path, content_type, size, created_at = row
+    return {
+        "id": file_id,
+        "form_id": form_id,
+        "original_name": original_name,
+        "stored_path": stored_path,
+        "content_type": content_type,
+        "size": size,
+        "created_at": created_at,
+    }
+
 
 class SQLiteFormRepo:
-    def __init__(self, session_factory: sessionmaker) -> None:
+    def __init__(self, engine: Engine, session_factory: sessionmaker) -> None:
+        self._engine = engine
         self._Session = session_factory
 
     def list_forms(self) -> list[dict[str, Any]]:
-        with self._Session() as session:
-            rows = session.query(FormModel).order_by(FormModel.updated_at.desc()).all()
-            return [self._to_dict(row) for row in rows]
+        with self._engine.connect() as conn:
+            return [form_to_dict(row) for row in conn.execute(FORM_LIST_STMT)]
 
     def get_form(self, form_id: str) -> dict[str, Any] | None:
-        with self._Session() as session:
-            row = session.get(FormModel, form_id)
-            return self._to_dict(row) if row else None
+        with self._engine.connect() as conn:
+            row = conn.execute(FORM_BY_ID_STMT, {"form_id": form_id}).first()
+            return form_to_dict(row) if row else None
 
     def get_form_by_public_id(self, public_id: str) -> dict[str, Any] | None:
-        with self._Session() as session:
-            row = session.query(FormModel).filter(FormModel.public_id == public_id).first()
-            return self._to_dict(row) if row else None
+        with self._engine.connect() as conn:
+            row = conn.execute(FORM_BY_PUBLIC_ID_STMT, {"public_id": public_id}).first()
+            return form_to_dict(row) if row else None
 
     def create_form(self, form: dict[str, Any]) -> None:
         with self._Session() as session:
-            row = FormModel(
-                id=form["id"],
-                public_id=form["public_id"],
-                name=form["name"],
-                description=form["description"],
-                status=form["status"],
-                schema_json=dumps_json(form["schema_json"]),
-                field_order=dumps_json(form["field_order"]),
-                created_at=form["created_at"],
-                updated_at=form["updated_at"],
-            )
+            row = form_to_row(form)
             session.add(row)
+            sync_form_schema(session, row)
             session.commit()
 
     def update_form(self, form_id: str, updates: dict[str, Any]) -> dict[str, Any]:
@@ -50,14 +831,12 @@ class SQLiteFormRepo:
             row = session.get(FormModel, form_id)
             if not row:
                 raise KeyError(form_id)
-            for key, value in updates.items():
-                if key in {"schema_json", "field_order"}:
-                    setattr(row, key, dumps_json(value))
-                else:
-                    setattr(row, key, value)
+            previous_search = form_search_signature(row)
+            apply_form_updates(row, updates)
+            if "schema_json" in updates or "field_order" in updates:
+                sync_form_schema(session, row, previous_search)
             session.commit()
-            session.refresh(row)
-            return self._to_dict(row)
+            return form_to_dict(session.execute(FORM_BY_ID_STMT, {"form_id": form_id}).one())
 
     def set_status(self, form_id: str, status: str) -> None:
         with self._Session() as session:
@@ -73,104 +852,218 @@ class SQLiteFormRepo:
             row = session.get(FormModel, form_id)
             if row:
                 session.delete(row)
+                resync_field_indexes(session)
                 session.commit()
 
-    @staticmethod
-    def _to_dict(row: FormModel) -> dict[str, Any]:
-        return {
-            "id": row.id,
-            "public_id": row.public_id,
-            "name": row.name,
-            "description": row.description or "",
-            "status": row.status,
-            "schema_json": loads_json(row.schema_json) or {},
-            "field_order": loads_json(row.field_order) or [],
-            "created_at": row.created_at,
-            "updated_at": row.updated_at,
-        }
-
 
 class SQLiteSubmissionRepo:
-    def __init__(self, session_factory: sessionmaker) -> None:
+    def __init__(self, engine: Engine, session_factory: sessionmaker) -> None:
+        self._engine = engine
         self._Session = session_factory
 
     def list_submissions(self, form_id: str) -> list[dict[str, Any]]:
-        with self._Session() as session:
-            rows = (
-                session.query(SubmissionModel)
-                .filter(SubmissionModel.form_id == form_id)
-                .order_by(SubmissionModel.created_at.desc())
-                .all()
+        return self.query_submissions(form_id)
+
+    def query_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        limit: int | None = None,
+        after_cursor: tuple[datetime, str] | None = None,
+        project: list[str] | None = None,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        stmt = submission_query_stmt(
+            form_id, predicates, order, limit, after_cursor, project, offset
+        )
+        with self._engine.connect() as conn:
+            rows = conn.execute(stmt)
+            if project is not None:
+                return [projected_submission_to_dict(row, project) for row in rows]
+            return [submission_to_dict(row) for row in rows]
+
+    def count_submissions(
+        self, form_id: str, predicates: list[dict[str, Any]] | None = None
+    ) -> int:
+        with self._engine.connect() as conn:
+            return conn.execute(submission_count_stmt(form_id, predicates)).scalar_one()
+
+    def page_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        limit: int,
+        offset: int,
+    ) -> tuple[int, list[dict[str, Any]]]:
+        stmt = submission_query_stmt(form_id, predicates, limit=limit, offset=offset)
+        with self._engine.connect() as conn:
+            total = conn.execute(submission_count_stmt(form_id, predicates)).scalar_one()
+            return total, [submission_to_dict(row) for row in conn.execute(stmt)]
+
+    def aggregate_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        specs: list[dict[str, Any]],
+        bins: int,
+    ) -> dict[str, Any]:
+        with self._engine.connect() as conn:
+            return aggregate_submission_stats(conn, form_id, predicates, specs, bins)
+
+    def get_submissions(self, form_id: str, submission_ids: list[str]) -> list[dict[str, Any]]:
+        found: dict[str, dict[str, Any]] = {}
+        with self._engine.connect() as conn:
+            for start in range(0, len(submission_ids), SUBMISSION_BATCH_CHUNK_SIZE):
+                chunk = submission_ids[start : start + SUBMISSION_BATCH_CHUNK_SIZE]
+                params = {"form_id": form_id, "submission_ids": chunk}
+                for row in conn.execute(SUBMISSIONS_BY_ID_STMT, params):
+                    found[row.id] = submission_to_dict(row)
+        return [found[submission_id] for submission_id in submission_ids if submission_id in found]
+
+    def data_version(self, form_id: str) -> str:
+        with self._engine.connect() as conn:
+            version = conn.execute(SUBMISSION_VERSION_STMT, {"form_id": form_id}).scalar()
+        return str(version or 0)
+
+    def iter_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        batch_size: int = 500,
+        after_cursor: tuple[datetime, str] | None = None,
+    ) -> Iterator[list[dict[str, Any]]]:
+        while True:
+            page = self.query_submissions(
+                form_id, predicates, order=order, limit=batch_size, after_cursor=after_cursor
             )
-            return [self._to_dict(row) for row in rows]
+            if not page:
+                return
+            yield page
+            if len(page) < batch_size:
+                return
+            last = page[-1]
+            after_cursor = (last["created_at"], last["id"])
 
     def create_submission(self, submission: dict[str, Any]) -> None:
         with self._Session() as session:
-            row = SubmissionModel(
-                id=submission["id"],
-                form_id=submission["form_id"],
-                data_json=dumps_json(submission["data_json"]),
-                created_at=submission["created_at"],
-            )
-            session.add(row)
+            session.add(submission_to_row(submission))
+            index_submission_search(session, [submission])
+            session.commit()
+
+    def create_submissions(self, submissions: list[dict[str, Any]]) -> None:
+        with self._Session() as session:
+            session.add_all([submission_to_row(submission) for submission in submissions])
+            index_submission_search(session, submissions)
             session.commit()
 
-    def delete_submission(self, submission_id: str) -> None:
+    def delete_submission(self, submission_id: str, form_id: str | None = None) -> None:
         with self._Session() as session:
             row = session.get(SubmissionModel, submission_id)
-            if row:
+            if row and (form_id is None or row.form_id == form_id):
                 session.delete(row)
+                remove_submission_search(session, submission_id)
                 session.commit()
 
-    @staticmethod
-    def _to_dict(row: SubmissionModel) -> dict[str, Any]:
-        return {
-            "id": row.id,
-            "form_id": row.form_id,
-            "data_json": loads_json(row.data_json) or {},
-            "created_at": row.created_at,
-        }
+    def substring_candidates(
+        self, form_id: str, filters: list[dict[str, Any]]
+    ) -> dict[str, set[str]]:
+        return {}
 
 
 class SQLiteFileRepo:
-    def __init__(self, session_factory: sessionmaker) -> None:
+    def __init__(self, engine: Engine, session_factory: sessionmaker) -> None:
+        self._engine = engine
         self._Session = session_factory
 
     def create_file(self, file_meta: dict[str, Any]) -> None:
         with self._Session() as session:
-            row = FileModel(
-                id=file_meta["id"],
-                form_id=file_meta["form_id"],
-                original_name=file_meta["original_name"],
-                stored_path=file_meta["stored_path"],
-                content_type=file_meta["content_type"],
-                size=file_meta["size"],
-                created_at=file_meta["created_at"],
-            )
-            session.add(row)
+            session.add(file_to_row(file_meta))
             session.commit()
 
-    def get_file(self, file_id: str) -> dict[str, Any] | None:
+    def create_files(self, files: list[dict[str, Any]]) -> None:
         with self._Session() as session:
-            row = session.get(FileModel, file_id)
-            if not row:
-                return None
-            return {
-                "id": row.id,
-                "form_id": row.form_id,
-                "original_name": row.original_name,
-                "stored_path": row.stored_path,
-                "content_type": row.content_type,
-                "size": row.size,
-                "created_at": row.created_at,
-            }
+            session.add_all([file_to_row(file_meta) for file_meta in files])
+            session.commit()
+
+    def iter_files(self, batch_size: int = 500) -> Iterator[list[dict[str, Any]]]:
+        after_id = ""
+        while True:
+            with self._engine.connect() as conn:
+                rows = conn.execute(
+                    FILE_PAGE_STMT, {"after_id": after_id, "batch_size": batch_size}
+                ).all()
+            if not rows:
+                return
+            yield [file_to_dict(row) for row in rows]
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1][0]
+
+    def get_file(self, file_id: str) -> dict[str, Any] | None:
+        with self._engine.connect() as conn:
+            row = conn.execute(FILE_BY_ID_STMT, {"file_id": file_id}).first()
+            return file_to_dict(row) if row else None
+
+    def get_files(self, file_ids: list[str]) -> list[dict[str, Any]]:
+        files: list[dict[str, Any]] = []
+        with self._engine.connect() as conn:
+            for start in range(0, len(file_ids), SUBMISSION_BATCH_CHUNK_SIZE):
+                chunk = file_ids[start : start + SUBMISSION_BATCH_CHUNK_SIZE]
+                files.extend(
+                    file_to_dict(row) for row in conn.execute(FILES_BY_ID_STMT, {"file_ids": chunk})
+                )
+        return files
+
+
+def create_sqlite_engine(
+    db_path: Path,
+    pragmas: dict[str, str] | None = None,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: int = 30,
+) -> Engine:
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        future=True,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+    )
+    if pragmas:
+        event.listen(engine, "connect", lambda dbapi_conn, _: apply_pragmas(dbapi_conn, pragmas))
+    return engine
+
+
+def apply_pragmas(dbapi_conn: Any, pragmas: dict[str, str]) -> None:
+    cursor = dbapi_conn.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
 
 
 class SQLiteStorage:
-    def __init__(self, db_path: Path) -> None:
-        self._engine = create_engine(f"sqlite:///{db_path}", future=True)
+    def __init__(
+        self,
+        db_path: Path,
+        pragmas: dict[str, str] | None = None,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: int = 30,
+    ) -> None:
+        self._engine = create_sqlite_engine(
+            db_path,
+            pragmas=pragmas,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+        )
         self._Session = sessionmaker(self._engine, expire_on_commit=False)
         Base.metadata.create_all(self._engine)
-        self.forms = SQLiteFormRepo(self._Session)
-        self.submissions = SQLiteSubmissionRepo(self._Session)
-        self.files = SQLiteFileRepo(self._Session)
+        apply_migrations(self._engine)
+        self.forms = SQLiteFormRepo(self._engine, self._Session)
+        self.submissions = SQLiteSubmissionRepo(self._engine, self._Session)
+        self.files = SQLiteFileRepo(self._engine, self._Session)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from schemaform.config import SUBMISSION_BATCH_CHUNK_SIZE
+from schemaform.models import FormModel, SubmissionModel
+from schemaform.repo_sqlite import (
+    FILE_BY_ID_STMT,
+    FILES_BY_ID_STMT,
+    FORM_BY_ID_STMT,
+    FORM_BY_PUBLIC_ID_STMT,
+    FORM_LIST_STMT,
+    SUBMISSION_VERSION_STMT,
+    SUBMISSIONS_BY_ID_STMT,
+    aggregate_submission_stats,
+    apply_form_updates,
+    apply_pragmas,
+    file_to_dict,
+    file_to_row,
+    form_search_signature,
+    form_to_dict,
+    form_to_row,
+    index_submission_search,
+    projected_submission_to_dict,
+    remove_submission_search,
+    resync_field_indexes,
+    submission_count_stmt,
+    submission_query_stmt,
+    submission_to_dict,
+    submission_to_row,
+    sync_form_schema,
+)
+from schemaform.utils import now_utc
+
+
+class AsyncSQLiteFormRepo:
+    def __init__(self, engine: AsyncEngine, session_factory: async_sessionmaker) -> None:
+        self._engine = engine
+        self._Session = session_factory
+
+    async def list_forms(self) -> list[dict[str, Any]]:
+        async with self._engine.connect() as conn:
+            rows = (await conn.execute(FORM_LIST_STMT)).all()
+            return [form_to_dict(row) for row in rows]
+
+    async def get_form(self, form_id: str) -> dict[str, Any] | None:
+        async with self._engine.connect() as conn:
+            row = (await conn.execute(FORM_BY_ID_STMT, {"form_id": form_id})).first()
+            return form_to_dict(row) if row else None
+
+    async def get_form_by_public_id(self, public_id: str) -> dict[str, Any] | None:
+        async with self._engine.connect() as conn:
+            row = (await conn.execute(FORM_BY_PUBLIC_ID_STMT, {"public_id": public_id})).first()
+            return form_to_dict(row) if row else None
+
+    async def create_form(self, form: dict[str, Any]) -> None:
+        async with self._Session() as session:
+            row = form_to_row(form)
+            session.add(row)
+            await session.run_sync(sync_form_schema, row)
+            await session.commit()
+
+    async def update_form(self, form_id: str, updates: dict[str, Any]) -> dict[str, Any]:
+        async with self._Session() as session:
+            row = await session.get(FormModel, form_id)
+            if not row:
+                raise KeyError(form_id)
+            previous_search = form_search_signature(row)
+            apply_form_updates(row, updates)
+            if "schema_json" in updates or "field_order" in updates:
+                await session.run_sync(sync_form_schema, row, previous_search)
+            await session.commit()
+            row = (await session.execute(FORM_BY_ID_STMT, {"form_id": form_id})).one()
+            return form_to_dict(row)
+
+    async def set_status(self, form_id: str, status: str) -> None:
+        async with self._Session() as session:
+            row = await session.get(FormModel, form_id)
+            if not row:
+                raise KeyError(form_id)
+            row.status = status
+            row.updated_at = now_utc()
+            await session.commit()
+
+    async def delete_form(self, form_id: str) -> None:
+        async with self._Session() as session:
+            row = await session.get(FormModel, form_id)
+            if row:
+                await session.delete(row)
+                await session.run_sync(resync_field_indexes)
+                await session.commit()
+
+
+class AsyncSQLiteSubmissionRepo:
+    def __init__(self, engine: AsyncEngine, session_factory: async_sessionmaker) -> None:
+        self._engine = engine
+        self._Session = session_factory
+
+    async def list_submissions(self, form_id: str) -> list[dict[str, Any]]:
+        return await self.query_submissions(form_id)
+
+    async def query_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None = None,
+        order: str = "desc",
+        limit: int | None = None,
+        after_cursor: tuple[datetime, str] | None = None,
+        project: list[str] | None = None,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        stmt = submission_query_stmt(
+            form_id, predicates, order, limit, after_cursor, project, offset
+        )
+        async with self._engine.connect() as conn:
+            rows = (await conn.execute(stmt)).all()
+            if project is not None:
+                return [projected_submission_to_dict(row, project) for row in rows]
+            return [submission_to_dict(row) for row in rows]
+
+    async def count_submissions(
+        self, form_id: str, predicates: list[dict[str, Any]] | None = None
+    ) -> int:
+        async with self._engine.connect() as conn:
+            result = await conn.execute(submission_count_stmt(form_id, predicates))
+            return result.scalar_one()
+
+    async def page_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        limit: int,
+        offset: int,
+    ) -> tuple[int, list[dict[str, Any]]]:
+        stmt = submission_query_stmt(form_id, predicates, limit=limit, offset=offset)
+        async with self._engine.connect() as conn:
+            total = (await conn.execute(submission_count_stmt(form_id, predicates))).scalar_one()
+            rows = (await conn.execute(stmt)).all()
+            return total, [submission_to_dict(row) for row in rows]
+
+    async def aggregate_submissions(
+        self,
+        form_id: str,
+        predicates: list[dict[str, Any]] | None,
+        specs: list[dict[str, Any]],
+        bins: int,
+    ) -> dict[str, Any]:
+        async with self._engine.connect() as conn:
+            return await conn.run_sync(
+                aggregate_submission_stats, form_id, predicates, specs, bins
+            )
+
+    async def get_submissions(
+        self, form_id: str, submission_ids: list[str]
+    ) -> list[dict[str, Any]]:
+        found: dict[str, dict[str, Any]] = {}
+        async with self._engine.connect() as conn:
+            for start in range(0, len(submission_ids), SUBMISSION_BATCH_CHUNK_SIZE):
+                chunk = submission_ids[start : start + SUBMISSION_BATCH_CHUNK_SIZE]
+                params = {"form_id": form_id, "submission_ids": chunk}
+                result = await conn.execute(SUBMISSIONS_BY_ID_STMT, params)
+                for row in result:
+                    found[row.id] = submission_to_dict(row)
+        return [found[submission_id] for submission_id in submission_ids if submission_id in found]
+
+    async def data_version(self, form_id: str) -> str:
+        async with self._engine.connect() as conn:
+            result = await conn.execute(SUBMISSION_VERSION_STMT, {"form_id": form_id})
+            version = result.scalar()
+        return str(version or 0)
+
+    async def create_submission(self, submission: dict[str, Any]) -> None:
+        async with self._Session() as session:
+            session.add(submission_to_row(submission))
+            await session.run_sync(index_submission_search, [submission])
+            await session.commit()
+
+    async def create_submissions(self, submissions: list[dict[str, Any]]) -> None:
+        async with self._Session() as session:
+            session.add_all([submission_to_row(submission) for submission in submissions])
+            await session.run_sync(index_submission_search, submissions)
+            await session.commit()
+
+    async def delete_submission(self, submission_id: str, form_id: str | None = None) -> None:
+        async with self._Session() as session:
+            row = await session.get(SubmissionModel, submission_id)
+            if row and (form_id is None or row.form_id == form_id):
+                await session.delete(row)
+                await session.run_sync(remove_submission_search, submission_id)
+                await session.commit()
+
+    async def substring_candidates(
+        self, form_id: str, filters: list[dict[str, Any]]
+    ) -> dict[str, set[str]]:
+        return {}
+
+
+class AsyncSQLiteFileRepo:
+    def __init__(self, engine: AsyncEngine, session_factory: async_sessionmaker) -> None:
+        self._engine = engine
+        self._Session = session_factory
+
+    async def create_file(self, file_meta: dict[str, Any]) -> None:
+        async with self._Session() as session:
+            session.add(file_to_row(file_meta))
+            await session.commit()
+
+    async def get_file(self, file_id: str) -> dict[str, Any] | None:
+        async with self._engine.connect() as conn:
+            row = (await conn.execute(FILE_BY_ID_STMT, {"file_id": file_id})).first()
+            return file_to_dict(row) if row else None
+
+    async def get_files(self, file_ids: list[str]) -> list[dict[str, Any]]:
+        files: list[dict[str, Any]] = []
+        async with self._engine.connect() as conn:
+            for start in range(0, len(file_ids), SUBMISSION_BATCH_CHUNK_SIZE):
+                chunk = file_ids[start : start + SUBMISSION_BATCH_CHUNK_SIZE]
+                result = await conn.execute(FILES_BY_ID_STMT, {"file_ids": chunk})
+                files.extend(file_to_dict(row) for row in result)
+        return files
+
+
+def create_async_sqlite_engine(
+    db_path: Path,
+    pragmas: dict[str, str] | None = None,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: int = 30,
+) -> AsyncEngine:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+    )
+    if pragmas:
+        event.listen(
+            engine.sync_engine,
+            "connect",
+            lambda dbapi_conn, _: apply_pragmas(dbapi_conn, pragmas),
+        )
+    return engine
+
+
+class AsyncSQLiteStorage:
+    # テーブル作成とマイグレーションは同期側の SQLiteStorage が先に行う。
+    def __init__(
+        self,
+        db_path: Path,
+        pragmas: dict[str, str] | None = None,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: int = 30,
+    ) -> None:
+        self._engine = create_async_sqlite_engine(
+            db_path,
+            pragmas=pragmas,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+        )
+        self._Session = async_sessionmaker(self._engine, expire_on_commit=False)
+        self.forms = AsyncSQLiteFormRepo(self._engine, self._Session)
+        self.submissions = AsyncSQLiteSubmissionRepo(self._engine, self._Session)
+        self.files = AsyncSQLiteFileRepo(self._engine, self._Session)
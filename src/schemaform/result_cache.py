@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+FILTER_PARAM_PREFIXES = ("f_",)
+FILTER_PARAM_KEYS = {"q", "submitted_from", "submitted_to"}
+
+
+def normalize_filter_params(query_params: dict[str, Any]) -> tuple[tuple[str, str], ...]:
+    # ページ番号や出力形式は結果に影響しないので、絞り込みに使う値だけでキーを作る
+    items = []
+    for key, value in query_params.items():
+        if key not in FILTER_PARAM_KEYS and not key.startswith(FILTER_PARAM_PREFIXES):
+            continue
+        text = str(value).strip()
+        if text:
+            items.append((key, text))
+    return tuple(sorted(items))
+
+
+class FilterResultCache:
+    # 絞り込み結果（一致した行のキーの並び）を保持する LRU。キーにフォームの
+    # スキーマ更新日時と送信データの版を含めるので、書き込みや変更の後は自然に外れる。
+    def __init__(self, max_entries: int = 128, max_rows: int = 1_000_000) -> None:
+        self._max_entries = max_entries
+        self._max_rows = max_rows
+        self._entries: OrderedDict[Hashable, list[Any]] = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> list[Any] | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: list[Any]) -> None:
+        if len(value) > self._max_rows:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._rows -= len(previous)
+            self._entries[key] = value
+            self._rows += len(value)
+            while len(self._entries) > self._max_entries or self._rows > self._max_rows:
+                _, evicted = self._entries.popitem(last=False)
+                self._rows -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, form_id: str) -> None:
+        # キーの先頭はフォーム ID。古い版の結果を早めに手放したいときに使う
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == form_id]:
+                self._rows -= len(self._entries.pop(key))
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "rows": self._rows,
+                "max_entries": self._max_entries,
+                "max_rows": self._max_rows,
+            }
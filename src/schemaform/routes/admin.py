@@ -5,10 +5,11 @@ from urllib.parse import urlsplit
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
 
+from schemaform.form_cache import compiled_form
 from schemaform.master import build_master_display_candidates
 from schemaform.schema import (
-    fields_from_schema,
     parse_fields_json,
     schema_from_fields,
 )
@@ -61,9 +62,9 @@ async def home(request: Request) -> HTMLResponse:
 
 @router.get("/admin/forms", response_class=HTMLResponse, tags=["admin"])
 async def list_forms(request: Request, _: Any = Depends(admin_guard)) -> HTMLResponse:
-    storage = request.app.state.storage
+    storage = request.app.state.async_storage
     templates = request.app.state.templates
-    forms = storage.forms.list_forms()
+    forms = await storage.forms.list_forms()
     return templates.TemplateResponse(
         "admin_forms.html",
         {"request": request, "forms": forms},
@@ -72,9 +73,10 @@ async def list_forms(request: Request, _: Any = Depends(admin_guard)) -> HTMLRes
 
 @router.get("/admin/forms/new", response_class=HTMLResponse, tags=["admin"])
 async def new_form(request: Request, _: Any = Depends(admin_guard)) -> HTMLResponse:
-    storage = request.app.state.storage
     templates = request.app.state.templates
-    master_forms, master_field_catalog = build_master_field_catalog(storage)
+    master_forms, master_field_catalog = await run_in_threadpool(
+        build_master_field_catalog, request.app.state.storage
+    )
     return templates.TemplateResponse(
         "admin_form_builder.html",
         {
@@ -91,7 +93,7 @@ async def new_form(request: Request, _: Any = Depends(admin_guard)) -> HTMLRespo
 
 @router.post("/admin/forms", response_class=HTMLResponse, tags=["admin"])
 async def create_form(request: Request, _: Any = Depends(admin_guard)) -> HTMLResponse:
-    storage = request.app.state.storage
+    storage = request.app.state.async_storage
     templates = request.app.state.templates
     form_data = await request.form()
     name = str(form_data.get("name", "")).strip()
@@ -99,7 +101,9 @@ async def create_form(request: Request, _: Any = Depends(admin_guard)) -> HTMLRe
     fields_json = str(form_data.get("fields_json", ""))
 
     fields, errors = parse_fields_json(fields_json)
-    master_forms, master_field_catalog = build_master_field_catalog(storage)
+    master_forms, master_field_catalog = await run_in_threadpool(
+        build_master_field_catalog, request.app.state.storage
+    )
     if not name:
         errors.append("フォーム名は必須です")
 
@@ -121,7 +125,7 @@ async def create_form(request: Request, _: Any = Depends(admin_guard)) -> HTMLRe
     form_id = new_ulid()
     public_id = new_short_id()
     now = now_utc()
-    storage.forms.create_form(
+    await storage.forms.create_form(
         {
             "id": form_id,
             "public_id": public_id,
@@ -139,13 +143,15 @@ async def create_form(request: Request, _: Any = Depends(admin_guard)) -> HTMLRe
 
 @router.get("/admin/forms/{form_id}", response_class=HTMLResponse, tags=["admin"])
 async def edit_form(request: Request, form_id: str, _: Any = Depends(admin_guard)) -> HTMLResponse:
-    storage = request.app.state.storage
+    storage = request.app.state.async_storage
     templates = request.app.state.templates
-    form = storage.forms.get_form(form_id)
+    form = await storage.forms.get_form(form_id)
     if not form:
         raise HTTPException(status_code=404, detail="フォームが見つかりません")
-    fields = fields_from_schema(form["schema_json"], form.get("field_order", []))
-    master_forms, master_field_catalog = build_master_field_catalog(storage, current_form_id=form_id)
+    fields = compiled_form(form)["fields"]
+    master_forms, master_field_catalog = await run_in_threadpool(
+        build_master_field_catalog, request.app.state.storage, form_id
+    )
     return templates.TemplateResponse(
         "admin_form_builder.html",
         {
@@ -162,9 +168,9 @@ async def edit_form(request: Request, form_id: str, _: Any = Depends(admin_guard
 
 @router.post("/admin/forms/{form_id}", response_class=HTMLResponse, tags=["admin"])
 async def update_form(request: Request, form_id: str, _: Any = Depends(admin_guard)) -> HTMLResponse:
-    storage = request.app.state.storage
+    storage = request.app.state.async_storage
     templates = request.app.state.templates
-    form = storage.forms.get_form(form_id)
+    form = await storage.forms.get_form(form_id)
     if not form:
         raise HTTPException(status_code=404, detail="フォームが見つかりません")
 
@@ -174,7 +180,9 @@ async def update_form(request: Request, form_id: str, _: Any = Depends(admin_gua
     fields_json = str(form_data.get("fields_json", ""))
 
     fields, errors = parse_fields_json(fields_json)
-    master_forms, master_field_catalog = build_master_field_catalog(storage, current_form_id=form_id)
+    master_forms, master_field_catalog = await run_in_threadpool(
+        build_master_field_catalog, request.app.state.storage, form_id
+    )
     if not name:
         errors.append("フォーム名は必須です")
 
@@ -193,7 +201,7 @@ async def update_form(request: Request, form_id: str, _: Any = Depends(admin_gua
         )
 
     schema, field_order = schema_from_fields(fields)
-    updated = storage.forms.update_form(
+    updated = await storage.forms.update_form(
         form_id,
         {
             "name": name,
@@ -208,22 +216,22 @@ async def update_form(request: Request, form_id: str, _: Any = Depends(admin_gua
 
 @router.post("/admin/forms/{form_id}/publish", tags=["admin"])
 async def publish_form(request: Request, form_id: str, _: Any = Depends(admin_guard)) -> RedirectResponse:
-    storage = request.app.state.storage
-    storage.forms.set_status(form_id, "active")
+    storage = request.app.state.async_storage
+    await storage.forms.set_status(form_id, "active")
     target = resolve_redirect_target(request.query_params.get("next"))
     return RedirectResponse(target, status_code=303)
 
 
 @router.post("/admin/forms/{form_id}/stop", tags=["admin"])
 async def stop_form(request: Request, form_id: str, _: Any = Depends(admin_guard)) -> RedirectResponse:
-    storage = request.app.state.storage
-    storage.forms.set_status(form_id, "inactive")
+    storage = request.app.state.async_storage
+    await storage.forms.set_status(form_id, "inactive")
     target = resolve_redirect_target(request.query_params.get("next"))
     return RedirectResponse(target, status_code=303)
 
 
 @router.post("/admin/forms/{form_id}/delete", tags=["admin"])
 async def delete_form(request: Request, form_id: str, _: Any = Depends(admin_guard)) -> RedirectResponse:
-    storage = request.app.state.storage
-    storage.forms.delete_form(form_id)
+    storage = request.app.state.async_storage
+    await storage.forms.delete_form(form_id)
     return RedirectResponse("/admin/forms", status_code=303)
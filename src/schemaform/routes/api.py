@@ -4,36 +4,48 @@ from typing import Any
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
+from schemaform.config import API_FILTER_BATCH_SIZE, SUBMISSION_BATCH_CHUNK_SIZE
 from schemaform.filters import (
-    apply_filters,
     collect_file_ids,
+    compile_filters,
     decode_cursor,
     encode_cursor,
-    ensure_aware,
-    resolve_file_names,
+    has_row_filters,
+    iter_filters,
+    resolve_file_names_async,
+    run_filters,
+    split_storage_predicates,
+    substring_filters,
 )
+from schemaform.form_cache import compiled_form
 from schemaform.master import validate_master_references
 from schemaform.schema import (
-    fields_from_schema,
     normalize_field_order,
     sanitize_form_output,
 )
-from schemaform.utils import new_short_id, new_ulid, now_utc, to_iso
+from schemaform.stats import (
+    DEFAULT_HISTOGRAM_BINS,
+    MAX_HISTOGRAM_BINS,
+    aggregate_submissions,
+    stats_specs,
+)
+from schemaform.utils import loads_json, new_short_id, new_ulid, now_utc, to_iso
 
 router = APIRouter()
 
 
 @router.get("/api/forms", tags=["api/forms"])
 async def api_list_forms(request: Request) -> JSONResponse:
-    storage = request.app.state.storage
-    forms = storage.forms.list_forms()
+    storage = request.app.state.async_storage
+    forms = await storage.forms.list_forms()
     return JSONResponse([sanitize_form_output(form) for form in forms])
 
 
 @router.post("/api/forms", tags=["api/forms"])
 async def api_create_form(request: Request) -> JSONResponse:
-    storage = request.app.state.storage
+    storage = request.app.state.async_storage
     payload = await request.json()
     name = str(payload.get("name", "")).strip()
     description = str(payload.get("description", "")).strip()
@@ -47,7 +59,7 @@ async def api_create_form(request: Request) -> JSONResponse:
     form_id = new_ulid()
     public_id = new_short_id()
     now = now_utc()
-    storage.forms.create_form(
+    await storage.forms.create_form(
         {
             "id": form_id,
             "public_id": public_id,
@@ -60,14 +72,14 @@ async def api_create_form(request: Request) -> JSONResponse:
             "updated_at": now,
         }
     )
-    form = storage.forms.get_form(form_id)
+    form = await storage.forms.get_form(form_id)
     return JSONResponse(sanitize_form_output(form or {}))
 
 
 @router.put("/api/forms/{form_id}", tags=["api/forms"])
 async def api_update_form(form_id: str, request: Request) -> JSONResponse:
-    storage = request.app.state.storage
-    form = storage.forms.get_form(form_id)
+    storage = request.app.state.async_storage
+    form = await storage.forms.get_form(form_id)
     if not form:
         raise HTTPException(status_code=404, detail="フォームが見つかりません")
     payload = await request.json()
@@ -88,16 +100,14 @@ async def api_update_form(form_id: str, request: Request) -> JSONResponse:
     if "status" in payload:
         updates["status"] = str(payload.get("status") or "inactive")
     updates["updated_at"] = now_utc()
-    updated = storage.forms.update_form(form_id, updates)
+    updated = await storage.forms.update_form(form_id, updates)
     return JSONResponse(sanitize_form_output(updated))
 
 
 @router.post("/api/public/forms/{public_id}/submissions", tags=["api/submissions"])
 async def api_submit_form(public_id: str, request: Request) -> JSONResponse:
-    storage = request.app.state.storage
-    from jsonschema import Draft7Validator
-
-    form = storage.forms.get_form_by_public_id(public_id)
+    storage = request.app.state.async_storage
+    form = await storage.forms.get_form_by_public_id(public_id)
     if not form:
         raise HTTPException(status_code=404, detail="フォームが見つかりません")
     if form.get("status") != "active":
@@ -107,54 +117,172 @@ async def api_submit_form(public_id: str, request: Request) -> JSONResponse:
     if not isinstance(data, dict):
         raise HTTPException(status_code=400, detail="data_jsonが不正です")
 
-    validator = Draft7Validator(form["schema_json"])
-    errors = sorted(validator.iter_errors(data), key=lambda err: list(err.path))
-    fields = fields_from_schema(form["schema_json"], form.get("field_order", []))
-    master_errors = validate_master_references(storage, fields, data)
+    compiled = compiled_form(form)
+    errors = sorted(compiled["validator"].iter_errors(data), key=lambda err: list(err.path))
+    master_errors: list[str] = []
+    if compiled["master_keys"]:
+        master_errors = await run_in_threadpool(
+            validate_master_references, request.app.state.storage, compiled["fields"], data
+        )
     if errors or master_errors:
         raise HTTPException(status_code=400, detail="バリデーションに失敗しました")
 
     submission_id = new_ulid()
     created_at = now_utc()
-    storage.submissions.create_submission(
+    await storage.submissions.create_submission(
         {"id": submission_id, "form_id": form["id"], "data_json": data, "created_at": created_at}
     )
     return JSONResponse({"submission_id": submission_id, "created_at": to_iso(created_at)})
 
 
+def parse_batch_items(body: bytes, content_type: str) -> list[Any]:
+    if "ndjson" in content_type:
+        items: list[Any] = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(loads_json(line.decode("utf-8")))
+            except ValueError:
+                # 壊れた行も結果の index を保つため、そのまま不正な項目として扱う。
+                items.append(None)
+        return items
+    try:
+        payload = loads_json(body.decode("utf-8"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="JSONが不正です")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="配列またはNDJSONで送信してください")
+    return payload
+
+
+def validate_batch_items(
+    storage: Any, form: dict[str, Any], items: list[Any]
+) -> list[dict[str, Any] | list[str]]:
+    compiled = compiled_form(form)
+    validator = compiled["validator"]
+    id_cache: dict[str, set[str]] = {}
+    results: list[dict[str, Any] | list[str]] = []
+    for item in items:
+        data = item.get("data_json", item) if isinstance(item, dict) else None
+        if not isinstance(data, dict):
+            results.append(["data_jsonが不正です"])
+            continue
+        errors = [
+            error.message
+            for error in sorted(validator.iter_errors(data), key=lambda err: list(err.path))
+        ]
+        if compiled["master_keys"]:
+            errors.extend(
+                validate_master_references(storage, compiled["fields"], data, id_cache)
+            )
+        results.append(errors or data)
+    return results
+
+
+@router.post("/api/public/forms/{public_id}/submissions/batch", tags=["api/submissions"])
+async def api_submit_form_batch(public_id: str, request: Request) -> JSONResponse:
+    storage = request.app.state.async_storage
+    form = await storage.forms.get_form_by_public_id(public_id)
+    if not form:
+        raise HTTPException(status_code=404, detail="フォームが見つかりません")
+    if form.get("status") != "active":
+        raise HTTPException(status_code=400, detail="このフォームは停止中です")
+    items = parse_batch_items(await request.body(), request.headers.get("content-type", ""))
+
+    validated = await run_in_threadpool(
+        validate_batch_items, request.app.state.storage, form, items
+    )
+    results: list[dict[str, Any]] = []
+    pending: list[tuple[int, dict[str, Any]]] = []
+    for index, outcome in enumerate(validated):
+        if isinstance(outcome, list):
+            results.append(
+                {"index": index, "ok": False, "detail": "バリデーションに失敗しました", "errors": outcome}
+            )
+            continue
+        submission = {
+            "id": new_ulid(),
+            "form_id": form["id"],
+            "data_json": outcome,
+            "created_at": now_utc(),
+        }
+        pending.append((index, submission))
+
+    # 結果は実際に保存できたかどうかで返す。失敗したまとまりの項目だけを失敗として返し、
+    # 先に保存済みのまとまりを再送で重複させないようにする。
+    created = 0
+    for start in range(0, len(pending), SUBMISSION_BATCH_CHUNK_SIZE):
+        chunk = pending[start : start + SUBMISSION_BATCH_CHUNK_SIZE]
+        try:
+            await storage.submissions.create_submissions([submission for _, submission in chunk])
+        except Exception:
+            results.extend(
+                {"index": index, "ok": False, "detail": "保存に失敗しました", "errors": []}
+                for index, _ in chunk
+            )
+            continue
+        created += len(chunk)
+        results.extend(
+            {
+                "index": index,
+                "ok": True,
+                "submission_id": submission["id"],
+                "created_at": to_iso(submission["created_at"]),
+            }
+            for index, submission in chunk
+        )
+    results.sort(key=lambda result: result["index"])
+    return JSONResponse({"created": created, "failed": len(results) - created, "results": results})
+
+
 @router.get("/api/forms/{form_id}/submissions", tags=["api/submissions"])
 async def api_list_submissions(request: Request, form_id: str) -> JSONResponse:
-    storage = request.app.state.storage
-    form = storage.forms.get_form(form_id)
+    storage = request.app.state.async_storage
+    form = await storage.forms.get_form(form_id)
     if not form:
         raise HTTPException(status_code=404, detail="フォームが見つかりません")
-    fields = fields_from_schema(form["schema_json"], form.get("field_order", []))
-    submissions = storage.submissions.list_submissions(form_id)
-    file_ids = collect_file_ids(submissions, fields)
-    file_names = resolve_file_names(storage.files, file_ids)
-
-    filtered = apply_filters(
-        submissions, fields, dict(request.query_params), file_names=file_names
+    fields = compiled_form(form)["fields"]
+    predicates, residual_params = split_storage_predicates(
+        dict(request.query_params), fields
     )
-    filtered.sort(key=lambda item: (item["created_at"], item["id"]), reverse=True)
 
     cursor_raw = request.query_params.get("cursor")
     limit = int(request.query_params.get("limit", 50))
+    cursor = None
     if cursor_raw:
         cursor = decode_cursor(cursor_raw)
-        if cursor:
-            cursor_dt, cursor_id = cursor
-            filtered = [
-                item
-                for item in filtered
-                if (ensure_aware(item["created_at"]) < cursor_dt)
-                or (
-                    ensure_aware(item["created_at"]) == cursor_dt and item["id"] < cursor_id
-                )
-            ]
-        else:
+        if not cursor:
             raise HTTPException(status_code=400, detail="cursorが不正です")
 
+    if has_row_filters(residual_params):
+        candidates = await storage.submissions.substring_candidates(
+            form_id, substring_filters(fields, residual_params)
+        )
+        plan = compile_filters(fields, residual_params, candidates)
+        # 残りの条件は保存側の並び順のままバッチで読み、limit 件そろった時点で打ち切る
+        filtered = []
+        after = cursor
+        batch_size = max(limit, API_FILTER_BATCH_SIZE)
+        while len(filtered) < limit:
+            submissions = await storage.submissions.query_submissions(
+                form_id, predicates, limit=batch_size, after_cursor=after
+            )
+            if not submissions:
+                break
+            file_ids = collect_file_ids(submissions, fields)
+            file_names = await resolve_file_names_async(storage.files, file_ids)
+            filtered += await run_in_threadpool(run_filters, submissions, plan, file_names)
+            if len(submissions) < batch_size:
+                break
+            last = submissions[-1]
+            after = (last["created_at"], last["id"])
+            batch_size *= 2
+    else:
+        filtered = await storage.submissions.query_submissions(
+            form_id, predicates, limit=limit, after_cursor=cursor
+        )
+
     page_items = filtered[:limit]
     response_items = [
         {
@@ -170,3 +298,53 @@ async def api_list_submissions(request: Request, form_id: str) -> JSONResponse:
         last = page_items[-1]
         headers["X-Next-Cursor"] = encode_cursor(last["created_at"], last["id"])
     return JSONResponse(response_items, headers=headers)
+
+
+@router.get("/api/forms/{form_id}/submissions/stats", tags=["api/submissions"])
+async def api_submission_stats(request: Request, form_id: str) -> JSONResponse:
+    storage = request.app.state.async_storage
+    form = await storage.forms.get_form(form_id)
+    if not form:
+        raise HTTPException(status_code=404, detail="フォームが見つかりません")
+    fields = compiled_form(form)["fields"]
+
+    requested = [
+        key.strip()
+        for key in request.query_params.get("fields", "").split(",")
+        if key.strip()
+    ]
+    specs = stats_specs(fields, requested)
+    unknown = set(requested) - {spec["key"] for spec in specs}
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"集計できない項目です: {', '.join(sorted(unknown))}"
+        )
+    try:
+        bins = int(request.query_params.get("bins", DEFAULT_HISTOGRAM_BINS))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="binsが不正です")
+    if not 1 <= bins <= MAX_HISTOGRAM_BINS:
+        raise HTTPException(status_code=400, detail="binsが不正です")
+
+    predicates, residual_params = split_storage_predicates(
+        dict(request.query_params), fields
+    )
+    if not has_row_filters(residual_params):
+        stats = await storage.submissions.aggregate_submissions(
+            form_id, predicates, specs, bins
+        )
+        return JSONResponse(stats)
+
+    # 保存側で評価できない条件があるときは、絞り込みと集計を 1 回の走査で行う
+    candidates = await storage.submissions.substring_candidates(
+        form_id, substring_filters(fields, residual_params)
+    )
+    plan = compile_filters(fields, residual_params, candidates)
+    submissions = await storage.submissions.query_submissions(form_id, predicates)
+    file_names = await resolve_file_names_async(
+        storage.files, collect_file_ids(submissions, fields)
+    )
+    stats = await run_in_threadpool(
+        aggregate_submissions, iter_filters(submissions, plan, file_names), specs, bins
+    )
+    return JSONResponse(stats)
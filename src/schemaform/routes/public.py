@@ -5,18 +5,26 @@ from typing import Any
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import FileResponse, HTMLResponse
-from jsonschema import Draft7Validator
+from starlette.concurrency import run_in_threadpool
 
 from schemaform.file_formats import upload_matches_file_constraints
 from schemaform.fields import clean_empty_recursive
 from schemaform.filters import normalize_number, parse_bool
+from schemaform.form_cache import compiled_form, detached_fields
 from schemaform.master import enrich_master_options, validate_master_references
-from schemaform.schema import fields_from_schema
 from schemaform.utils import new_ulid, now_utc
 
 router = APIRouter()
 
 
+async def public_form_fields(request: Request, compiled: dict[str, Any]) -> list[dict[str, Any]]:
+    if not compiled["master_keys"]:
+        return compiled["fields"]
+    fields = detached_fields(compiled["fields"])
+    await run_in_threadpool(enrich_master_options, request.app.state.storage, fields)
+    return fields
+
+
 async def save_upload(
     file_obj: Any,
     form_id: str,
@@ -24,7 +32,7 @@ async def save_upload(
     file_format: str = "",
     allowed_extensions: list[str] | None = None,
 ) -> str:
-    storage = request.app.state.storage
+    storage = request.app.state.async_storage
     settings = request.app.state.settings
     if not upload_matches_file_constraints(
         content_type=file_obj.content_type,
@@ -38,8 +46,8 @@ async def save_upload(
     content = await file_obj.read()
     if settings.upload_max_bytes is not None and len(content) > settings.upload_max_bytes:
         raise HTTPException(status_code=400, detail="ファイルサイズが上限を超えています")
-    destination.write_bytes(content)
-    storage.files.create_file(
+    await run_in_threadpool(destination.write_bytes, content)
+    await storage.files.create_file(
         {
             "id": file_id,
             "form_id": form_id,
@@ -55,13 +63,12 @@ async def save_upload(
 
 @router.get("/f/{public_id}", response_class=HTMLResponse, tags=["public"])
 async def public_form(request: Request, public_id: str) -> HTMLResponse:
-    storage = request.app.state.storage
+    storage = request.app.state.async_storage
     templates = request.app.state.templates
-    form = storage.forms.get_form_by_public_id(public_id)
+    form = await storage.forms.get_form_by_public_id(public_id)
     if not form:
         raise HTTPException(status_code=404, detail="フォームが見つかりません")
-    fields = fields_from_schema(form["schema_json"], form.get("field_order", []))
-    enrich_master_options(storage, fields)
+    fields = await public_form_fields(request, compiled_form(form))
     inactive = form.get("status") != "active"
     errors = ["このフォームは停止中です"] if inactive else []
     return templates.TemplateResponse(
@@ -78,14 +85,13 @@ async def public_form(request: Request, public_id: str) -> HTMLResponse:
 
 @router.post("/f/{public_id}", response_class=HTMLResponse, tags=["public"])
 async def submit_form(request: Request, public_id: str) -> HTMLResponse:
-    storage = request.app.state.storage
+    storage = request.app.state.async_storage
     templates = request.app.state.templates
-    form = storage.forms.get_form_by_public_id(public_id)
+    form = await storage.forms.get_form_by_public_id(public_id)
     if not form:
         raise HTTPException(status_code=404, detail="フォームが見つかりません")
     if form.get("status") != "active":
-        fields = fields_from_schema(form["schema_json"], form.get("field_order", []))
-        enrich_master_options(storage, fields)
+        fields = await public_form_fields(request, compiled_form(form))
         return templates.TemplateResponse(
             "form_public.html",
             {
@@ -98,8 +104,8 @@ async def submit_form(request: Request, public_id: str) -> HTMLResponse:
         )
 
     form_data = await request.form()
-    fields = fields_from_schema(form["schema_json"], form.get("field_order", []))
-    enrich_master_options(storage, fields)
+    compiled = compiled_form(form)
+    fields = await public_form_fields(request, compiled)
     submission: dict[str, Any] = {}
 
     async def collect_fields(
@@ -191,9 +197,14 @@ async def submit_form(request: Request, public_id: str) -> HTMLResponse:
     await collect_fields(fields, submission, "")
     submission = clean_empty_recursive(submission) or {}
 
-    validator = Draft7Validator(form["schema_json"])
-    errors = sorted(validator.iter_errors(submission), key=lambda err: list(err.path))
-    master_errors = validate_master_references(storage, fields, submission)
+    errors = sorted(
+        compiled["validator"].iter_errors(submission), key=lambda err: list(err.path)
+    )
+    master_errors: list[str] = []
+    if compiled["master_keys"]:
+        master_errors = await run_in_threadpool(
+            validate_master_references, request.app.state.storage, fields, submission
+        )
     if errors or master_errors:
         messages = [f"{error.message}" for error in errors] + master_errors
         return templates.TemplateResponse(
@@ -207,7 +218,7 @@ async def submit_form(request: Request, public_id: str) -> HTMLResponse:
             },
         )
 
-    storage.submissions.create_submission(
+    await storage.submissions.create_submission(
         {
             "id": new_ulid(),
             "form_id": form["id"],
@@ -224,9 +235,9 @@ async def submit_form(request: Request, public_id: str) -> HTMLResponse:
 
 @router.get("/files/{file_id}", tags=["public"])
 async def download_file(request: Request, file_id: str) -> FileResponse:
-    storage = request.app.state.storage
+    storage = request.app.state.async_storage
     settings = request.app.state.settings
-    file_meta = storage.files.get_file(file_id)
+    file_meta = await storage.files.get_file(file_id)
     if not file_meta:
         raise HTTPException(status_code=404, detail="ファイルが見つかりません")
     path = Path(file_meta["stored_path"]).resolve()
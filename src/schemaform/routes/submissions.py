@@ -5,23 +5,27 @@ import io
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
 
 from schemaform.fields import (
-    expand_group_array_rows,
-    flatten_fields,
-    flatten_filter_fields,
+    count_group_array_rows,
     format_array_group_value,
     get_nested_value,
+    iter_group_array_rows,
 )
 from schemaform.filters import (
-    apply_filters,
     collect_file_ids,
+    compile_filters,
+    has_row_filters,
     resolve_file_names,
+    split_storage_predicates,
+    substring_filters,
     value_to_text,
 )
+from schemaform.form_cache import compiled_form, filter_fields_of, row_fields_of
 from schemaform.master import build_master_reference_context
-from schemaform.schema import fields_from_schema
+from schemaform.result_cache import FilterResultCache, normalize_filter_params
 
 router = APIRouter()
 
@@ -33,7 +37,7 @@ def admin_guard(request: Request) -> None:
 def build_submission_display_columns(
     storage: Any, fields: list[dict[str, Any]]
 ) -> tuple[list[dict[str, Any]], dict[str, dict[str, dict[str, Any]]]]:
-    flat_fields = flatten_fields(fields, expand_rows_for_group_arrays=True)
+    flat_fields = row_fields_of(fields)
     display_columns: list[dict[str, Any]] = []
     master_lookup_by_field: dict[str, dict[str, dict[str, Any]]] = {}
 
@@ -128,37 +132,232 @@ def build_submission_row_values(
     return row_values
 
 
-@router.get("/admin/forms/{form_id}/submissions", response_class=HTMLResponse, tags=["admin"])
-async def list_submissions(request: Request, form_id: str, _: Any = Depends(admin_guard)) -> HTMLResponse:
-    storage = request.app.state.storage
-    templates = request.app.state.templates
-    form = storage.forms.get_form(form_id)
-    if not form:
-        raise HTTPException(status_code=404, detail="フォームが見つかりません")
+def has_expanded_rows(fields: list[dict[str, Any]]) -> bool:
+    return any(
+        field["type"] == "group" and field.get("expand_rows")
+        for field in filter_fields_of(fields)
+    )
+
 
-    fields = fields_from_schema(form["schema_json"], form.get("field_order", []))
-    submissions = storage.submissions.list_submissions(form_id)
+def expand_submission_rows(
+    fields: list[dict[str, Any]], submissions: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
     expanded_submissions: list[dict[str, Any]] = []
     for submission in submissions:
         data = submission.get("data_json", {})
-        for expanded_data in expand_group_array_rows(fields, data):
+        for expanded_data in iter_group_array_rows(fields, data):
             expanded_submissions.append({**submission, "data_json": expanded_data})
-    file_ids = collect_file_ids(submissions, fields)
-    file_names = resolve_file_names(storage.files, file_ids)
+    return expanded_submissions
+
+
+def filter_submission_rows(
+    storage: Any,
+    form_id: str,
+    fields: list[dict[str, Any]],
+    query_params: dict[str, Any],
+    start: int = 0,
+    stop: int | None = None,
+    keep_row_keys: bool = False,
+) -> tuple[int, list[dict[str, Any]], dict[str, str], list[tuple[str, int]]]:
+    # 展開後の行を 1 行ずつ作って判定し、件数と [start, stop) の行だけを返す。
+    # keep_row_keys のときは、一致した行を (送信 ID, その送信の何行目か) のキーでも返す（結果キャッシュ用）。
+    # 行展開したグループ配列は展開後の行ごとに q を判定するため、保存側へは渡さない。
+    predicates, residual_params = split_storage_predicates(
+        query_params, fields, free_text=not has_expanded_rows(fields)
+    )
+    submissions = storage.submissions.query_submissions(form_id, predicates)
+    candidates = None
+    if not has_expanded_rows(fields):
+        candidates = storage.submissions.substring_candidates(
+            form_id, substring_filters(fields, residual_params)
+        )
+    plan = compile_filters(fields, residual_params, candidates)
+    # 条件がなければファイル名は返す行の分だけでよい
+    file_names: dict[str, str] = {}
+    if plan:
+        file_names = resolve_file_names(storage.files, collect_file_ids(submissions, fields))
+
+    total = 0
+    rows: list[dict[str, Any]] = []
+    row_keys: list[tuple[str, int]] = []
+    for submission in submissions:
+        data = submission.get("data_json", {})
+        if not plan:
+            # 条件がなければ行数だけ数え、範囲に入る行だけを作る
+            count = count_group_array_rows(fields, data)
+            first = max(start - total, 0)
+            last = count if stop is None else min(stop - total, count)
+            for index, expanded_data in enumerate(
+                iter_group_array_rows(fields, data, first, last), start=first
+            ):
+                rows.append({**submission, "data_json": expanded_data})
+            if keep_row_keys:
+                row_keys += [(submission["id"], index) for index in range(count)]
+            total += count
+            continue
+        for index, expanded_data in enumerate(iter_group_array_rows(fields, data)):
+            row = {**submission, "data_json": expanded_data}
+            if not all(predicate(row, file_names) for predicate in plan):
+                continue
+            if total >= start and (stop is None or total < stop):
+                rows.append(row)
+            if keep_row_keys:
+                row_keys.append((submission["id"], index))
+            total += 1
+    if not plan:
+        file_names = resolve_file_names(storage.files, collect_file_ids(rows, fields))
+    return total, rows, file_names, row_keys
+
+
+def load_row_keys(
+    storage: Any,
+    form_id: str,
+    fields: list[dict[str, Any]],
+    row_keys: list[tuple[str, int]],
+) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    submission_ids = list(dict.fromkeys(submission_id for submission_id, _ in row_keys))
+    submissions = {
+        submission["id"]: submission
+        for submission in storage.submissions.get_submissions(form_id, submission_ids)
+    }
+    rows: list[dict[str, Any]] = []
+    for submission_id, index in row_keys:
+        # キャッシュ後に消された送信は飛ばす
+        submission = submissions.get(submission_id)
+        if submission is None:
+            continue
+        for expanded_data in iter_group_array_rows(
+            fields, submission.get("data_json", {}), index, index + 1
+        ):
+            rows.append({**submission, "data_json": expanded_data})
+    file_names = resolve_file_names(
+        storage.files, collect_file_ids(list(submissions.values()), fields)
+    )
+    return rows, file_names
+
+
+def cached_filter_rows(
+    storage: Any,
+    cache: FilterResultCache | None,
+    form: dict[str, Any],
+    fields: list[dict[str, Any]],
+    query_params: dict[str, Any],
+    start: int = 0,
+    stop: int | None = None,
+) -> tuple[int, list[dict[str, Any]], dict[str, str]]:
+    form_id = form["id"]
+    key = None
+    if cache is not None and has_row_filters(query_params):
+        # 版は絞り込みより先に読む。途中で書き込まれても、次回は版が変わって外れる
+        key = (
+            form_id,
+            str(form.get("updated_at")),
+            storage.submissions.data_version(form_id),
+            normalize_filter_params(query_params),
+        )
+        row_keys = cache.get(key)
+        if row_keys is not None:
+            rows, file_names = load_row_keys(storage, form_id, fields, row_keys[start:stop])
+            return len(row_keys), rows, file_names
+
+    if start < 0:
+        # 負の範囲はスライスと同じ扱いにするため、全行を作ってから切り出す
+        total, rows, file_names, row_keys = filter_submission_rows(
+            storage, form_id, fields, query_params, keep_row_keys=key is not None
+        )
+        rows = rows[start:stop]
+    else:
+        total, rows, file_names, row_keys = filter_submission_rows(
+            storage, form_id, fields, query_params, start, stop, key is not None
+        )
+    if key is not None:
+        cache.put(key, row_keys)
+    return total, rows, file_names
+
+
+def load_submission_page(
+    storage: Any,
+    form: dict[str, Any],
+    fields: list[dict[str, Any]],
+    query_params: dict[str, Any],
+    page: int,
+    page_size: int,
+    cache: FilterResultCache | None = None,
+) -> tuple[int, list[dict[str, Any]], dict[str, str]]:
+    form_id = form["id"]
+    start = (page - 1) * page_size
+    if page >= 1 and page_size >= 1 and not has_expanded_rows(fields):
+        predicates, residual_params = split_storage_predicates(query_params, fields)
+        # 絞り込みをすべて保存側で評価できるときは、件数とページ分だけを取り出す。
+        if not has_row_filters(residual_params):
+            total, submissions = storage.submissions.page_submissions(
+                form_id, predicates, page_size, start
+            )
+            file_names = resolve_file_names(
+                storage.files, collect_file_ids(submissions, fields)
+            )
+            return total, expand_submission_rows(fields, submissions), file_names
 
-    filtered = apply_filters(
-        expanded_submissions, fields, dict(request.query_params), file_names=file_names
+    return cached_filter_rows(
+        storage, cache, form, fields, query_params, start, start + page_size
     )
 
+
+def build_export_text(
+    storage: Any,
+    form: dict[str, Any],
+    fields: list[dict[str, Any]],
+    query_params: dict[str, Any],
+    delimiter: str,
+    cache: FilterResultCache | None = None,
+) -> str:
+    _, filtered, file_names = cached_filter_rows(storage, cache, form, fields, query_params)
+    display_columns, master_lookup_by_field = build_submission_display_columns(storage, fields)
+    headers = [column["label"] for column in display_columns]
+    rows = [
+        build_submission_row_values(
+            submission.get("data_json", {}),
+            display_columns,
+            master_lookup_by_field,
+            file_names,
+        )
+        for submission in filtered
+    ]
+
+    output = io.StringIO()
+    writer = csv.writer(output, delimiter=delimiter)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+@router.get("/admin/forms/{form_id}/submissions", response_class=HTMLResponse, tags=["admin"])
+async def list_submissions(request: Request, form_id: str, _: Any = Depends(admin_guard)) -> HTMLResponse:
+    storage = request.app.state.async_storage
+    templates = request.app.state.templates
+    form = await storage.forms.get_form(form_id)
+    if not form:
+        raise HTTPException(status_code=404, detail="フォームが見つかりません")
+
+    compiled = compiled_form(form)
+    fields = compiled["fields"]
     page = int(request.query_params.get("page", 1))
     page_size = int(request.query_params.get("page_size", 50))
-    total = len(filtered)
-    start = (page - 1) * page_size
-    end = start + page_size
-    page_items = filtered[start:end]
+    total, page_items, file_names = await run_in_threadpool(
+        load_submission_page,
+        request.app.state.storage,
+        form,
+        fields,
+        dict(request.query_params),
+        page,
+        page_size,
+        request.app.state.filter_cache,
+    )
 
-    display_columns, master_lookup_by_field = build_submission_display_columns(storage, fields)
-    filter_fields = flatten_filter_fields(fields)
+    display_columns, master_lookup_by_field = await run_in_threadpool(
+        build_submission_display_columns, request.app.state.storage, fields
+    )
+    filter_fields = compiled["filter_fields"]
     display_fields = [column["label"] for column in display_columns]
 
     display_rows = []
@@ -202,54 +401,48 @@ async def list_submissions(request: Request, form_id: str, _: Any = Depends(admi
 async def delete_submission(
     request: Request, form_id: str, submission_id: str, _: Any = Depends(admin_guard)
 ) -> RedirectResponse:
-    storage = request.app.state.storage
-    storage.submissions.delete_submission(submission_id)
+    storage = request.app.state.async_storage
+    await storage.submissions.delete_submission(submission_id, form_id)
+    if request.app.state.filter_cache is not None:
+        request.app.state.filter_cache.invalidate(form_id)
     return RedirectResponse(f"/admin/forms/{form_id}/submissions", status_code=303)
 
 
+@router.get("/admin/filter-cache", tags=["admin"])
+async def filter_cache_stats(request: Request, _: Any = Depends(admin_guard)) -> JSONResponse:
+    cache = request.app.state.filter_cache
+    return JSONResponse({"enabled": cache is not None, **(cache.stats() if cache else {})})
+
+
+@router.get("/admin/form-cache", tags=["admin"])
+async def form_cache_stats(request: Request, _: Any = Depends(admin_guard)) -> JSONResponse:
+    return JSONResponse(request.app.state.form_cache.stats())
+
+
 @router.get("/admin/forms/{form_id}/export", tags=["admin"])
 async def export_submissions(request: Request, form_id: str, _: Any = Depends(admin_guard)) -> PlainTextResponse:
-    storage = request.app.state.storage
-    form = storage.forms.get_form(form_id)
+    storage = request.app.state.async_storage
+    form = await storage.forms.get_form(form_id)
     if not form:
         raise HTTPException(status_code=404, detail="フォームが見つかりません")
 
-    fields = fields_from_schema(form["schema_json"], form.get("field_order", []))
-    submissions = storage.submissions.list_submissions(form_id)
-    expanded_submissions: list[dict[str, Any]] = []
-    for submission in submissions:
-        data = submission.get("data_json", {})
-        for expanded_data in expand_group_array_rows(fields, data):
-            expanded_submissions.append({**submission, "data_json": expanded_data})
-    file_ids = collect_file_ids(submissions, fields)
-    file_names = resolve_file_names(storage.files, file_ids)
-    filtered = apply_filters(
-        expanded_submissions, fields, dict(request.query_params), file_names=file_names
-    )
-    display_columns, master_lookup_by_field = build_submission_display_columns(storage, fields)
-    headers = [column["label"] for column in display_columns]
-    rows = [
-        build_submission_row_values(
-            submission.get("data_json", {}),
-            display_columns,
-            master_lookup_by_field,
-            file_names,
-        )
-        for submission in filtered
-    ]
-
+    fields = compiled_form(form)["fields"]
     fmt = request.query_params.get("format", "csv")
     delimiter = "," if fmt == "csv" else "\t"
-
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=delimiter)
-    writer.writerow(headers)
-    writer.writerows(rows)
+    content = await run_in_threadpool(
+        build_export_text,
+        request.app.state.storage,
+        form,
+        fields,
+        dict(request.query_params),
+        delimiter,
+        request.app.state.filter_cache,
+    )
 
     content_type = "text/csv" if fmt == "csv" else "text/tab-separated-values"
     filename = f"submissions.{fmt}"
     return PlainTextResponse(
-        output.getvalue(),
+        content,
         media_type=content_type,
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from schemaform.filters import ensure_aware, first_filter_value
+from schemaform.form_cache import filter_fields_of
+
+STATS_FIELD_TYPES = {"enum", "boolean", "number", "integer"}
+DEFAULT_HISTOGRAM_BINS = 10
+MAX_HISTOGRAM_BINS = 100
+
+
+def stats_specs(
+    fields: list[dict[str, Any]], requested: list[str] | None = None
+) -> list[dict[str, Any]]:
+    # 集計できるのは単一値の選択肢・真偽値・数値項目。requested があればその項目だけにする。
+    specs: list[dict[str, Any]] = []
+    for field in filter_fields_of(fields):
+        if field.get("is_array") or field.get("type") not in STATS_FIELD_TYPES:
+            continue
+        if requested and field["flat_key"] not in requested:
+            continue
+        specs.append(
+            {
+                "key": field["flat_key"],
+                "type": field["type"],
+                "options": [str(option) for option in field.get("enum") or []],
+            }
+        )
+    return specs
+
+
+def is_stats_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def histogram_bucket(value: float, low: float, high: float, bins: int) -> int:
+    # SQL 側（repo_sqlite）と同じ式で区間を決める
+    if high <= low:
+        return 0
+    return min(bins - 1, int((value - low) * float(bins) / (high - low)))
+
+
+def empty_field_stats(spec: dict[str, Any]) -> dict[str, Any]:
+    if spec["type"] == "enum":
+        return {"type": "enum", "counts": {option: 0 for option in spec["options"]}}
+    if spec["type"] == "boolean":
+        return {"type": "boolean", "counts": {"true": 0, "false": 0}}
+    return {
+        "type": spec["type"],
+        "count": 0,
+        "min": None,
+        "max": None,
+        "sum": None,
+        "avg": None,
+        "histogram": [],
+    }
+
+
+def finish_enum_counts(spec: dict[str, Any], counts: dict[str, int]) -> dict[str, int]:
+    # 定義済みの選択肢を先に、それ以外の値は文字列順に並べる
+    ordered = {option: counts.get(option, 0) for option in spec["options"]}
+    for value in sorted(counts):
+        ordered.setdefault(value, counts[value])
+    return ordered
+
+
+def finish_number_stats(
+    stats: dict[str, Any], bucket_counts: dict[int, int], bins: int
+) -> dict[str, Any]:
+    if not stats["count"]:
+        return stats
+    low, high = stats["min"], stats["max"]
+    width = (high - low) / bins if high > low else 0
+    buckets = 1 if high <= low else bins
+    stats["avg"] = stats["sum"] / stats["count"]
+    stats["histogram"] = [
+        {
+            "start": low + width * index,
+            "end": high if index == buckets - 1 else low + width * (index + 1),
+            "count": bucket_counts.get(index, 0),
+        }
+        for index in range(buckets)
+    ]
+    return stats
+
+
+def day_key(created_at: Any) -> str | None:
+    if not isinstance(created_at, datetime):
+        return None
+    return ensure_aware(created_at).astimezone(timezone.utc).date().isoformat()
+
+
+def aggregate_submissions(
+    submissions: Iterable[dict[str, Any]],
+    specs: list[dict[str, Any]],
+    bins: int = DEFAULT_HISTOGRAM_BINS,
+) -> dict[str, Any]:
+    # 行を 1 度だけ走査してすべての集計を作る。数値の区間分けだけは最小・最大が
+    # 決まってから行うので、数値項目の値は項目ごとに控えておく。
+    total = 0
+    days: dict[str, int] = {}
+    result = {spec["key"]: empty_field_stats(spec) for spec in specs}
+    numbers: dict[str, list[Any]] = {
+        spec["key"]: [] for spec in specs if spec["type"] in {"number", "integer"}
+    }
+    parts_by_key = {spec["key"]: spec["key"].split(".") for spec in specs}
+    for submission in submissions:
+        total += 1
+        day = day_key(submission.get("created_at"))
+        if day is not None:
+            days[day] = days.get(day, 0) + 1
+        data = submission.get("data_json", {})
+        for spec in specs:
+            key = spec["key"]
+            value = first_filter_value(data, parts_by_key[key])
+            stats = result[key]
+            if spec["type"] == "enum":
+                if isinstance(value, str) or is_stats_number(value):
+                    text = str(value)
+                    stats["counts"][text] = stats["counts"].get(text, 0) + 1
+            elif spec["type"] == "boolean":
+                stats["counts"]["true" if value is True else "false"] += 1
+            elif is_stats_number(value):
+                numbers[key].append(value)
+
+    for spec in specs:
+        if spec["type"] == "enum":
+            result[spec["key"]]["counts"] = finish_enum_counts(spec, result[spec["key"]]["counts"])
+    for key, values in numbers.items():
+        stats = result[key]
+        if not values:
+            continue
+        stats["count"] = len(values)
+        stats["min"] = min(values)
+        stats["max"] = max(values)
+        stats["sum"] = sum(values)
+        bucket_counts: dict[int, int] = {}
+        for value in values:
+            bucket = histogram_bucket(value, stats["min"], stats["max"], bins)
+            bucket_counts[bucket] = bucket_counts.get(bucket, 0) + 1
+        finish_number_stats(stats, bucket_counts, bins)
+
+    return {
+        "total": total,
+        "days": [{"date": day, "count": days[day]} for day in sorted(days)],
+        "fields": result,
+    }
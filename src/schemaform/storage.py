@@ -1,12 +1,43 @@
 from __future__ import annotations
 
 from schemaform.config import Settings
-from schemaform.protocols import Storage
-from schemaform.repo_json import JSONStorage
+from schemaform.protocols import AsyncStorage, Storage
+from schemaform.repo_async import ThreadedAsyncStorage
+from schemaform.repo_json import JSONMemoryStorage, JSONShardedStorage, JSONStorage
 from schemaform.repo_sqlite import SQLiteStorage
+from schemaform.repo_sqlite_async import AsyncSQLiteStorage
 
 
-def init_storage(settings: Settings) -> Storage:
+def init_storage(settings: Settings, backend: str | None = None) -> Storage:
+    if (backend or settings.storage_backend) == "json":
+        if settings.json_mode == "memory":
+            return JSONMemoryStorage(
+                settings.json_path,
+                columnar=settings.json_columnar,
+                substring_index_postings=(
+                    settings.json_ngram_max_postings if settings.json_ngram_index else 0
+                ),
+                fsync=settings.json_fsync,
+            )
+        if settings.json_layout == "sharded":
+            return JSONShardedStorage(settings.json_shard_dir, fsync=settings.json_fsync)
+        return JSONStorage(settings.json_path, fsync=settings.json_fsync)
+    return SQLiteStorage(
+        settings.sqlite_path,
+        pragmas=settings.sqlite_pragmas,
+        pool_size=settings.sqlite_pool_size,
+        max_overflow=settings.sqlite_max_overflow,
+        pool_timeout=settings.sqlite_pool_timeout,
+    )
+
+
+def init_async_storage(settings: Settings, storage: Storage) -> AsyncStorage:
     if settings.storage_backend == "json":
-        return JSONStorage(settings.json_path)
-    return SQLiteStorage(settings.sqlite_path)
+        return ThreadedAsyncStorage(storage)
+    return AsyncSQLiteStorage(
+        settings.sqlite_path,
+        pragmas=settings.sqlite_pragmas,
+        pool_size=settings.sqlite_pool_size,
+        max_overflow=settings.sqlite_max_overflow,
+        pool_timeout=settings.sqlite_pool_timeout,
+    )
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from schemaform.filters import first_filter_value
+
+NGRAM_SIZE = 2
+DEFAULT_MAX_POSTINGS = 2_000_000
+
+
+def ngrams(text: str) -> set[str]:
+    return {text[index : index + NGRAM_SIZE] for index in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def _indexed_text(
+    record: dict[str, Any],
+    parts: list[str],
+    field_type: str,
+    file_names_for: Callable[[set[str]], dict[str, str]],
+) -> str:
+    # 絞り込み側（compile_filters）と同じ取り出し方・小文字化で索引に載せる
+    value = first_filter_value(record.get("data_json", {}), parts)
+    if field_type == "file":
+        return file_names_for({str(value)}).get(str(value), "").lower()
+    return str(value or "").lower()
+
+
+class SubstringIndex:
+    # フォーム・項目ごとの bigram 転置索引。部分一致の候補を絞るだけで、
+    # 最終的な判定は従来どおり行の値で行う。最初に使われた項目だけを作り、
+    # 件数の上限を超えたら最後に使われたのが古いフォームから捨てる。
+    def __init__(self, max_postings: int = DEFAULT_MAX_POSTINGS) -> None:
+        self._max_postings = max_postings
+        self._forms: OrderedDict[str, dict[tuple[str, str], dict[str, Any]]] = OrderedDict()
+        self._postings = 0
+        # 単独で上限を超えたフォームは、削除で上限に収まりそうな行数に減るまで索引を使わない。
+        # 値は上限を超えたときの 1 行あたりの件数から見積もった、収まる行数。
+        self._oversized: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._forms = OrderedDict()
+            self._postings = 0
+            self._oversized = {}
+
+    def evict(self, form_id: str) -> None:
+        with self._lock:
+            self._evict(form_id)
+
+    def _evict(self, form_id: str) -> None:
+        indexes = self._forms.pop(form_id, None)
+        for index in (indexes or {}).values():
+            self._postings -= index["size"]
+
+    def _add(
+        self,
+        index: dict[str, Any],
+        record: dict[str, Any],
+        field_type: str,
+        file_names_for: Callable[[set[str]], dict[str, str]],
+    ) -> None:
+        text = _indexed_text(record, index["parts"], field_type, file_names_for)
+        index["texts"][record["id"]] = text
+        for gram in ngrams(text):
+            index["grams"].setdefault(gram, set()).add(record["id"])
+            index["size"] += 1
+            self._postings += 1
+
+    def _remove(self, index: dict[str, Any], record_id: str) -> None:
+        text = index["texts"].pop(record_id, None)
+        if text is None:
+            return
+        for gram in ngrams(text):
+            postings = index["grams"].get(gram)
+            if postings is None or record_id not in postings:
+                continue
+            postings.discard(record_id)
+            if not postings:
+                del index["grams"][gram]
+            index["size"] -= 1
+            self._postings -= 1
+
+    def put(
+        self, record: dict[str, Any], file_names_for: Callable[[set[str]], dict[str, str]]
+    ) -> None:
+        with self._lock:
+            indexes = self._forms.get(record["form_id"])
+            if not indexes:
+                return
+            for (_, field_type), index in indexes.items():
+                self._remove(index, record["id"])
+                self._add(index, record, field_type, file_names_for)
+            self._trim(record["form_id"])
+
+    def remove(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            for index in (self._forms.get(record["form_id"]) or {}).values():
+                self._remove(index, record["id"])
+
+    def _trim(self, keep: str) -> None:
+        for form_id in list(self._forms):
+            if self._postings <= self._max_postings:
+                return
+            if form_id != keep:
+                self._evict(form_id)
+        if self._postings > self._max_postings:
+            self._evict(keep)
+
+    def candidates(
+        self,
+        form_id: str,
+        key: str,
+        field_type: str,
+        needle: str,
+        records: Callable[[], list[dict[str, Any]]],
+        file_names_for: Callable[[set[str]], dict[str, str]],
+    ) -> set[str] | None:
+        grams = ngrams(needle)
+        if not grams:
+            # bigram より短い語は絞り込めないので全件を調べてもらう
+            return None
+        with self._lock:
+            fit_rows = self._oversized.get(form_id)
+            if fit_rows is not None:
+                if len(records()) > fit_rows:
+                    return None
+                del self._oversized[form_id]
+            indexes = self._forms.get(form_id)
+            if indexes is None:
+                indexes = self._forms[form_id] = {}
+            self._forms.move_to_end(form_id)
+            index = indexes.get((key, field_type))
+            if index is None:
+                index = {"parts": key.split("."), "grams": {}, "texts": {}, "size": 0}
+                indexes[(key, field_type)] = index
+                rows = records()
+                for record in rows:
+                    self._add(index, record, field_type, file_names_for)
+                needed = sum(item["size"] for item in indexes.values())
+                self._trim(form_id)
+                if form_id not in self._forms:
+                    self._oversized[form_id] = len(rows) * self._max_postings // max(needed, 1)
+                    return None
+            postings = sorted((index["grams"].get(gram, set()) for gram in grams), key=len)
+            return set(postings[0]).intersection(*postings[1:])